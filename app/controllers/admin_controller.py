@@ -1,4 +1,6 @@
 from app.mysql.mysql import DatabaseClient
+from app.utils.pagination import paginate
+from app.utils.projection import project, resolve_fields, serialize_rows
 from app.mysql.admin import Admin  # SQLAlchemy model for the database
 from app.models.admin import Admin as AdminModel  # Pydantic model for request validation
 from sqlalchemy.orm import Session
@@ -34,6 +36,8 @@ from sqlalchemy import func
 import os
 
 class AdminController:
+    # Campos devueltos por los listados cuando no se pide un subconjunto
+    LIST_FIELDS = ('idAdmin', 'email')
 
     def __init__(self, db_url=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
@@ -203,7 +207,7 @@ class AdminController:
 
 
 
-    def listAdmins(self, session=None):
+    def listAdmins(self, session=None, limit=None, cursor=None, fields=None):
 
         """
         Lists all admins registered in the database.
@@ -214,6 +218,11 @@ class AdminController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of admins to return. When `limit` and
+                `cursor` are both None every admin is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
+            fields (list[str], optional): Sparse fieldset. Only these keys are returned
+                for each admin; defaults to `LIST_FIELDS`.
 
         Returns:
             dict: Result of the operation.
@@ -221,6 +230,8 @@ class AdminController:
                 If the admins are successfully retrieved. Each admin in the list contains:
                     - idAdmin (int): The unique identifier of the admin.
                     - email (str): The email address of the admin.
+                When paginating, the result also contains `next_cursor`, the token of the
+                next page (None on the last page).
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs during the operation.
 
@@ -233,14 +244,16 @@ class AdminController:
 
         try:
             # Consulta todos los administradores
-            admins = session.query(Admin).all()
+            fields = resolve_fields(fields, self.LIST_FIELDS)
+            query = project(session, Admin, fields, Admin.idAdmin)
+            admins, next_cursor = paginate(query, Admin.idAdmin, limit, cursor)
+            paginated = limit is not None or cursor is not None
 
             # Convertimos el resultado en una lista de diccionarios
-            admins_list = [
-                {"idAdmin": admin.idAdmin, "email": admin.email}
-                for admin in admins
-            ]
+            admins_list = serialize_rows(Admin, fields, admins)
 
+            if paginated:
+                return {"status": "ok", "admins": admins_list, "next_cursor": next_cursor}
             return {"status": "ok", "admins": admins_list}
 
         except Exception as e:
@@ -1,4 +1,11 @@
-from app.mysql.mysql import DatabaseClient
+from app.mysql.mysql import DatabaseClient, on_commit
+from app.mysql.shelter_reading import from_millis
+from app.controllers.open_alarms import OpenAlarmIndex
+from app.controllers.coalescing import AlarmCoalescer
+import logging
+from app.utils.pagination import paginate
+from app.utils.export import stream_chunks
+from sqlalchemy import select
 from app.mysql.alarm import Alarm  # SQLAlchemy model for database
 from app.mysql.room import Room  # SQLAlchemy model
 from app.mysql.resident import Resident  # SQLAlchemy model
@@ -31,18 +38,84 @@ from app.mysql.admin import Admin
 from datetime import date
 import app.utils.vars as gb
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Integer, and_, func, or_, text
 import os
 from sqlalchemy.exc import SQLAlchemyError
 
+logger = logging.getLogger(__name__)
+
+
+# Comienzo de cada periodo; el formato vale igual para DATE_FORMAT (MySQL) y strftime (SQLite)
+ALARM_BUCKETS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+
+
+def _truncate(session, column, bucket: str):
+    # Trunca una fecha a la hora o al día con la función del motor en uso
+    if session.get_bind().dialect.name == "sqlite":
+        return func.strftime(ALARM_BUCKETS[bucket], column)
+    return func.date_format(column, ALARM_BUCKETS[bucket])
+
+
+def _seconds_between(session, start, end):
+    # Segundos enteros entre dos fechas con la función del motor en uso
+    if session.get_bind().dialect.name == "sqlite":
+        return func.strftime("%s", end).cast(Integer) - func.strftime("%s", start).cast(Integer)
+    return func.timestampdiff(text("SECOND"), start, end)
+
+
+def _is_p95(rank, size):
+    # Percentil 95 por rango más cercano: la primera fila cuyo rango alcanza el 95 % de las filas
+    return and_(rank * 100 >= size * 95, (rank - 1) * 100 < size * 95)
+
+
+def _p95_row(rank: int, size: int) -> bool:
+    # La misma condición que _is_p95, para saber qué filas devueltas son de cada percentil
+    return rank * 100 >= size * 95 and (rank - 1) * 100 < size * 95
+
+
 class AlarmController:
+    # Columnas incluidas en las exportaciones, en orden
+    EXPORT_FIELDS = ('idAlarm', 'start', 'end', 'idRoom', 'createDate')
 
-    def __init__(self, db_url=None):
+    def __init__(self, db_url=None, events=None, rules=None, open_alarms=None, coalescer=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
         self.db_url = db_url or os.getenv("MYSQL_URL")
         if not self.db_url:
             raise ValueError("MYSQL_URL environment variable is not set.")
         self.db_client = DatabaseClient(self.db_url)
+        # Publicador de eventos, motor de reglas sobre los niveles y alarmas abiertas en memoria (opcionales)
+        self.events = events
+        self.rules = rules
+        self.open_alarms = open_alarms if open_alarms is not None else OpenAlarmIndex()
+        # Fusiona las alarmas repetidas de una sala dentro de ALARM_COALESCE_SECONDS
+        self.coalescer = coalescer if coalescer is not None else AlarmCoalescer(gb.ALARM_COALESCE_SECONDS)
+
+    def _alarm_changed(self, session, action: str, alarm: Alarm) -> None:
+        # Los valores se copian ahora: tras el commit real los atributos del objeto caducan
+        if alarm.idAlarm is None:
+            session.flush()  # Hace falta el idAlarm generado
+        if alarm.end is None:
+            self.open_alarms.opened(session, alarm.idAlarm, alarm.idRoom, alarm.start)
+        else:
+            self.open_alarms.closed(session, alarm.idAlarm, alarm.idRoom)
+        if self.events is not None:
+            data = {"action": action, "idAlarm": alarm.idAlarm, "idRoom": alarm.idRoom, "start": alarm.start, "end": alarm.end}
+            on_commit(session, self.events.publish, "alarm", data)
+
+    def _coalesce(self, session, idRoom: int, start, end):
+        # Extiende la última alarma de la sala si la nueva llega dentro de la ventana; devuelve su id
+        merged = self.coalescer.merge(session, idRoom, start, end)
+        if merged is None:
+            return None
+        idAlarm, new_end, changed = merged
+        if changed:
+            alarm = session.get(Alarm, idAlarm)
+            if alarm is None:
+                return None
+            alarm.end = new_end
+            self._alarm_changed(session, "extended", alarm)
+            session.commit()
+        return idAlarm
 
     def create_alarm(self, body: AlarmModel, session=None):
         """
@@ -65,6 +138,11 @@ class AlarmController:
             dict: Result of the operation.
                 - {"status": "ok"}:
                 If the alarm is created successfully.
+                - {"status": "ok", "idAlarm": <idAlarm>, "coalesced": True}:
+                If coalescing is enabled (ALARM_COALESCE_SECONDS > 0) and the alarm repeats
+                the latest alarm of the room within that window, which is extended instead
+                (see `AlarmCoalescer`). No row is created: the `idAlarm` sent in the body
+                is dropped and later calls must use the returned one.
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs, such as the room not existing or a duplicate alarm.
 
@@ -90,6 +168,11 @@ class AlarmController:
             if existing_alarm:
                 return {"status": "error", "message": "Cannot create alarm, the alarm already exists in this room."}
 
+            # Una repetición de la última alarma de la sala la extiende en lugar de crear otra
+            idAlarm = self._coalesce(session, body.idRoom, body.start, body.end)
+            if idAlarm is not None:
+                return {"status": "ok", "idAlarm": idAlarm, "coalesced": True}
+
             # Crear y agregar la nueva alarma
             new_alarm = Alarm(
                 idAlarm=body.idAlarm,
@@ -99,6 +182,8 @@ class AlarmController:
                 createDate=body.createDate
             )
             session.add(new_alarm)
+            self._alarm_changed(session, "created", new_alarm)
+            self.coalescer.record(session, new_alarm.idAlarm, new_alarm.idRoom, new_alarm.start, new_alarm.end)
             session.commit()
             return {"status": "ok"}
         except SQLAlchemyError as e:
@@ -127,6 +212,9 @@ class AlarmController:
             dict: Result of the operation.
                 - {"status": "ok", "message": "Alarm <idAlarm> created successfully in room 3.", "idAlarm": <idAlarm>}:
                 If the alarm is created successfully. Includes the generated `idAlarm`.
+                If coalescing is enabled and the alarm repeats the latest alarm of room 3
+                within ALARM_COALESCE_SECONDS, that alarm is extended instead and the
+                response also contains `"coalesced": True`.
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs, such as room 3 not existing or a database issue.
 
@@ -144,6 +232,10 @@ class AlarmController:
             if not room:
                 return {"status": "error", "message": "Room with idRoom=3 does not exist."}
 
+            idAlarm = self._coalesce(session, 3, body.start, body.end)
+            if idAlarm is not None:
+                return {"status": "ok", "message": f"Alarm {idAlarm} extended in room 3.", "idAlarm": idAlarm, "coalesced": True}
+
             # Crear la nueva alarma
             new_alarm = Alarm(
                 start=body.start,
@@ -154,6 +246,8 @@ class AlarmController:
             
             # Agregar y guardar la alarma en la base de datos
             session.add(new_alarm)
+            self._alarm_changed(session, "created", new_alarm)
+            self.coalescer.record(session, new_alarm.idAlarm, 3, new_alarm.start, new_alarm.end)
             session.commit()  # Aquí el idAlarm se genera automáticamente si es auto-incremento
             
             # Obtener el idAlarm generado
@@ -171,7 +265,7 @@ class AlarmController:
         """
         Updates the end date of an alarm.
 
-        This method searches for an alarm by its ID and updates its `enddate` field 
+        This method searches for an alarm by its ID and updates its `end` field 
         to the specified new value.
 
         Args:
@@ -202,10 +296,12 @@ class AlarmController:
             if alarm is None:
                 return {"status": "error", "message": "Alarma no encontrada"}
 
-            # Actualizamos el campo enddate
-            alarm.enddate = new_enddate
+            # Actualizamos el campo end (la columna del modelo)
+            alarm.end = new_enddate
 
-            # Guardamos los cambios
+            # Guardamos los cambios y avisamos del cierre cuando se confirmen
+            self._alarm_changed(session, "closed" if new_enddate is not None else "reopened", alarm)
+            self.coalescer.ended(session, alarm.idAlarm, alarm.idRoom, new_enddate)
             session.commit()
 
             return {"status": "ok", "message": "Fecha de fin de alarma actualizada exitosamente"}
@@ -225,7 +321,287 @@ class AlarmController:
                 session.close()
     
 
-    def list_alarms(self, session=None):
+    def evaluate_alarm_rules(self, session=None):
+        """
+        Opens and closes alarms from the level readings committed since the last call.
+
+        Called every ALARM_RULES_INTERVAL seconds by a background task. The
+        buffered readings are evaluated against the alarm rules (see
+        `AlarmRuleEngine`) and every resulting opening and closing is written
+        in one transaction. An alarm opened by a rule is raised in the rule's
+        room, starts at the time of the reading that tripped it and ends at the
+        time of the reading that cleared it. If the transaction fails, the
+        readings go back to the buffer.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "opened": <count>, "closed": <count>}:
+                Alarms opened and closed.
+                - {"status": "error", "message": <error_message>}:
+                If the changes could not be written.
+        """
+
+        if self.rules is None:
+            return {"status": "ok", "opened": 0, "closed": 0}
+        batch = self.rules.pending.drain()
+        if not batch:
+            return {"status": "ok", "opened": 0, "closed": 0}
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            if not self.rules.loaded:
+                self.rules.load(session)
+            transitions, seen = self.rules.evaluate(batch)
+            current = self.rules.open_alarms()
+            changes = {}
+            alarms = {}
+            opened = closed = 0
+            for action, key, takenAt, value in transitions:
+                moment = from_millis(takenAt)
+                if action == "open":
+                    rule = self.rules.rules[key[1]]
+                    alarm = Alarm(start=moment, end=None, idRoom=rule.idRoom, createDate=moment, metric=key[1])
+                    session.add(alarm)
+                    session.flush()
+                    alarms[alarm.idAlarm] = alarm
+                    changes[key] = alarm.idAlarm
+                    opened += 1
+                    self._alarm_changed(session, "created", alarm)
+                else:
+                    idAlarm = changes.get(key, current.get(key))
+                    alarm = alarms.get(idAlarm) or session.get(Alarm, idAlarm)
+                    changes[key] = None
+                    if alarm is None:
+                        continue
+                    alarm.end = moment
+                    closed += 1
+                    self._alarm_changed(session, "closed", alarm)
+            on_commit(session, self.rules.commit, changes, seen)
+            session.commit()
+            return {"status": "ok", "opened": opened, "closed": closed}
+        except Exception as e:
+            session.rollback()
+            self.rules.pending.requeue(batch)
+            logger.warning("Could not evaluate %d readings against the alarm rules: %s", len(batch), e)
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    @staticmethod
+    def _filter(query, idRoom=None, since=None, until=None):
+        # Filtros sobre idRoom y start: ix_alarm_idRoom_start cubre ambos (o ix_alarm_start sin sala)
+        if idRoom is not None:
+            query = query.filter(Alarm.idRoom == idRoom)
+        if since is not None:
+            query = query.filter(Alarm.start >= since)
+        if until is not None:
+            query = query.filter(Alarm.start < until)
+        return query
+
+    def count_alarms(self, bucket: str = "hour", idRoom=None, since=None, until=None, session=None):
+        """
+        Counts the alarms started in each room per hour or per day.
+
+        The counts are computed by the database with one GROUP BY over the
+        (idRoom, start) index; only the groups are returned.
+
+        Args:
+            bucket (str): "hour" or "day".
+            idRoom (int, optional): Only the alarms of this room.
+            since (datetime, optional): Only the alarms that started at or after this time.
+            until (datetime, optional): Only the alarms that started before this time.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "bucket": <bucket>, "counts": [{"idRoom": <room>, "time": <bucket start>, "count": <count>}]}:
+                One entry per room and bucket with alarms, ordered by room and time.
+                - {"status": "error", "message": <error_message>}:
+                If the bucket is not supported or an error occurs.
+        """
+
+        if bucket not in ALARM_BUCKETS:
+            return {"status": "error", "message": f"Unsupported bucket '{bucket}', use 'hour' or 'day'."}
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            period = _truncate(session, Alarm.start, bucket).label("period")
+            query = self._filter(
+                session.query(Alarm.idRoom, period, func.count(Alarm.idAlarm)).filter(Alarm.start.isnot(None)),
+                idRoom, since, until,
+            )
+            rows = query.group_by(Alarm.idRoom, period).order_by(Alarm.idRoom, period).all()
+            counts = [
+                {"idRoom": room, "time": datetime.fromisoformat(str(moment)), "count": count}
+                for room, moment, count in rows
+            ]
+            return {"status": "ok", "bucket": bucket, "counts": counts}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def alarm_durations(self, idRoom=None, since=None, until=None, session=None):
+        """
+        Computes the mean and 95th percentile duration of the closed alarms of each room.
+
+        Everything is aggregated by the database: the count and mean with a
+        GROUP BY on the room, and the nearest-rank 95th percentile with
+        ROW_NUMBER/COUNT window functions, so only one row per room comes back
+        whatever the size of the alarm history.
+
+        Args:
+            idRoom (int, optional): Only the alarms of this room.
+            since (datetime, optional): Only the alarms that started at or after this time.
+            until (datetime, optional): Only the alarms that started before this time.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "rooms": [{"idRoom", "count", "meanSeconds", "p95Seconds"}], "overall": {...}}:
+                Statistics per room and over every room; `overall` is None when no alarm is closed.
+                - {"status": "error", "message": <error_message>}:
+                If an error occurs during the operation.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            durations = self._filter(
+                session.query(Alarm.idRoom.label("idRoom"), _seconds_between(session, Alarm.start, Alarm.end).label("seconds"))
+                .filter(Alarm.start.isnot(None), Alarm.end.isnot(None)),
+                idRoom, since, until,
+            ).subquery()
+
+            # Número y media por sala con GROUP BY, y sobre todas las salas
+            groups = (
+                session.query(durations.c.idRoom, func.count(), func.avg(durations.c.seconds))
+                .group_by(durations.c.idRoom)
+                .all()
+            )
+            total, mean = session.query(func.count(), func.avg(durations.c.seconds)).one()
+
+            # El percentil 95 con funciones de ventana: solo vuelve una fila por sala y la del total
+            ranked = session.query(
+                durations.c.idRoom,
+                durations.c.seconds,
+                func.row_number().over(partition_by=durations.c.idRoom, order_by=durations.c.seconds).label("rank"),
+                func.count().over(partition_by=durations.c.idRoom).label("size"),
+                func.row_number().over(order_by=durations.c.seconds).label("overallRank"),
+                func.count().over().label("overallSize"),
+            ).subquery()
+            p95 = {}
+            overall_p95 = None
+            for row in session.query(ranked).filter(or_(
+                _is_p95(ranked.c.rank, ranked.c.size), _is_p95(ranked.c.overallRank, ranked.c.overallSize)
+            )):
+                if _p95_row(row.rank, row.size):
+                    p95[row.idRoom] = row.seconds
+                if _p95_row(row.overallRank, row.overallSize):
+                    overall_p95 = row.seconds
+
+            rooms = [
+                {"idRoom": room, "count": count, "meanSeconds": float(average), "p95Seconds": float(p95[room])}
+                for room, count, average in sorted(groups, key=lambda group: (group[0] is None, group[0] or 0))
+            ]
+            overall = {"count": total, "meanSeconds": float(mean), "p95Seconds": float(overall_p95)} if total else None
+            return {"status": "ok", "rooms": rooms, "overall": overall}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def list_open_alarms(self, idRoom=None, session=None):
+        """
+        Lists the alarms that have not ended, from the in-memory open alarm set.
+
+        The database is only queried when the set has to be (re)loaded, so the
+        cost does not depend on the size of the alarm history.
+
+        Args:
+            idRoom (int, optional): Only the alarms of this room.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "alarms": [{"idAlarm": <id>, "idRoom": <room>, "start": <start>}], "rooms": {<idRoom>: <count>}}:
+                Open alarms, oldest first, and the number open in each room.
+                - {"status": "error", "message": <error_message>}:
+                If an error occurs while loading the set.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            alarms = self.open_alarms.list(session, idRoom)
+            counts = self.open_alarms.counts(session)
+            if idRoom is not None:
+                counts = {idRoom: counts[idRoom]} if idRoom in counts else {}
+            return {"status": "ok", "alarms": alarms, "rooms": counts}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def load_open_alarms(self, session=None) -> int:
+        """
+        Loads the open alarm set, so the first request does not pay for it.
+
+        Returns:
+            int: Number of open alarms.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            return self.open_alarms.reload(session)
+        finally:
+            session.close()
+
+    def export_alarms(self, session=None):
+        """
+        Streams every alarm in the database for the export endpoints.
+
+        The rows are read through a server-side cursor in chunks of
+        `EXPORT_CHUNK_SIZE`, ordered by `idAlarm`, so memory use does not grow
+        with the size of the table. Only the columns in `EXPORT_FIELDS` are read
+        and no ORM objects are built.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Yields:
+            list[dict]: The next chunk of alarms, keyed by column name.
+
+        Notes:
+            - This is a generator: the query runs when iteration starts, and the
+            session is closed when it ends or the generator is closed.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+        try:
+            statement = select(*(getattr(Alarm, field) for field in self.EXPORT_FIELDS)).order_by(Alarm.idAlarm)
+            yield from stream_chunks(session, statement)
+        finally:
+            session.close()
+
+    def list_alarms(self, session=None, limit=None, cursor=None, idRoom=None, since=None, until=None):
         """
         Lists all alarms in the database.
 
@@ -235,6 +611,12 @@ class AlarmController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of alarms to return. When `limit` and
+                `cursor` are both None every alarm is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
+            idRoom (int, optional): Only the alarms of this room.
+            since (datetime, optional): Only the alarms that started at or after this time.
+            until (datetime, optional): Only the alarms that started before this time.
 
         Returns:
             dict: Result of the operation.
@@ -247,6 +629,8 @@ class AlarmController:
                     - createDate (str, optional): The creation date of the alarm in ISO 8601 format.
                 - {"status": "ok", "alarms": []}:
                 If no alarms are found in the database.
+                When paginating, the result also contains `next_cursor`, the token of the
+                next page (None on the last page).
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs during the operation.
 
@@ -259,9 +643,11 @@ class AlarmController:
 
         try:
             # Obtener todas las alarmas de la base de datos
-            alarms = session.query(Alarm).all()
+            query = self._filter(session.query(Alarm), idRoom, since, until)
+            alarms, next_cursor = paginate(query, Alarm.idAlarm, limit, cursor)
+            paginated = limit is not None or cursor is not None
             
-            if not alarms:
+            if not alarms and not paginated:
                 return {"status": "ok", "alarms": []}
 
             alarms_data = [
@@ -275,6 +661,8 @@ class AlarmController:
                 for alarm in alarms
             ]
             
+            if paginated:
+                return {"status": "ok", "alarms": alarms_data, "next_cursor": next_cursor}
             return {"status": "ok", "alarms": alarms_data}
 
         except Exception as e:
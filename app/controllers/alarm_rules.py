@@ -0,0 +1,226 @@
+from app.controllers.ingest import ReadingBuffer
+from app.mysql.alarm import Alarm
+from app.mysql.room import Room
+from app.mysql.shelter_reading import METRICS
+from sqlalchemy import select
+import logging
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+_RULE = re.compile(r"^\s*(\w+)\s*([<>])\s*(-?\d+)\s*:\s*(-?\d+)\s*(?:@\s*(\d+))?\s*$")
+
+
+class AlarmRule:
+    """
+    Threshold with hysteresis on one shelter level.
+
+    An alarm opens when a reading reaches `threshold` and stays open until a
+    reading is back past `clear`, on the safe side of the threshold. The gap
+    between the two keeps a level that hovers around the threshold from
+    opening and closing alarms on every reading.
+
+    Attributes:
+        metric (int): Code of the level, see `METRICS`.
+        above (bool): True if high values are dangerous (radiation), False if low ones are (energy, water).
+        threshold (int): Value that opens the alarm.
+        clear (int): Value that closes it.
+        idRoom (int): Room the alarms are raised in.
+    """
+
+    def __init__(self, metric: str, above: bool, threshold: int, clear: int, idRoom: int) -> None:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'.")
+        if (clear >= threshold) if above else (clear <= threshold):
+            raise ValueError(f"The clear value of the {metric} rule must be on the safe side of its threshold.")
+        self.metric = METRICS[metric]
+        self.above = above
+        self.threshold = threshold
+        self.clear = clear
+        self.idRoom = idRoom
+
+    def trips(self, value: int) -> bool:
+        return value >= self.threshold if self.above else value <= self.threshold
+
+    def clears(self, value: int) -> bool:
+        return value <= self.clear if self.above else value >= self.clear
+
+
+def parse_rules(spec: str, idRoom: int) -> list:
+    """
+    Parses the ALARM_RULES setting.
+
+    The setting is a comma-separated list of `<metric><op><threshold>:<clear>[@<idRoom>]`,
+    e.g. "radiation>50:40,energy<20:25@3". `>` opens the alarm when the level
+    rises to the threshold and `<` when it falls to it.
+
+    Args:
+        spec (str): The setting.
+        idRoom (int): Room of the rules that do not name one.
+
+    Returns:
+        list[AlarmRule]: The rules, at most one per metric.
+
+    Raises:
+        ValueError: If a rule is malformed or a metric has two rules.
+    """
+    rules = {}
+    for part in filter(str.strip, spec.split(",")):
+        match = _RULE.match(part)
+        if match is None:
+            raise ValueError(f"Invalid alarm rule '{part.strip()}'.")
+        metric, op, threshold, clear, room = match.groups()
+        rule = AlarmRule(metric, op == ">", int(threshold), int(clear), int(room) if room else idRoom)
+        if rule.metric in rules:
+            raise ValueError(f"The {metric} level has more than one alarm rule.")
+        rules[rule.metric] = rule
+    return list(rules.values())
+
+
+class AlarmRuleEngine:
+    """
+    Evaluates the shelter level readings against the alarm rules, off the request path.
+
+    The shelter controller hands over every reading once it is committed
+    (`submit` only appends to a buffer) and a background task evaluates the
+    buffered batch every ALARM_RULES_INTERVAL seconds through
+    `AlarmController.evaluate_alarm_rules`, which writes the resulting
+    openings and closings in one transaction.
+
+    Each batch is grouped by series (shelter and level) and a series whose
+    extreme value in the batch cannot change its state (no reading reaches the
+    threshold while closed, or the clear value while open) is skipped without
+    looking at its readings one by one; only series that cross a boundary are
+    replayed in time order.
+
+    The engine remembers the alarm open for each series. After a restart, the
+    open rule alarms are reloaded from the database on the first evaluation.
+
+    Attributes:
+        rules (dict): Mapping of metric code to `AlarmRule`.
+        pending (ReadingBuffer): Committed readings waiting to be evaluated.
+    """
+
+    def __init__(self, rules, max_size: int) -> None:
+        self.rules = {rule.metric: rule for rule in rules}
+        self.pending = ReadingBuffer(max_size)
+        self._lock = threading.Lock()
+        self._open = None
+        self._seen = {}
+
+    def submit(self, readings) -> None:
+        """
+        Buffers committed readings for the next evaluation; readings without a rule are ignored.
+
+        Args:
+            readings (list[tuple]): (idShelter, metric code, takenAt in ms, value) tuples.
+        """
+        readings = [reading for reading in readings if reading[1] in self.rules]
+        if readings and not self.pending.add(readings):
+            logger.warning("Alarm rule buffer full, %d readings not evaluated", len(readings))
+
+    @property
+    def loaded(self) -> bool:
+        return self._open is not None
+
+    def load(self, session) -> dict:
+        """
+        Loads the open rule alarms, and disables the rules whose room does not exist.
+
+        Args:
+            session (Session): Session used for the queries.
+
+        Returns:
+            dict: Mapping of (idShelter, metric code) to the idAlarm open for it.
+        """
+        rooms = {rule.idRoom for rule in self.rules.values()}
+        existing = set(session.execute(select(Room.idRoom).where(Room.idRoom.in_(rooms))).scalars()) if rooms else set()
+        for metric, rule in list(self.rules.items()):
+            if rule.idRoom not in existing:
+                logger.warning("Alarm rule disabled: room %s does not exist", rule.idRoom)
+                del self.rules[metric]
+
+        rows = (
+            session.query(Room.idShelter, Alarm.metric, Alarm.idAlarm)
+            .join(Room, Room.idRoom == Alarm.idRoom)
+            .filter(Alarm.end.is_(None), Alarm.metric.isnot(None))
+            .order_by(Alarm.idAlarm)
+            .all()
+        )
+        with self._lock:
+            self._open = {(idShelter, metric): idAlarm for idShelter, metric, idAlarm in rows}
+            return dict(self._open)
+
+    def open_alarms(self) -> dict:
+        """
+        Returns a copy of the mapping of (idShelter, metric code) to the open idAlarm.
+        """
+        with self._lock:
+            return dict(self._open or {})
+
+    def evaluate(self, readings) -> tuple:
+        """
+        Computes the alarm openings and closings caused by a batch of readings.
+
+        Nothing is changed here; the caller writes the transitions and then
+        calls `commit` with the resulting state.
+
+        Args:
+            readings (list[tuple]): (idShelter, metric code, takenAt in ms, value) tuples.
+
+        Returns:
+            tuple: (list of ("open" | "close", (idShelter, metric code), takenAt, value)
+                transitions in time order within each series, mapping of each
+                evaluated series to its newest reading time).
+        """
+        series = {}
+        for idShelter, metric, takenAt, value in readings:
+            rule = self.rules.get(metric)
+            key = (idShelter, metric)
+            # Lecturas anteriores a las ya evaluadas llegan tarde: no reabren ni cierran nada
+            if rule is not None and takenAt > self._seen.get(key, -1):
+                series.setdefault(key, []).append((takenAt, value))
+
+        with self._lock:
+            opened = {key for key in series if key in (self._open or {})}
+
+        transitions = []
+        for key, points in series.items():
+            rule = self.rules[key[1]]
+            is_open = key in opened
+            values = [value for _, value in points]
+            # El valor extremo del lote decide si la serie puede cambiar de estado
+            worst = max(values) if rule.above else min(values)
+            best = min(values) if rule.above else max(values)
+            if (not is_open and not rule.trips(worst)) or (is_open and not rule.clears(best)):
+                continue
+            for takenAt, value in sorted(points):
+                if not is_open and rule.trips(value):
+                    is_open = True
+                    transitions.append(("open", key, takenAt, value))
+                elif is_open and rule.clears(value):
+                    is_open = False
+                    transitions.append(("close", key, takenAt, value))
+        seen = {key: max(takenAt for takenAt, _ in points) for key, points in series.items()}
+        return transitions, seen
+
+    def commit(self, changes: dict, seen: dict) -> None:
+        """
+        Applies the state left by a written batch.
+
+        Args:
+            changes (dict): Mapping of (idShelter, metric code) to the idAlarm now open, or None if closed.
+            seen (dict): Mapping of (idShelter, metric code) to the newest reading time evaluated.
+        """
+        with self._lock:
+            for key, idAlarm in changes.items():
+                if idAlarm is None:
+                    self._open.pop(key, None)
+                else:
+                    self._open[key] = idAlarm
+            for key, takenAt in seen.items():
+                if takenAt > self._seen.get(key, -1):
+                    self._seen[key] = takenAt
@@ -0,0 +1,121 @@
+from app.mysql.mysql import pending_on_commit
+from app.mysql.alarm import Alarm
+from datetime import timedelta
+import threading
+
+
+# Marca las salas ya consultadas que no tienen alarmas
+_NONE = object()
+
+
+class AlarmCoalescer:
+    """
+    Remembers the latest API alarm of each room to merge alarms that repeat within a window.
+
+    A flapping sensor raises the same alarm over and over. When a new alarm
+    for a room starts at most `window` seconds after the latest alarm of that
+    room (its end, or its latest repetition while it is still open), the
+    latest alarm is extended instead of inserting a new row: an open alarm
+    absorbs the repetition without any write, and a closed one gets its end
+    moved (or is reopened) with one UPDATE.
+
+    The decision is a dictionary lookup. A room is read from the database
+    (one lookup on the (idRoom, start) index) only the first time it is
+    seen. Like the other in-memory structures, changes are applied once the
+    session that makes them commits. Alarms opened by the threshold rules are
+    not merged with API alarms.
+
+    Merging is opt-in (ALARM_COALESCE_SECONDS defaults to 0). A merged alarm
+    keeps the id of the alarm it extends, so an `idAlarm` chosen by the client
+    is dropped.
+
+    Attributes:
+        window (float): Seconds within which a repeated alarm is merged; 0 disables merging.
+    """
+
+    def __init__(self, window: float = 0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent = {}
+
+    def merge(self, session, idRoom: int, start, end):
+        """
+        Decides whether a new alarm extends the latest alarm of its room.
+
+        Args:
+            session (Session): Session used to read the room if it was not seen yet.
+            idRoom (int): Room of the new alarm.
+            start (datetime): Start of the new alarm.
+            end (datetime, optional): End of the new alarm, None if it is still on.
+
+        A repetition that leaves the alarm as it is is recorded at once, since
+        nothing is written for it; a new end is applied when `session` commits.
+
+        Returns:
+            tuple: (idAlarm, new end, whether the end changed) of the alarm to extend,
+                or None if the new alarm must be inserted.
+        """
+        if self.window <= 0 or start is None:
+            return None
+        latest = self._latest(session, idRoom)
+        if latest is _NONE:
+            return None
+        idAlarm, first, last, until = latest
+        if start < first:
+            return None
+        reference = last if until is None else max(until, last)
+        if start - reference > timedelta(seconds=self.window):
+            return None
+
+        # Sigue abierta si cualquiera de las dos lo está; si no, termina con la última
+        new_end = None if until is None or end is None else max(until, end)
+        change = (idRoom, idAlarm, first, max(last, start), new_end)
+        if new_end == until:
+            # La fila no cambia y no habrá commit: la repetición se anota ya en memoria
+            self._apply([change])
+        else:
+            pending_on_commit(session, self._apply, list).append(change)
+        return idAlarm, new_end, new_end != until
+
+    def record(self, session, idAlarm: int, idRoom: int, start, end) -> None:
+        """
+        Records a newly inserted alarm as the latest of its room, applied when `session` commits.
+        """
+        if self.window > 0 and start is not None:
+            pending_on_commit(session, self._apply, list).append((idRoom, idAlarm, start, start, end))
+
+    def ended(self, session, idAlarm: int, idRoom: int, end) -> None:
+        """
+        Records a new end for an alarm, applied when `session` commits if it is still the latest of its room.
+        """
+        if self.window > 0:
+            pending_on_commit(session, self._apply, list).append((idRoom, idAlarm, None, None, end))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+
+    def _latest(self, session, idRoom):
+        latest = self._recent.get(idRoom)
+        if latest is not None:
+            return latest
+        row = (
+            session.query(Alarm.idAlarm, Alarm.start, Alarm.end)
+            .filter(Alarm.idRoom == idRoom, Alarm.metric.is_(None), Alarm.start.isnot(None))
+            .order_by(Alarm.start.desc(), Alarm.idAlarm.desc())
+            .first()
+        )
+        latest = _NONE if row is None else (row.idAlarm, row.start, row.start, row.end)
+        with self._lock:
+            return self._recent.setdefault(idRoom, latest)
+
+    def _apply(self, pending: list) -> None:
+        with self._lock:
+            for idRoom, idAlarm, first, last, until in pending:
+                current = self._recent.get(idRoom)
+                if first is None:
+                    # Cambio de fin: solo cuenta si sigue siendo la última alarma de la sala
+                    if current is not None and current is not _NONE and current[0] == idAlarm:
+                        self._recent[idRoom] = current[:3] + (until,)
+                elif current is None or current is _NONE or current[0] == idAlarm or first >= current[1]:
+                    self._recent[idRoom] = (idAlarm, first, last, until)
@@ -1,4 +1,6 @@
 from app.mysql.mysql import DatabaseClient
+from app.mysql.change_version import bump_version
+from app.utils.pagination import paginate
 from app.mysql.family import Family  # SQLAlchemy model
 from app.mysql.room import Room  # SQLAlchemy model
 from app.mysql.shelter import Shelter  # SQLAlchemy model
@@ -110,6 +112,7 @@ class FamilyController:
                 createDate=body.createDate
             )
             session.add(new_family)
+            bump_version(session, "family")
             session.commit()
             return {"status": "ok"}
         except SQLAlchemyError as e:
@@ -163,6 +166,7 @@ class FamilyController:
 
             # Si no hay miembros, procedemos a eliminar la familia
             session.delete(family)
+            bump_version(session, "family")
             session.commit()
 
             return {"status": "ok", "message": "Family deleted successfully"}
@@ -177,7 +181,7 @@ class FamilyController:
             if session:
                 session.close()
     
-    def listFamilies(self, session=None):
+    def listFamilies(self, session=None, limit=None, cursor=None):
         """
         Lists all families registered in the database.
 
@@ -187,6 +191,9 @@ class FamilyController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of families to return. When `limit` and
+                `cursor` are both None every family is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
 
         Returns:
             dict: Result of the operation.
@@ -198,6 +205,8 @@ class FamilyController:
                     - idShelter (int): The unique identifier of the shelter associated with the family.
                     - createdBy (int): The ID of the admin who created the family.
                     - createDate (str, optional): The date the family was created, in ISO 8601 format.
+                When paginating, the result also contains `next_cursor`, the token of the
+                next page (None on the last page).
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs during the operation.
 
@@ -210,7 +219,8 @@ class FamilyController:
 
         try:
             # Consulta todas las familias
-            families = session.query(Family).all()
+            families, next_cursor = paginate(session.query(Family), Family.idFamily, limit, cursor)
+            paginated = limit is not None or cursor is not None
 
             # Convertimos el resultado en una lista de diccionarios con los atributos deseados
             families_list = [
@@ -225,6 +235,8 @@ class FamilyController:
                 for family in families
             ]
 
+            if paginated:
+                return {"status": "ok", "families": families_list, "next_cursor": next_cursor}
             return {"status": "ok", "families": families_list}
 
         except Exception as e:
@@ -5,16 +5,12 @@ from app.controllers.shelter_controller import ShelterController
 from app.controllers.machine_controller import MachineController
 from app.controllers.alarm_controller import AlarmController
 from app.controllers.admin_controller import AdminController
-
-
-# Crear instancias de los controladores
-resident_controller = ResidentController()
-room_controller = RoomController()
-family_controller = FamilyController()
-shelter_controller = ShelterController()
-machine_controller = MachineController()
-alarm_controller = AlarmController()
-admin_controller = AdminController()
+from app.controllers.occupancy import RoomOccupancy
+from app.controllers.alarm_rules import AlarmRuleEngine, parse_rules
+from app.controllers.open_alarms import OpenAlarmIndex
+from app.utils.events import EventBroadcaster
+import app.utils.vars as gb
+from functools import cached_property
 
 
 class Controllers:
@@ -24,150 +20,258 @@ class Controllers:
     This class serves as an entry point for various operations, handling 
     tasks related to admins, alarms, families, machines, residents, rooms, shelters
     and system health by delegating requests to the appropriate specialized controllers.
+
+    The specialized controllers are created the first time they are used, so
+    building this class (and importing `app.main`) does no database work.
+    The resident and room controllers share one `RoomOccupancy` counter, and
+    the shelter and alarm controllers publish their changes to `events` and
+    share the `alarm_rules` engine that turns level readings into alarms.
     """
     def __init__(self) -> None:
         pass
 
+    @cached_property
+    def room_occupancy(self):
+        return RoomOccupancy(gb.ROOM_OCCUPANCY_RECONCILE_SECONDS)
+
+    @cached_property
+    def events(self):
+        return EventBroadcaster(gb.EVENTS_QUEUE_SIZE)
+
+    @cached_property
+    def alarm_rules(self):
+        return AlarmRuleEngine(parse_rules(gb.ALARM_RULES, gb.ALARM_RULES_ROOM), gb.ALARM_RULES_MAX_BUFFER)
+
+    @cached_property
+    def open_alarms(self):
+        return OpenAlarmIndex(gb.OPEN_ALARMS_RECONCILE_SECONDS)
+
+    @cached_property
+    def resident_controller(self):
+        return ResidentController(occupancy=self.room_occupancy)
+
+    @cached_property
+    def room_controller(self):
+        return RoomController(occupancy=self.room_occupancy)
+
+    @cached_property
+    def family_controller(self):
+        return FamilyController()
+
+    @cached_property
+    def shelter_controller(self):
+        return ShelterController(events=self.events, rules=self.alarm_rules)
+
+    @cached_property
+    def machine_controller(self):
+        return MachineController()
+
+    @cached_property
+    def alarm_controller(self):
+        return AlarmController(events=self.events, rules=self.alarm_rules, open_alarms=self.open_alarms)
+
+    @cached_property
+    def admin_controller(self):
+        return AdminController()
+
     def healthz(self):
         return {"status": "ok"}
     
     def create_resident(self, body, session=None):
-        return resident_controller.create_resident(body, session)
+        return self.resident_controller.create_resident(body, session)
+
+    def import_residents(self, rows, session=None):
+        return self.resident_controller.import_residents(rows, session)
 
     def delete_resident(self, idResident, session=None):
-        return resident_controller.delete_resident(idResident, session)
+        return self.resident_controller.delete_resident(idResident, session)
 
     def update_resident(self, idResident, updates, session=None):
-        return resident_controller.update_resident(idResident, updates, session)
+        return self.resident_controller.update_resident(idResident, updates, session)
+
+    def patch_resident(self, idResident, changes, session=None):
+        return self.resident_controller.patch_resident(idResident, changes, session)
+
+    def patch_residents(self, patches, session=None):
+        return self.resident_controller.patch_residents(patches, session)
 
     def create_room(self, body, session=None):
-        return room_controller.create_room(body, session)
+        return self.room_controller.create_room(body, session)
 
     def list_rooms_with_resident_count(self, session=None):
-        return room_controller.list_rooms_with_resident_count(session)
+        return self.room_controller.list_rooms_with_resident_count(session)
 
     def access_room(self, idResident, idRoom, session=None):
-        return room_controller.access_room(idResident, idRoom, session)
+        return self.room_controller.access_room(idResident, idRoom, session)
 
     def create_family(self, body, session=None):
-        return family_controller.create_family(body, session)
+        return self.family_controller.create_family(body, session)
+
+    def ingest_readings(self, items):
+        return self.shelter_controller.ingest_readings(items)
+
+    def flush_readings(self, session=None):
+        return self.shelter_controller.flush_readings(session)
+
+    def prune_old_readings(self, session=None):
+        return self.shelter_controller.prune_old_readings(session)
+
+    def get_level_history(self, metric, start=None, end=None, points=None, session=None):
+        return self.shelter_controller.get_level_history(metric, start, end, points, session=session)
 
     def get_shelter_energy_level(self, session=None):
-        return shelter_controller.get_shelter_energy_level(session)
+        return self.shelter_controller.get_shelter_energy_level(session)
 
     def get_shelter_water_level(self, session=None):
-        return shelter_controller.get_shelter_water_level(session)
+        return self.shelter_controller.get_shelter_water_level(session)
 
     def get_shelter_radiation_level(self, session=None):
-        return shelter_controller.get_shelter_radiation_level(session)
+        return self.shelter_controller.get_shelter_radiation_level(session)
 
     def create_machine(self, body, session=None):
-        return machine_controller.create_machine(body, session)
+        return self.machine_controller.create_machine(body, session)
 
     def create_alarm(self, body, session=None):
-        return alarm_controller.create_alarm(body, session)
+        return self.alarm_controller.create_alarm(body, session)
+
+    def list_open_alarms(self, idRoom=None, session=None):
+        return self.alarm_controller.list_open_alarms(idRoom, session)
+
+    def load_open_alarms(self):
+        return self.alarm_controller.load_open_alarms()
+
+    def evaluate_alarm_rules(self, session=None):
+        return self.alarm_controller.evaluate_alarm_rules(session)
 
     def create_admin(self, admin_data, session=None):
-        return admin_controller.create_admin(admin_data, session)
+        return self.admin_controller.create_admin(admin_data, session)
 
-    def list_residents_in_room(self, idRoom, session=None):
-        return resident_controller.list_residents_in_room(idRoom, session)
+    def list_residents_in_room(self, idRoom, session=None, fields=None):
+        return self.resident_controller.list_residents_in_room(idRoom, session, fields=fields)
     
-    def list_residents(self, session=None):
-        return resident_controller.list_residents(session)
+    def list_residents(self, session=None, limit=None, cursor=None, fields=None):
+        return self.resident_controller.list_residents(session, limit=limit, cursor=cursor, fields=fields)
+
+    def export_residents(self, session=None):
+        return self.resident_controller.export_residents(session)
+
+    def search_residents(self, query, limit=10, fuzzy=False, session=None):
+        return self.resident_controller.search_residents(query, limit, fuzzy, session)
+
+    def build_search_index(self):
+        return self.resident_controller.build_search_index()
 
     def login(self, name, surname, session=None):
-        return resident_controller.login(name, surname, session)
+        return self.resident_controller.login(name, surname, session)
 
     def loginAdmin(self, email, password, session=None):
-        return admin_controller.loginAdmin(email, password,session)
+        return self.admin_controller.loginAdmin(email, password,session)
     
-    def list_rooms(self, session=None):
-        return room_controller.list_rooms(session)
+    def list_rooms(self, session=None, limit=None, cursor=None, fields=None):
+        return self.room_controller.list_rooms(session, limit=limit, cursor=cursor, fields=fields)
     
     def list_rooms_Room(self, session=None):
-        return room_controller.list_rooms_Room(session)
+        return self.room_controller.list_rooms_Room(session)
     
     def deleteAdmin(self, admin_id, session=None):
-        return admin_controller.deleteAdmin(admin_id, session)
+        return self.admin_controller.deleteAdmin(admin_id, session)
     
-    def listAdmins(self, session=None):
-        return admin_controller.listAdmins(session)
+    def listAdmins(self, session=None, limit=None, cursor=None, fields=None):
+        return self.admin_controller.listAdmins(session, limit=limit, cursor=cursor, fields=fields)
 
     def getAdminById(self, admin_id, session=None):
-        return admin_controller.getAdminById(admin_id, session)
+        return self.admin_controller.getAdminById(admin_id, session)
     
     def updateAdminPassword(self, idAdmin, new_password, session=None):
-        return admin_controller.updateAdminPassword(idAdmin, new_password, session)
+        return self.admin_controller.updateAdminPassword(idAdmin, new_password, session)
     
     def updateAdminEmail(self, idAdmin, new_email, session=None):
-        return admin_controller.updateAdminEmail(idAdmin, new_email, session)
+        return self.admin_controller.updateAdminEmail(idAdmin, new_email, session)
     
     def updateAdminName(self, idAdmin, new_name, session=None):
-        return admin_controller.updateAdminName(idAdmin, new_name, session)
+        return self.admin_controller.updateAdminName(idAdmin, new_name, session)
     
     def updateShelterEnergyLevel(self, new_energy_level, session=None):
-        return shelter_controller.updateShelterEnergyLevel(new_energy_level, session)
+        return self.shelter_controller.updateShelterEnergyLevel(new_energy_level, session)
     
     def updateShelterWaterLevel(self, new_water_level, session=None):
-        return shelter_controller.updateShelterWaterLevel(new_water_level, session)
+        return self.shelter_controller.updateShelterWaterLevel(new_water_level, session)
     
     def updateShelterRadiationLevel(self, new_radiation_level, session=None):
-        return shelter_controller.updateShelterRadiationLevel(new_radiation_level, session)
+        return self.shelter_controller.updateShelterRadiationLevel(new_radiation_level, session)
     
     def updateMachineStatus(self, machine_name, session=None):
-        return machine_controller.updateMachineStatus(machine_name)
+        return self.machine_controller.updateMachineStatus(machine_name, session)
     
     def updateMachineStatusOn(self, machine_name, session=None):
-        return machine_controller.updateMachineStatusOn(machine_name)
+        return self.machine_controller.updateMachineStatusOn(machine_name, session)
     
     def updateResidentRoom(self, resident_id, new_room_id, session=None):
-        return resident_controller.updateResidentRoom(resident_id, new_room_id)
+        return self.resident_controller.updateResidentRoom(resident_id, new_room_id, session)
+
+    def move_residents(self, moves, session=None):
+        return self.resident_controller.move_residents(moves, session)
+
+    def move_family(self, idFamily, idRoom, session=None):
+        # La familia y todos sus miembros cambian de habitación juntos
+        return self.resident_controller.move_residents([{"idFamily": idFamily, "idRoom": idRoom}], session)
     
     def getResidentById(self, idResident, session=None):
-        return resident_controller.getResidentById(idResident, session)
+        return self.resident_controller.getResidentById(idResident, session)
     
     def create_alarmLevel(self, body, session=None):
-        return alarm_controller.create_alarmLevel(body, session)
+        return self.alarm_controller.create_alarmLevel(body, session)
     
     def updateAlarmEndDate(self, idAlarm, new_enddate, session=None):
-        return alarm_controller.updateAlarmEndDate(idAlarm, new_enddate)
+        return self.alarm_controller.updateAlarmEndDate(idAlarm, new_enddate, session)
     
-    def list_alarms(self, session=None):
-        return alarm_controller.list_alarms(session)
+    def list_alarms(self, session=None, limit=None, cursor=None, idRoom=None, since=None, until=None):
+        return self.alarm_controller.list_alarms(session, limit=limit, cursor=cursor, idRoom=idRoom, since=since, until=until)
+
+    def count_alarms(self, bucket="hour", idRoom=None, since=None, until=None, session=None):
+        return self.alarm_controller.count_alarms(bucket, idRoom, since, until, session)
+
+    def alarm_durations(self, idRoom=None, since=None, until=None, session=None):
+        return self.alarm_controller.alarm_durations(idRoom, since, until, session)
+
+    def export_alarms(self, session=None):
+        return self.alarm_controller.export_alarms(session)
     
-    def list_machines(self, session=None):
-        return machine_controller.list_machines(session)
+    def list_machines(self, session=None, limit=None, cursor=None, fields=None):
+        return self.machine_controller.list_machines(session, limit=limit, cursor=cursor, fields=fields)
+
+    def export_machines(self, session=None):
+        return self.machine_controller.export_machines(session)
 
     def deleteMachine(self, machine_id, session=None):
-        return machine_controller.deleteMachine(machine_id,session)
+        return self.machine_controller.deleteMachine(machine_id,session)
     
     def updateMachineDate(self, machine_name, session=None):
-        return machine_controller.updateMachineDate(machine_name,session)
+        return self.machine_controller.updateMachineDate(machine_name,session)
 
     def updateRoomName(self, idRoom, new_name, session=None):
-        return room_controller.updateRoomName(idRoom, new_name,session)
+        return self.room_controller.updateRoomName(idRoom, new_name,session)
     
     def deleteFamily(self, family_id, session=None):
-        return family_controller.deleteFamily(family_id, session)
+        return self.family_controller.deleteFamily(family_id, session)
     
-    def listFamilies(self, session=None):
-        return family_controller.listFamilies(session)
+    def listFamilies(self, session=None, limit=None, cursor=None):
+        return self.family_controller.listFamilies(session, limit=limit, cursor=cursor)
     
     def updateResidentName(self, idResident, new_name, session=None):
-        return resident_controller.updateResidentName(idResident, new_name, session)
+        return self.resident_controller.updateResidentName(idResident, new_name, session)
     
     def updateResidentSurname(self, idResident, new_surname, session=None):
-        return resident_controller.updateResidentSurname(idResident, new_surname, session)
+        return self.resident_controller.updateResidentSurname(idResident, new_surname, session)
     
     def updateResidentBirthDate(self, idResident, new_birthDate, session=None):
-        return resident_controller.updateResidentBirthDate(idResident, new_birthDate, session)
+        return self.resident_controller.updateResidentBirthDate(idResident, new_birthDate, session)
     
     def updateResidentGender(self, idResident, new_gender, session=None):
-        return resident_controller.updateResidentGender(idResident, new_gender,session)
+        return self.resident_controller.updateResidentGender(idResident, new_gender,session)
     
     def getResidentRoomByNameAndSurname(self, name, surname, session=None):
-        return resident_controller.getResidentRoomByNameAndSurname(name, surname,session)
+        return self.resident_controller.getResidentRoomByNameAndSurname(name, surname,session)
     
     def refreshAccessToken(self, refresh_token):
-        return admin_controller.refreshAccessToken(refresh_token)
\ No newline at end of file
+        return self.admin_controller.refreshAccessToken(refresh_token)
\ No newline at end of file
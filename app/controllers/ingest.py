@@ -0,0 +1,151 @@
+from app.mysql.shelter_reading import METRICS
+from collections import deque
+import json
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack es opcional
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+# Columna de Shelter que guarda el último valor de cada métrica
+LEVEL_COLUMNS = {METRICS["energy"]: "energyLevel", METRICS["water"]: "waterLevel", METRICS["radiation"]: "radiationLevel"}
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# idShelter y value son columnas INT de 32 bits con signo
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+# takenAt válido: desde el 1 de enero de 2000 (UTC) hasta un día por delante del reloj del servidor
+MIN_TAKEN_AT = 946684800000
+MAX_CLOCK_SKEW_MS = 24 * 3600 * 1000
+
+
+def decode_body(body: bytes, content_type: str):
+    """
+    Decodes an ingestion request body, JSON or msgpack depending on its content type.
+
+    Raises:
+        ValueError: If the body cannot be decoded.
+    """
+    try:
+        if content_type in MSGPACK_TYPES:
+            return msgpack.unpackb(body)
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(str(e)) from e
+
+
+def parse_readings(items, now_ms=None) -> tuple:
+    """
+    Validates a batch of sensor readings.
+
+    Each reading is either an object `{"idShelter": 1, "metric": "energy",
+    "takenAt": 1704067200000, "value": 80}` or the compact array
+    `[idShelter, metric, takenAt, value]` (or `[idShelter, metric, value]`).
+    `takenAt` is in milliseconds since the epoch (UTC) and defaults to the
+    time of arrival. `idShelter` and `value` must fit a 32-bit signed integer
+    and `takenAt` must fall between 2000-01-01 and one day after `now_ms`, so
+    a reading that the database would refuse never reaches the buffer.
+
+    Args:
+        items (list): Decoded request body.
+        now_ms (int, optional): Arrival time used for readings without `takenAt`.
+
+    Returns:
+        tuple: (list of (idShelter, metric code, takenAt, value) tuples,
+            list of {"index": <position>, "message": <error>} for the rejected readings).
+    """
+    if not isinstance(items, list):
+        return [], [{"index": None, "message": "The body must be a list of readings."}]
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    readings = []
+    errors = []
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            item = (item.get("idShelter"), item.get("metric"), item.get("takenAt"), item.get("value"))
+        elif not isinstance(item, (list, tuple)) or len(item) not in (3, 4):
+            errors.append({"index": index, "message": "A reading must be an object or a 4-item array."})
+            continue
+        idShelter, metric, takenAt, value = item if len(item) == 4 else (item[0], item[1], None, item[2])
+        if metric not in METRICS:
+            errors.append({"index": index, "message": f"Unknown metric '{metric}'."})
+        elif not _is_int(idShelter) or not _is_int(value) or (takenAt is not None and not _is_int(takenAt)):
+            errors.append({"index": index, "message": "idShelter, takenAt and value must be integers."})
+        elif not INT_MIN <= idShelter <= INT_MAX or not INT_MIN <= value <= INT_MAX:
+            errors.append({"index": index, "message": "idShelter and value must fit a 32-bit signed integer."})
+        elif takenAt is not None and not MIN_TAKEN_AT <= takenAt <= now_ms + MAX_CLOCK_SKEW_MS:
+            errors.append({"index": index, "message": "takenAt must be a time in milliseconds between 2000 and now."})
+        else:
+            readings.append((idShelter, METRICS[metric], now_ms if takenAt is None else takenAt, value))
+    return readings, errors
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class ReadingBuffer:
+    """
+    In-process buffer of sensor readings waiting to be written.
+
+    The ingestion endpoint only appends to the buffer, which takes no database
+    work; a background task drains it every INGEST_FLUSH_INTERVAL seconds and
+    writes the whole batch in one transaction (see
+    `ShelterController.flush_readings`). Readings that do not fit in
+    `max_size` are rejected so a database outage cannot exhaust memory.
+
+    Attributes:
+        max_size (int): Largest number of readings held.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._readings = deque()
+
+    def __len__(self) -> int:
+        return len(self._readings)
+
+    def add(self, readings) -> bool:
+        """
+        Buffers a batch of readings, or none of them if they do not all fit.
+
+        Returns:
+            bool: Whether the batch was accepted.
+        """
+        with self._lock:
+            if len(self._readings) + len(readings) > self.max_size:
+                return False
+            self._readings.extend(readings)
+            return True
+
+    def drain(self) -> list:
+        """
+        Removes and returns every buffered reading.
+        """
+        with self._lock:
+            readings = list(self._readings)
+            self._readings.clear()
+            return readings
+
+    def requeue(self, readings) -> None:
+        """
+        Puts back a batch that could not be written, ahead of the newer readings.
+
+        The oldest readings are dropped if the buffer would overflow.
+        """
+        with self._lock:
+            room = self.max_size - len(self._readings)
+            if room <= 0:
+                return
+            self._readings.extendleft(reversed(readings[-room:]))
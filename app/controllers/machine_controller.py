@@ -1,4 +1,9 @@
 from app.mysql.mysql import DatabaseClient
+from app.mysql.change_version import bump_version
+from app.utils.pagination import paginate
+from app.utils.projection import project, resolve_fields, serialize_rows
+from app.utils.export import stream_chunks
+from sqlalchemy import select
 from app.mysql.machine import Machine  # SQLAlchemy model
 from app.mysql.room import Room  # SQLAlchemy model
 from app.mysql.admin import Admin  # SQLAlchemy model
@@ -33,6 +38,10 @@ from sqlalchemy import func
 import os
 
 class MachineController:
+    # Columnas incluidas en las exportaciones, en orden
+    EXPORT_FIELDS = ('idMachine', 'machineName', 'on', 'idRoom', 'createdBy', 'createDate', 'update')
+    # Campos devueltos por los listados cuando no se pide un subconjunto
+    LIST_FIELDS = ('idMachine', 'machineName', 'on', 'idRoom', 'createdBy', 'createDate', 'update')
     
     def __init__(self, db_url=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
@@ -77,8 +86,7 @@ class MachineController:
         """
 
         if session is None:
-            db = DatabaseClient(gb.MYSQL_URL)
-            session = Session(db.engine)
+            session = Session(self.db_client.engine)
 
         try:
             # Check if the room exists
@@ -111,6 +119,7 @@ class MachineController:
             )
 
             session.add(new_machine)
+            bump_version(session, "machine")
             session.commit()
 
             return {"status": "ok"}
@@ -118,8 +127,7 @@ class MachineController:
             session.rollback()
             return {"status": "error", "message": str(e)}
         finally:
-            if session is None:
-                session.close()
+            session.close()
 
     def updateMachineStatus(self, machine_name: str, session=None):
         """
@@ -159,6 +167,7 @@ class MachineController:
             machine.on = False
 
             # Guardar los cambios
+            bump_version(session, "machine")
             session.commit()
 
             return {"status": "ok", "message": f"Estado de la máquina '{machine_name}' actualizado a False"}
@@ -226,6 +235,7 @@ class MachineController:
             machine.on = True
 
             # Guardar los cambios
+            bump_version(session, "machine")
             session.commit()
 
             return {"status": "ok", "message": f"Estado de la máquina '{machine_name}' actualizado a True"}
@@ -244,7 +254,36 @@ class MachineController:
             if session:
                 session.close()
             
-    def list_machines(self, session=None):
+    def export_machines(self, session=None):
+        """
+        Streams every machine in the database for the export endpoints.
+
+        The rows are read through a server-side cursor in chunks of
+        `EXPORT_CHUNK_SIZE`, ordered by `idMachine`, so memory use does not grow
+        with the size of the table. Only the columns in `EXPORT_FIELDS` are read
+        and no ORM objects are built.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Yields:
+            list[dict]: The next chunk of machines, keyed by column name.
+
+        Notes:
+            - This is a generator: the query runs when iteration starts, and the
+            session is closed when it ends or the generator is closed.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+        try:
+            statement = select(*(getattr(Machine, field) for field in self.EXPORT_FIELDS)).order_by(Machine.idMachine)
+            yield from stream_chunks(session, statement)
+        finally:
+            session.close()
+
+    def list_machines(self, session=None, limit=None, cursor=None, fields=None):
         """
         Lists all machines in the database.
 
@@ -254,6 +293,11 @@ class MachineController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of machines to return. When `limit` and
+                `cursor` are both None every machine is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
+            fields (list[str], optional): Sparse fieldset. Only these keys are returned
+                for each machine; defaults to `LIST_FIELDS`.
 
         Returns:
             dict: Result of the operation.
@@ -268,6 +312,8 @@ class MachineController:
                     - update (str, optional): The last update timestamp of the machine, in ISO 8601 format.
                 - {"status": "ok", "machines": []}:
                 If no machines are found in the database.
+                When paginating, the result also contains `next_cursor`, the token of the
+                next page (None on the last page).
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs during the operation.
 
@@ -280,24 +326,18 @@ class MachineController:
 
         try:
             # Obtener todas las máquinas de la base de datos
-            machines = session.query(Machine).all()
+            fields = resolve_fields(fields, self.LIST_FIELDS)
+            query = project(session, Machine, fields, Machine.idMachine)
+            machines, next_cursor = paginate(query, Machine.idMachine, limit, cursor)
+            paginated = limit is not None or cursor is not None
 
-            if not machines:
+            if not machines and not paginated:
                 return {"status": "ok", "machines": []}
 
-            machines_data = [
-                {
-                    "idMachine": machine.idMachine,
-                    "machineName": machine.machineName,
-                    "on": machine.on,
-                    "idRoom": machine.idRoom,
-                    "createdBy": machine.createdBy,
-                    "createDate": machine.createDate.isoformat() if machine.createDate else None,
-                    "update": machine.update.isoformat() if machine.update else None
-                }
-                for machine in machines
-            ]
+            machines_data = serialize_rows(Machine, fields, machines)
             
+            if paginated:
+                return {"status": "ok", "machines": machines_data, "next_cursor": next_cursor}
             return {"status": "ok", "machines": machines_data}
 
         except Exception as e:
@@ -344,6 +384,7 @@ class MachineController:
 
             # Eliminamos la máquina
             session.delete(machine)
+            bump_version(session, "machine")
             session.commit()
 
             return {"status": "ok", "message": "Machine deleted successfully"}
@@ -397,6 +438,7 @@ class MachineController:
             machine.update = date.today()  # Utiliza 'date.today()' para obtener solo la fecha actual
 
             # Guardar los cambios
+            bump_version(session, "machine")
             session.commit()
 
             return {"status": "ok", "message": f"Fecha de la máquina '{machine_name}' actualizada exitosamente"}
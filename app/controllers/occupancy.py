@@ -0,0 +1,130 @@
+from app.mysql.mysql import pending_on_commit
+from app.mysql.resident import Resident
+from sqlalchemy import func
+import threading
+import time
+
+
+class RoomOccupancy:
+    """
+    In-process count of the residents assigned to each room.
+
+    The counts are loaded with a single group-by the first time they are needed
+    and then kept up to date by the controllers that create, delete or move
+    residents, so capacity checks do not have to count the resident table.
+    Changes are recorded against the session that makes them and applied only
+    once that session commits, so a rolled-back write never alters the counts.
+
+    Writes made by other processes (or straight to the database) are picked up
+    when the counts are reconciled, which happens on the first read after
+    `reconcile_interval` seconds. An interval of 0 disables reconciliation.
+
+    Attributes:
+        reconcile_interval (float): Seconds between reloads from the database.
+    """
+
+    def __init__(self, reconcile_interval: float = 0):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._counts = None
+        self._loaded_at = 0.0
+
+    def count(self, session, idRoom: int) -> int:
+        """
+        Returns the number of residents in a room.
+
+        Args:
+            session (Session): Session used to load the counts if needed.
+            idRoom (int): The room to look up.
+
+        Returns:
+            int: Residents currently assigned to the room.
+        """
+        return self._get_counts(session).get(idRoom, 0)
+
+    def counts(self, session) -> dict:
+        """
+        Returns a copy of the resident count of every occupied room.
+
+        Args:
+            session (Session): Session used to load the counts if needed.
+
+        Returns:
+            dict: Mapping of idRoom to number of residents.
+        """
+        counts = self._get_counts(session)
+        with self._lock:
+            return dict(counts)
+
+    def add(self, session, idRoom, delta: int = 1) -> None:
+        """
+        Records a change in the occupancy of a room, applied when `session` commits.
+
+        Args:
+            session (Session): Session holding the write.
+            idRoom (int): The affected room. None is ignored.
+            delta (int): Residents added (positive) or removed (negative).
+        """
+        if idRoom is None or delta == 0:
+            return
+        pending = pending_on_commit(session, self._apply, dict)
+        pending[idRoom] = pending.get(idRoom, 0) + delta
+
+    def move(self, session, old_idRoom, new_idRoom) -> None:
+        """
+        Records a resident moving from one room to another.
+        """
+        if old_idRoom == new_idRoom:
+            return
+        self.add(session, old_idRoom, -1)
+        self.add(session, new_idRoom, 1)
+
+    def reconcile(self, session) -> dict:
+        """
+        Reloads the counts from the database.
+
+        The query also sees the uncommitted changes of `session`, so the changes
+        it has pending here are subtracted; they are added back on commit.
+
+        Args:
+            session (Session): Session used for the query.
+
+        Returns:
+            dict: The reloaded counts.
+        """
+        rows = (
+            session.query(Resident.idRoom, func.count(Resident.idResident))
+            .filter(Resident.idRoom.isnot(None))
+            .group_by(Resident.idRoom)
+            .all()
+        )
+        counts = {idRoom: total for idRoom, total in rows}
+        for idRoom, delta in (pending_on_commit(session, self._apply) or {}).items():
+            counts[idRoom] = counts.get(idRoom, 0) - delta
+
+        with self._lock:
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+        return counts
+
+    def invalidate(self) -> None:
+        """
+        Drops the counts so the next read reloads them.
+        """
+        with self._lock:
+            self._counts = None
+
+    def _get_counts(self, session) -> dict:
+        counts = self._counts
+        if counts is None:
+            return self.reconcile(session)
+        if self.reconcile_interval and time.monotonic() - self._loaded_at > self.reconcile_interval:
+            return self.reconcile(session)
+        return counts
+
+    def _apply(self, pending: dict) -> None:
+        with self._lock:
+            if self._counts is None:
+                return
+            for idRoom, delta in pending.items():
+                self._counts[idRoom] = max(self._counts.get(idRoom, 0) + delta, 0)
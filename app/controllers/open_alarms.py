@@ -0,0 +1,131 @@
+from app.mysql.mysql import pending_on_commit
+from app.mysql.alarm import Alarm
+import threading
+import time
+
+
+class OpenAlarmIndex:
+    """
+    In-process set of the alarms that have not ended, grouped by room.
+
+    The set is loaded with one query on the `(end, idRoom)` index the first
+    time it is needed (or at startup) and then kept up to date by the alarm
+    controller when alarms are created or closed, so listing the open alarms
+    never reads the alarm history. Like `RoomOccupancy`, changes are recorded
+    against the session that makes them and applied only once it commits.
+    Writes made by other processes are picked up when the set is reconciled,
+    on the first read after `reconcile_interval` seconds. An interval of 0
+    disables reconciliation.
+
+    Attributes:
+        reconcile_interval (float): Seconds between reloads from the database.
+    """
+
+    def __init__(self, reconcile_interval: float = 0):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._rooms = None
+        self._listing = None
+        self._loaded_at = 0.0
+
+    def list(self, session, idRoom=None) -> list:
+        """
+        Returns the open alarms, oldest first.
+
+        Args:
+            session (Session): Session used to load the set if needed.
+            idRoom (int, optional): Only the alarms of this room.
+
+        Returns:
+            list[dict]: Open alarms, with `idAlarm`, `idRoom` and `start`.
+        """
+        self._ensure_loaded(session)
+        with self._lock:
+            if idRoom is not None:
+                alarms = self._rooms.get(idRoom, {})
+                return [
+                    {"idAlarm": idAlarm, "idRoom": idRoom, "start": start}
+                    for idAlarm, start in sorted(alarms.items(), key=_by_start)
+                ]
+            # La lista completa se ordena una sola vez por cada cambio
+            if self._listing is None:
+                self._listing = sorted(
+                    ({"idAlarm": idAlarm, "idRoom": room, "start": start}
+                     for room, alarms in self._rooms.items() for idAlarm, start in alarms.items()),
+                    key=lambda alarm: (alarm["start"] is None, alarm["start"] or 0, alarm["idAlarm"]),
+                )
+            return list(self._listing)
+
+    def counts(self, session) -> dict:
+        """
+        Returns the number of open alarms of every room that has any.
+        """
+        self._ensure_loaded(session)
+        with self._lock:
+            return {idRoom: len(alarms) for idRoom, alarms in self._rooms.items() if alarms}
+
+    def opened(self, session, idAlarm: int, idRoom: int, start) -> None:
+        """
+        Records an alarm without an end, applied when `session` commits.
+        """
+        pending_on_commit(session, self._apply, list).append((idAlarm, idRoom, start, True))
+
+    def closed(self, session, idAlarm: int, idRoom: int) -> None:
+        """
+        Records that an alarm got an end, applied when `session` commits.
+        """
+        pending_on_commit(session, self._apply, list).append((idAlarm, idRoom, None, False))
+
+    def reload(self, session) -> int:
+        """
+        Reloads the open alarms from the database.
+
+        Args:
+            session (Session): Session used for the query.
+
+        Returns:
+            int: Number of open alarms.
+        """
+        rows = session.query(Alarm.idAlarm, Alarm.idRoom, Alarm.start).filter(Alarm.end.is_(None)).all()
+        rooms = {}
+        for idAlarm, idRoom, start in rows:
+            rooms.setdefault(idRoom, {})[idAlarm] = start
+        with self._lock:
+            self._rooms = rooms
+            self._listing = None
+            self._loaded_at = time.monotonic()
+        return len(rows)
+
+    def invalidate(self) -> None:
+        """
+        Drops the set so the next read reloads it.
+        """
+        with self._lock:
+            self._rooms = None
+            self._listing = None
+
+    def _ensure_loaded(self, session) -> None:
+        if self._rooms is None:
+            self.reload(session)
+        elif self.reconcile_interval and time.monotonic() - self._loaded_at > self.reconcile_interval:
+            self.reload(session)
+
+    def _apply(self, pending: list) -> None:
+        with self._lock:
+            if self._rooms is None:
+                return
+            for idAlarm, idRoom, start, is_open in pending:
+                if is_open:
+                    self._rooms.setdefault(idRoom, {})[idAlarm] = start
+                else:
+                    alarms = self._rooms.get(idRoom)
+                    if alarms is not None:
+                        alarms.pop(idAlarm, None)
+                        if not alarms:
+                            del self._rooms[idRoom]
+            self._listing = None
+
+
+def _by_start(item):
+    idAlarm, start = item
+    return (start is None, start or 0, idAlarm)
@@ -1,4 +1,11 @@
 from app.mysql.mysql import DatabaseClient
+from app.controllers.occupancy import RoomOccupancy
+from app.controllers.search_index import ResidentSearchIndex
+from app.mysql.change_version import bump_version
+from app.utils.pagination import paginate
+from app.utils.projection import project, resolve_fields, serialize_rows
+from app.utils.export import stream_chunks
+from sqlalchemy import bindparam, select, update
 from app.mysql.resident import Resident
 from app.mysql.room import Room
 from app.mysql.shelter import Shelter
@@ -10,6 +17,7 @@ from app.models.resident import Resident as ResidentModel  # Import Pydantic mod
 import app.utils.vars as gb
 import os
 from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
 from datetime import datetime
 from datetime import date
 import app.models.resident as resident
@@ -38,12 +46,23 @@ from sqlalchemy import func
 
 
 class ResidentController:
-    def __init__(self, db_url=None):
+    # Columnas incluidas en las exportaciones, en orden
+    EXPORT_FIELDS = ('idResident', 'name', 'surname', 'birthDate', 'gender', 'createdBy', 'createDate', 'update', 'idFamily', 'idRoom')
+    # Campos devueltos por los listados cuando no se pide un subconjunto
+    LIST_FIELDS = ('idResident', 'name', 'surname', 'birthDate', 'gender', 'idFamily', 'idRoom')
+    # Campos que admiten las actualizaciones parciales
+    PATCH_FIELDS = ('name', 'surname', 'birthDate', 'gender', 'idFamily', 'idRoom')
+
+    def __init__(self, db_url=None, occupancy=None, search_index=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
         self.db_url = db_url or os.getenv("MYSQL_URL")
         if not self.db_url:
             raise ValueError("MYSQL_URL environment variable is not set.")
         self.db_client = DatabaseClient(self.db_url)
+        # Contador de ocupación compartido con RoomController (ver Controllers)
+        self.occupancy = occupancy or RoomOccupancy(gb.ROOM_OCCUPANCY_RECONCILE_SECONDS)
+        # Índice de nombres en memoria para /resident/search
+        self.search_index = search_index or ResidentSearchIndex(gb.SEARCH_INDEX_RELOAD_SECONDS)
 
     def create_resident(self, body: ResidentModel, session=None) -> dict:
 
@@ -114,7 +133,7 @@ class ResidentController:
             # Verificar si la habitación está llena
             room = session.query(Room).filter_by(idRoom=family.idRoom).first()
             if room:
-                current_room_count = session.query(Resident).filter_by(idRoom=family.idRoom).count()
+                current_room_count = self.occupancy.count(session, family.idRoom)
                 if current_room_count >= room.maxPeople:
                     # Buscar la última habitación cuyo nombre empieza con "Room"
                     last_room = session.query(Room).filter(Room.roomName.like("Room%")).order_by(Room.idRoom.desc()).first()
@@ -137,6 +156,7 @@ class ResidentController:
                         createDate=date.today()  # Asignar la fecha de creación
                     )
                     session.add(new_room)
+                    bump_version(session, "room")
                     session.commit()  # Commit para obtener el idRoom asignado
 
                     # Ahora que tenemos el idRoom, podemos actualizar la familia con el nuevo idRoom
@@ -144,6 +164,7 @@ class ResidentController:
                     session.query(Family).filter_by(idFamily=body.idFamily).update(
                         {"idRoom": new_room.idRoom}, synchronize_session=False
                     )
+                    bump_version(session, "family")
                     session.commit()
 
             # Crear un nuevo residente
@@ -158,6 +179,9 @@ class ResidentController:
                 idRoom=family.idRoom,
             )
             session.add(new_resident)
+            session.flush()  # Para obtener el idResident que se indexa
+            self.occupancy.add(session, new_resident.idRoom, 1)
+            self.search_index.add(session, new_resident.idResident, new_resident.name, new_resident.surname)
             session.commit()
             return {"status": "ok"}
         except Exception as e:
@@ -170,6 +194,156 @@ class ResidentController:
 
 
 
+    def import_residents(self, rows, session=None) -> dict:
+        """
+        Creates many residents in one transaction, reporting the rows that fail.
+
+        Applies the same rules as `create_resident` (the family must exist and
+        have a room, duplicates are rejected, full rooms overflow into a new
+        "Room{n}" room), but with a fixed number of queries per batch instead of
+        several per resident: families, duplicates, shelter and room capacity
+        are each read with one set-based query, overflow rooms are created once
+        per family and batch, and the residents are written with a single
+        executemany insert.
+
+        Args:
+            rows (list[dict]): Residents to create, with the fields of the
+                `Resident` model. `createDate` defaults to today.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "imported": <count>, "errors": [{"row": <index>, "message": <error>}]}:
+                The valid rows are created; `row` is the 0-based position of each rejected row.
+                - {"status": "error", "message": <error_message>}:
+                If the batch could not be written; nothing is created.
+
+        Notes:
+            - Shelter capacity is checked against every resident of the shelter,
+            batch included.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+        try:
+            errors = []
+            valid = []
+            for index, row in enumerate(rows):
+                try:
+                    valid.append((index, ResidentModel.parse_obj({"createDate": date.today(), **row})))
+                except (ValidationError, TypeError) as e:
+                    errors.append({"row": index, "message": str(e)})
+
+            # Familias, habitaciones y refugios del lote: una consulta por tabla
+            family_ids = {body.idFamily for _, body in valid}
+            families = {
+                idFamily: [idRoom, idShelter]
+                for idFamily, idRoom, idShelter in session.query(Family.idFamily, Family.idRoom, Family.idShelter)
+                .filter(Family.idFamily.in_(family_ids))
+            }
+            room_ids = {idRoom for idRoom, _ in families.values() if idRoom}
+            shelter_ids = {idShelter for _, idShelter in families.values() if idShelter}
+            room_capacity = dict(session.query(Room.idRoom, Room.maxPeople).filter(Room.idRoom.in_(room_ids)))
+            shelter_capacity = dict(
+                session.query(Shelter.idShelter, Shelter.maxPeople).filter(Shelter.idShelter.in_(shelter_ids))
+            )
+            shelter_counts = dict(
+                session.query(Family.idShelter, func.count(Resident.idResident))
+                .join(Resident, Resident.idFamily == Family.idFamily)
+                .filter(Family.idShelter.in_(shelter_ids))
+                .group_by(Family.idShelter)
+            )
+            existing = set(
+                session.query(Resident.idFamily, Resident.idRoom, Resident.name, Resident.surname)
+                .filter(Resident.idFamily.in_(family_ids))
+            )
+            room_counts = {idRoom: self.occupancy.count(session, idRoom) for idRoom in room_ids}
+
+            # Filas restantes de cada familia, para dimensionar su habitación nueva
+            remaining = {}
+            for _, body in valid:
+                remaining[body.idFamily] = remaining.get(body.idFamily, 0) + 1
+
+            last_room = session.query(Room.roomName).filter(Room.roomName.like("Room%")).order_by(Room.idRoom.desc()).first()
+            next_room_number = int(last_room.roomName.replace("Room", "")) + 1 if last_room else 1
+
+            new_residents = []
+            moved_families = {}
+            today = date.today()
+            for index, body in valid:
+                remaining[body.idFamily] -= 1
+                family = families.get(body.idFamily)
+                if family is None:
+                    errors.append({"row": index, "message": "The family does not exist."})
+                    continue
+                idRoom, idShelter = family
+                if not idRoom:
+                    errors.append({"row": index, "message": "The family does not have an assigned room."})
+                    continue
+                key = (body.idFamily, idRoom, body.name, body.surname)
+                if key in existing:
+                    errors.append({"row": index, "message": "Resident already exists in this room."})
+                    continue
+                if idShelter in shelter_capacity and shelter_counts.get(idShelter, 0) >= shelter_capacity[idShelter]:
+                    errors.append({"row": index, "message": "Shelter is full."})
+                    continue
+
+                if idRoom in room_capacity and room_counts[idRoom] >= room_capacity[idRoom]:
+                    # Una sola habitación nueva por familia y lote, con sitio para el resto de la familia
+                    new_room = Room(
+                        roomName=f"Room{next_room_number}",
+                        idShelter=idShelter,
+                        maxPeople=max(room_counts[idRoom] + 4, remaining[body.idFamily] + 1),
+                        createDate=today,
+                    )
+                    next_room_number += 1
+                    session.add(new_room)
+                    session.flush()  # Para obtener el idRoom asignado
+                    idRoom = family[0] = new_room.idRoom
+                    room_capacity[idRoom] = new_room.maxPeople
+                    room_counts[idRoom] = 0
+                    moved_families[body.idFamily] = idRoom
+                    key = (body.idFamily, idRoom, body.name, body.surname)
+
+                existing.add(key)
+                room_counts[idRoom] += 1
+                shelter_counts[idShelter] = shelter_counts.get(idShelter, 0) + 1
+                new_residents.append({
+                    "name": body.name,
+                    "surname": body.surname,
+                    "birthDate": body.birthDate,
+                    "gender": body.gender,
+                    "createdBy": body.createdBy,
+                    "createDate": body.createDate,
+                    "idFamily": body.idFamily,
+                    "idRoom": idRoom,
+                })
+
+            if moved_families:
+                session.bulk_update_mappings(
+                    Family, [{"idFamily": idFamily, "idRoom": idRoom} for idFamily, idRoom in moved_families.items()]
+                )
+                bump_version(session, "room", "family")
+            if new_residents:
+                session.bulk_insert_mappings(Resident, new_residents)
+                added = {}
+                for resident in new_residents:
+                    added[resident["idRoom"]] = added.get(resident["idRoom"], 0) + 1
+                for idRoom, count in added.items():
+                    self.occupancy.add(session, idRoom, count)
+                # bulk_insert_mappings no devuelve los ids: el índice se recarga entero
+                self.search_index.reload_on_commit(session)
+            session.commit()
+
+            errors.sort(key=lambda error: error["row"])
+            return {"status": "ok", "imported": len(new_residents), "errors": errors}
+        except Exception as e:
+            session.rollback()
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
     def delete_resident(self, idResident: int, session=None):
     
         """
@@ -203,16 +377,20 @@ class ResidentController:
         """
 
         if session is None:
-            db = DatabaseClient(gb.MYSQL_URL)
-            session = Session(db.engine)
+            session = Session(self.db_client.engine)
 
-        resident_to_delete = session.query(Resident).filter_by(idResident=idResident).first()
-        if resident_to_delete:
-            session.delete(resident_to_delete)
-            session.commit()
-            return {"status": "ok"}
-        else:
-            return {"status": "not found"}
+        try:
+            resident_to_delete = session.query(Resident).filter_by(idResident=idResident).first()
+            if resident_to_delete:
+                session.delete(resident_to_delete)
+                self.occupancy.add(session, resident_to_delete.idRoom, -1)
+                self.search_index.remove(session, idResident)
+                session.commit()
+                return {"status": "ok"}
+            else:
+                return {"status": "not found"}
+        finally:
+            session.close()
 
     def update_resident(self, idResident: int, updates: dict, session=None):
 
@@ -258,8 +436,7 @@ class ResidentController:
         """
 
         if session is None:
-            db = DatabaseClient(gb.MYSQL_URL)
-            session = Session(db.engine)
+            session = Session(self.db_client.engine)
 
         try:
             resident_to_update = session.query(Resident).filter_by(idResident=idResident).first()
@@ -267,9 +444,12 @@ class ResidentController:
             if not resident_to_update:
                 return {"status": "not found"}
 
+            old_idRoom = resident_to_update.idRoom
             for field, value in updates.items():
                 if hasattr(resident_to_update, field):
                     setattr(resident_to_update, field, value)
+            self.occupancy.move(session, old_idRoom, resident_to_update.idRoom)
+            self.search_index.rename(session, idResident, updates.get("name"), updates.get("surname"))
 
             session.commit()
             
@@ -278,10 +458,194 @@ class ResidentController:
             session.rollback()
             return {"status": "error", "message": str(e)}
         finally:
-            if session is None:
-                session.close()
+            session.close()
+
+    def search_residents(self, query: str, limit: int = 10, fuzzy: bool = False, session=None):
+        """
+        Searches residents by name and surname with the in-memory index.
+
+        Every word of `query` must be the prefix of a word of the resident's
+        name or surname; with `fuzzy`, small typos are tolerated too. The
+        database is only queried when the index has to be (re)loaded.
+
+        Args:
+            query (str): Words typed by the user, e.g. "jo do".
+            limit (int): Largest number of residents returned.
+            fuzzy (bool): Whether to tolerate typos.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "residents": [{"idResident": <id>, "name": <name>, "surname": <surname>}]}:
+                The best matches, exact prefix matches first.
+                - {"status": "error", "message": <error_message>}:
+                If an error occurs while loading the index.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            return {"status": "ok", "residents": self.search_index.search(session, query, limit, fuzzy)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def build_search_index(self, session=None) -> int:
+        """
+        Loads the resident name search index, so the first search does not pay for it.
+
+        Returns:
+            int: Number of residents indexed.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            return self.search_index.reload(session)
+        finally:
+            session.close()
+
+    def patch_resident(self, idResident: int, changes: dict, session=None):
+        """
+        Applies a partial update to a resident with a single UPDATE statement.
+
+        The resident is not loaded first: the new values are written with one
+        `UPDATE ... WHERE idResident = ?` and the updated row is read back as
+        plain columns. Only when `idRoom` changes is the previous room read,
+        to keep the room occupancy counters in step.
+
+        Args:
+            idResident (int): The unique identifier of the resident to update.
+            changes (dict): New values, keyed by any of `PATCH_FIELDS`.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "resident": <resident>}:
+                The updated resident, with the fields of `LIST_FIELDS`.
+                - {"status": "not found"}:
+                If no resident with the given ID is found.
+                - {"status": "error", "message": <error_message>}:
+                If the changes are empty or invalid, or a database error occurs.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            error = self._check_patch(changes)
+            if error:
+                return {"status": "error", "message": error}
+
+            old_idRoom = None
+            if "idRoom" in changes:
+                old_idRoom = session.query(Resident.idRoom).filter(Resident.idResident == idResident).scalar()
+
+            result = session.execute(
+                update(Resident)
+                .where(Resident.idResident == idResident)
+                .values(**changes, update=date.today())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                session.rollback()
+                return {"status": "not found"}
+
+            if "idRoom" in changes:
+                self.occupancy.move(session, old_idRoom, changes["idRoom"])
+            self.search_index.rename(session, idResident, changes.get("name"), changes.get("surname"))
+            row = project(session, Resident, self.LIST_FIELDS).filter(Resident.idResident == idResident).one()
+            session.commit()
+            return {"status": "ok", "resident": serialize_rows(Resident, self.LIST_FIELDS, [row])[0]}
+        except Exception as e:
+            session.rollback()
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def patch_residents(self, patches, session=None):
+        """
+        Applies a batch of partial updates in one transaction.
+
+        Patches that change the same set of fields are written together with
+        one executemany UPDATE, so a batch costs one statement per distinct set
+        of fields instead of one request per resident and field. Several
+        patches of the same resident are merged in order.
+
+        Args:
+            patches (list[dict]): Each with `idResident` and new values keyed by
+                any of `PATCH_FIELDS`.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "residents": [<resident>], "errors": [{"idResident": <id>, "message": <error>}]}:
+                The updated residents, with the fields of `LIST_FIELDS`, and the
+                patches that were skipped because the resident does not exist.
+                - {"status": "error", "message": <error_message>}:
+                If a patch is invalid or a database error occurs; nothing is updated.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            # Agrupa los cambios por residente, en orden
+            merged = {}
+            for patch in patches:
+                changes = {key: value for key, value in patch.items() if key != "idResident"}
+                error = self._check_patch(changes)
+                if error:
+                    return {"status": "error", "message": f"Resident {patch.get('idResident')}: {error}"}
+                merged.setdefault(patch["idResident"], {}).update(changes)
+
+            old_rooms = dict(
+                session.query(Resident.idResident, Resident.idRoom).filter(Resident.idResident.in_(merged))
+            )
+            errors = [
+                {"idResident": idResident, "message": "Resident not found."}
+                for idResident in merged if idResident not in old_rooms
+            ]
 
-    def list_residents_in_room(self, idRoom, session=None):
+            # Una sentencia executemany por cada combinación de campos
+            groups = {}
+            today = date.today()
+            for idResident, changes in merged.items():
+                if idResident in old_rooms:
+                    params = {"b_idResident": idResident, "update": today, **changes}
+                    groups.setdefault(tuple(sorted(changes)), []).append(params)
+                    if "idRoom" in changes:
+                        self.occupancy.move(session, old_rooms[idResident], changes["idRoom"])
+                    self.search_index.rename(session, idResident, changes.get("name"), changes.get("surname"))
+            statement = update(Resident).where(Resident.idResident == bindparam("b_idResident"))
+            for params in groups.values():
+                session.execute(statement.execution_options(synchronize_session=False), params)
+
+            rows = project(session, Resident, self.LIST_FIELDS).filter(Resident.idResident.in_(old_rooms)).order_by(Resident.idResident).all()
+            session.commit()
+            return {"status": "ok", "residents": serialize_rows(Resident, self.LIST_FIELDS, rows), "errors": errors}
+        except Exception as e:
+            session.rollback()
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def _check_patch(self, changes):
+        # Devuelve el motivo por el que un cambio parcial no es válido, o None
+        if not changes:
+            return "No fields to update."
+        unknown = [field for field in changes if field not in self.PATCH_FIELDS]
+        if unknown:
+            return f"Unknown field(s): {', '.join(unknown)}."
+        return None
+
+    def list_residents_in_room(self, idRoom, session=None, fields=None):
     
         """
         Lists all residents in a specific room.
@@ -293,6 +657,8 @@ class ResidentController:
             idRoom (int): The unique identifier of the room to list residents for.
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            fields (list[str], optional): Sparse fieldset. Only these keys are returned
+                for each resident; defaults to `LIST_FIELDS`.
 
         Returns:
             dict: Result of the operation.
@@ -319,22 +685,12 @@ class ResidentController:
             session = Session(self.db_client.engine)
 
         try:
-            residents = session.query(Resident).filter(Resident.idRoom == idRoom).all()
+            fields = resolve_fields(fields, self.LIST_FIELDS)
+            residents = project(session, Resident, fields).filter(Resident.idRoom == idRoom).all()
             if not residents:
                 return {"status": "ok", "residents": []}
 
-            residents_data = [
-                {
-                    "idResident": r.idResident,
-                    "name": r.name,
-                    "surname": r.surname,
-                    "birthDate": r.birthDate.isoformat() if r.birthDate else None,
-                    "gender": r.gender,
-                    "idFamily": r.idFamily,
-                    "idRoom": r.idRoom
-                }
-                for r in residents
-            ]
+            residents_data = serialize_rows(Resident, fields, residents)
             return {"status": "ok", "residents": residents_data}
 
         except Exception as e:
@@ -346,7 +702,36 @@ class ResidentController:
 
 
 
-    def list_residents(self, session=None):
+    def export_residents(self, session=None):
+        """
+        Streams every resident in the database for the export endpoints.
+
+        The rows are read through a server-side cursor in chunks of
+        `EXPORT_CHUNK_SIZE`, ordered by `idResident`, so memory use does not grow
+        with the size of the table. Only the columns in `EXPORT_FIELDS` are read
+        and no ORM objects are built.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Yields:
+            list[dict]: The next chunk of residents, keyed by column name.
+
+        Notes:
+            - This is a generator: the query runs when iteration starts, and the
+            session is closed when it ends or the generator is closed.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+        try:
+            statement = select(*(getattr(Resident, field) for field in self.EXPORT_FIELDS)).order_by(Resident.idResident)
+            yield from stream_chunks(session, statement)
+        finally:
+            session.close()
+
+    def list_residents(self, session=None, limit=None, cursor=None, fields=None):
         """
         Lists all residents in the database.
 
@@ -356,6 +741,11 @@ class ResidentController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of residents to return. When `limit` and
+                `cursor` are both None every resident is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
+            fields (list[str], optional): Sparse fieldset. Only these keys are returned
+                for each resident; defaults to `LIST_FIELDS`.
 
         Returns:
             dict: Result of the operation.
@@ -370,6 +760,8 @@ class ResidentController:
                     - idRoom (int): The ID of the room the resident is assigned to.
                 - {"status": "ok", "residents": []}:
                 If no residents are found in the database.
+                When paginating, the result also contains `next_cursor`, the token of the
+                next page (None on the last page).
                 - {"status": "error", "message": <error_message>}:
                 If an error occurs during the operation.
 
@@ -382,22 +774,16 @@ class ResidentController:
             session = Session(self.db_client.engine)
 
         try:
-            residents = session.query(Resident).all()
-            if not residents:
+            fields = resolve_fields(fields, self.LIST_FIELDS)
+            query = project(session, Resident, fields, Resident.idResident)
+            residents, next_cursor = paginate(query, Resident.idResident, limit, cursor)
+            paginated = limit is not None or cursor is not None
+            if not residents and not paginated:
                 return {"status": "ok", "residents": []}
 
-            residents_data = [
-                {
-                    "idResident": r.idResident,
-                    "name": r.name,
-                    "surname": r.surname,
-                    "birthDate": r.birthDate.isoformat() if r.birthDate else None,
-                    "gender": r.gender,
-                    "idFamily": r.idFamily,
-                    "idRoom": r.idRoom
-                }
-                for r in residents
-            ]
+            residents_data = serialize_rows(Resident, fields, residents)
+            if paginated:
+                return {"status": "ok", "residents": residents_data, "next_cursor": next_cursor}
             return {"status": "ok", "residents": residents_data}
 
         except Exception as e:
@@ -499,6 +885,7 @@ class ResidentController:
                 return {"status": "error", "message": f"Residente con ID '{resident_id}' no encontrado"}
 
             # Actualizar el ID de la habitación
+            self.occupancy.move(session, resident.idRoom, new_room_id)
             resident.idRoom = new_room_id
 
             # Guardar los cambios
@@ -520,6 +907,120 @@ class ResidentController:
             if session:
                 session.close()
 
+    def move_residents(self, moves, session=None):
+        """
+        Moves groups of residents and whole families to new rooms in one transaction.
+
+        The residents are moved with one set-based UPDATE per target room
+        instead of one request per resident, and the capacity of every target
+        room is checked with a single query before anything is written. Either
+        every move is applied or none is.
+
+        Args:
+            moves (list[dict]): Each with the target `idRoom` and either
+                `idResidents` (list of resident IDs) or `idFamily`. Moving a family
+                also changes `Family.idRoom`. If a resident appears in several
+                moves, the last one wins.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "moved": <count>}:
+                Number of residents whose room changed.
+                - {"status": "error", "message": <error_message>}:
+                If a resident, family or room does not exist, a room lacks space,
+                or a database error occurs. Nothing is moved.
+        """
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            resident_targets = {}
+            family_targets = {}
+            for move in moves:
+                for idResident in move.get("idResidents") or ():
+                    resident_targets[idResident] = move["idRoom"]
+                if move.get("idFamily") is not None:
+                    family_targets[move["idFamily"]] = move["idRoom"]
+
+            # Residentes afectados, con su habitación y familia actuales
+            rows = session.query(Resident.idResident, Resident.idRoom, Resident.idFamily).filter(
+                Resident.idResident.in_(resident_targets) | Resident.idFamily.in_(family_targets)
+            ).all()
+            found = {row.idResident for row in rows}
+            missing = [idResident for idResident in resident_targets if idResident not in found]
+            if missing:
+                return {"status": "error", "message": f"Resident(s) not found: {', '.join(map(str, missing))}."}
+            found_families = {
+                idFamily for (idFamily,) in session.query(Family.idFamily).filter(Family.idFamily.in_(family_targets))
+            }
+            missing = [idFamily for idFamily in family_targets if idFamily not in found_families]
+            if missing:
+                return {"status": "error", "message": f"Family(ies) not found: {', '.join(map(str, missing))}."}
+
+            targets = {}
+            for row in rows:
+                # Un residente listado explícitamente prevalece sobre el traslado de su familia
+                target = resident_targets.get(row.idResident, family_targets.get(row.idFamily))
+                if target != row.idRoom:
+                    targets[row.idResident] = (row.idRoom, target)
+
+            deltas = {}
+            for old_idRoom, new_idRoom in targets.values():
+                deltas[old_idRoom] = deltas.get(old_idRoom, 0) - 1
+                deltas[new_idRoom] = deltas.get(new_idRoom, 0) + 1
+
+            # Capacidad de todas las habitaciones destino en una sola consulta
+            room_ids = set(resident_targets.values()) | set(family_targets.values())
+            rooms = {
+                idRoom: (maxPeople, count)
+                for idRoom, maxPeople, count in session.query(Room.idRoom, Room.maxPeople, func.count(Resident.idResident))
+                .outerjoin(Resident, Resident.idRoom == Room.idRoom)
+                .filter(Room.idRoom.in_(room_ids))
+                .group_by(Room.idRoom, Room.maxPeople)
+            }
+            for idRoom in room_ids:
+                if idRoom not in rooms:
+                    return {"status": "error", "message": f"Room {idRoom} does not exist."}
+                maxPeople, count = rooms[idRoom]
+                arriving = deltas.get(idRoom, 0)
+                if maxPeople is not None and arriving > 0 and count + arriving > maxPeople:
+                    return {"status": "error", "message": f"Room {idRoom} does not have space for {arriving} more residents."}
+
+            by_room = {}
+            for idResident, (_, new_idRoom) in targets.items():
+                by_room.setdefault(new_idRoom, []).append(idResident)
+            for idRoom, idResidents in by_room.items():
+                session.execute(
+                    update(Resident).where(Resident.idResident.in_(idResidents))
+                    .values(idRoom=idRoom, update=date.today())
+                    .execution_options(synchronize_session=False)
+                )
+
+            families_by_room = {}
+            for idFamily, idRoom in family_targets.items():
+                families_by_room.setdefault(idRoom, []).append(idFamily)
+            for idRoom, idFamilies in families_by_room.items():
+                session.execute(
+                    update(Family).where(Family.idFamily.in_(idFamilies))
+                    .values(idRoom=idRoom)
+                    .execution_options(synchronize_session=False)
+                )
+            if family_targets:
+                bump_version(session, "family")
+
+            for idRoom, delta in deltas.items():
+                self.occupancy.add(session, idRoom, delta)
+            session.commit()
+            return {"status": "ok", "moved": len(targets)}
+        except Exception as e:
+            session.rollback()
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
     def getResidentById(self, idResident: int, session=None):
         """
         Retrieves a resident by their ID.
@@ -619,6 +1120,7 @@ class ResidentController:
 
             # Actualizamos el nombre del residente
             resident.name = new_name
+            self.search_index.rename(session, idResident, name=new_name)
 
             # Guardamos los cambios
             session.commit()
@@ -680,6 +1182,7 @@ class ResidentController:
 
             # Actualizamos el apellido del residente
             resident.surname = new_surname
+            self.search_index.rename(session, idResident, surname=new_surname)
 
             # Guardamos los cambios
             session.commit()
@@ -1,4 +1,8 @@
 from app.mysql.mysql import DatabaseClient
+from app.mysql.change_version import bump_version
+from app.controllers.occupancy import RoomOccupancy
+from app.utils.pagination import paginate
+from app.utils.projection import project, resolve_fields, serialize_rows
 from app.mysql.room import Room  # SQLAlchemy model
 from app.mysql.resident import Resident  # SQLAlchemy model
 from app.mysql.admin import Admin  # SQLAlchemy model
@@ -38,13 +42,17 @@ import os
 
 
 class RoomController:
+    # Campos devueltos por los listados cuando no se pide un subconjunto
+    LIST_FIELDS = ('idRoom', 'roomName', 'maxPeople', 'idShelter', 'createDate')
 
-    def __init__(self, db_url=None):
+    def __init__(self, db_url=None, occupancy=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
         self.db_url = db_url or os.getenv("MYSQL_URL")
         if not self.db_url:
             raise ValueError("MYSQL_URL environment variable is not set.")
         self.db_client = DatabaseClient(self.db_url)
+        # Contador de ocupación compartido con ResidentController (ver Controllers)
+        self.occupancy = occupancy or RoomOccupancy(gb.ROOM_OCCUPANCY_RECONCILE_SECONDS)
 
     def create_room(self, body: RoomModel, session=None):
         """
@@ -118,6 +126,7 @@ class RoomController:
                 maxPeople=body.maxPeople
             )
             session.add(new_room)
+            bump_version(session, "room")
             session.commit()
             return {"status": "ok"}
         except Exception as e:
@@ -169,27 +178,24 @@ class RoomController:
 
         Notes:
             - Rooms without residents will still appear in the list with a `resident_count` of 0.
-            - The method uses an `outerjoin` to include rooms without any assigned residents.
+            - The counts come from the shared `RoomOccupancy` counter instead of
+            counting the resident table on every call.
         """
 
 
         if session is None:
             session = Session(self.db_client.engine)
         try:
-            result = (
-                session.query(Room, func.count(Resident.idResident).label("resident_count"))
-                .outerjoin(Resident, Room.idRoom == Resident.idRoom)
-                .group_by(Room.idRoom)
-                .all()
-            )
+            rooms = session.query(Room).order_by(Room.idRoom).all()
+            counts = self.occupancy.counts(session)
             return [
                 {
                     "idRoom": room.idRoom,
                     "roomName": room.roomName,
                     "maxPeople": room.maxPeople,
-                    "resident_count": resident_count,
+                    "resident_count": counts.get(room.idRoom, 0),
                 }
-                for room, resident_count in result
+                for room in rooms
             ]
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -230,54 +236,53 @@ class RoomController:
         Notes:
             - Public or common rooms (not starting with "Room") are accessible to all residents.
             - Family-assigned rooms are only accessible to members of the assigned family.
-            - The room's current occupancy is checked against its maximum capacity.
+            - The room's current occupancy, taken from the `RoomOccupancy` counter, is checked
+            against its maximum capacity.
 
         """
 
         if session is None:
-            db = DatabaseClient(gb.MYSQL_URL)
-            session = Session(db.engine)
+            session = Session(self.db_client.engine)
 
-        # Obtener los datos del residente y de la sala
-        resident = session.query(Resident).filter_by(idResident=idResident).first()
-        room = session.query(Room).filter_by(idRoom=idRoom).first()
+        try:
+            # Obtener los datos del residente y de la sala
+            resident = session.query(Resident).filter_by(idResident=idResident).first()
+            room = session.query(Room).filter_by(idRoom=idRoom).first()
 
-        # Validar si el residente existe
-        if resident is None:
-            return "Resident not found."
+            # Validar si el residente existe
+            if resident is None:
+                return "Resident not found."
 
-        # Validar si la sala existe
-        if room is None:
-            return "Room not found."
+            # Validar si la sala existe
+            if room is None:
+                return "Room not found."
 
-        # Bloquear acceso a la sala de mantenimiento
-        if room.roomName.lower() == "mantenimiento":  # Comparamos en minúsculas por seguridad
-            return "Access denied. No puedes entrar a la sala de mantenimiento."
+            # Bloquear acceso a la sala de mantenimiento
+            if room.roomName.lower() == "mantenimiento":  # Comparamos en minúsculas por seguridad
+                return "Access denied. No puedes entrar a la sala de mantenimiento."
 
-        # Verificar la ocupación actual de la sala
-        currentOccupancy = (
-            session.query(Resident)
-            .filter(Resident.idRoom == idRoom)  # Filtrar a los residentes en esta sala
-            .count()
-        )
+            # Verificar la ocupación actual de la sala
+            currentOccupancy = self.occupancy.count(session, idRoom)
 
-        if currentOccupancy >= room.maxPeople:
-            return "Access denied. La sala está llena."
+            if currentOccupancy >= room.maxPeople:
+                return "Access denied. La sala está llena."
 
-        # Acceso permitido a salas públicas o comunes
-        if not room.roomName.startswith("Room"):
-            return "Access granted. Welcome to the room."
+            # Acceso permitido a salas públicas o comunes
+            if not room.roomName.startswith("Room"):
+                return "Access granted. Welcome to the room."
 
-        # Verificar si la sala pertenece a la familia del residente
-        family = session.query(Family).filter_by(idRoom=room.idRoom).first()
-        if family and resident.idFamily == family.idFamily:
-            return "Access granted. Welcome to the room."
+            # Verificar si la sala pertenece a la familia del residente
+            family = session.query(Family).filter_by(idRoom=room.idRoom).first()
+            if family and resident.idFamily == family.idFamily:
+                return "Access granted. Welcome to the room."
 
-        # Acceso denegado por no pertenecer a la familia asignada
-        return "Access denied. You are in the wrong room."
+            # Acceso denegado por no pertenecer a la familia asignada
+            return "Access denied. You are in the wrong room."
+        finally:
+            session.close()
 
 
-    def list_rooms(self, session=None):
+    def list_rooms(self, session=None, limit=None, cursor=None, fields=None):
 
         """
         Lists all rooms with basic information.
@@ -288,6 +293,11 @@ class RoomController:
         Args:
             session (Session, optional): SQLAlchemy session object for database interaction.
                 If not provided, a new session will be created.
+            limit (int, optional): Maximum number of rooms to return. When `limit` and
+                `cursor` are both None every room is returned, as before.
+            cursor (str, optional): `next_cursor` of the previous page.
+            fields (list[str], optional): Sparse fieldset. Only these keys are returned
+                for each room; defaults to `LIST_FIELDS`.
 
         Returns:
             list: A list of dictionaries, each representing a room with the following details:
@@ -296,6 +306,8 @@ class RoomController:
                 - maxPeople (int): The maximum capacity of the room.
                 - idShelter (int): The ID of the shelter the room belongs to.
                 - createDate (str, optional): The creation date of the room in ISO 8601 format.
+            dict: When paginating, {"status": "ok", "rooms": [...], "next_cursor": <token>},
+                where `next_cursor` is None on the last page.
             dict: If an error occurs, a dictionary with:
                 - {"status": "error", "message": <error_message>}
 
@@ -327,17 +339,13 @@ class RoomController:
         if session is None:
             session = Session(self.db_client.engine)
         try:
-            rooms = session.query(Room).all()
-            return [
-                {
-                    "idRoom": room.idRoom,
-                    "roomName": room.roomName,
-                    "maxPeople": room.maxPeople,
-                    "idShelter": room.idShelter,
-                    "createDate": room.createDate.isoformat() if room.createDate else None,
-                }
-                for room in rooms
-            ]
+            fields = resolve_fields(fields, self.LIST_FIELDS)
+            query = project(session, Room, fields, Room.idRoom)
+            rooms, next_cursor = paginate(query, Room.idRoom, limit, cursor)
+            rooms_data = serialize_rows(Room, fields, rooms)
+            if limit is not None or cursor is not None:
+                return {"status": "ok", "rooms": rooms_data, "next_cursor": next_cursor}
+            return rooms_data
         except Exception as e:
             return {"status": "error", "message": str(e)}
         finally:
@@ -386,6 +394,7 @@ class RoomController:
             room.roomName = new_name
 
             # Guardamos los cambios
+            bump_version(session, "room")
             session.commit()
 
             return {"status": "ok", "message": "Nombre de la habitación actualizado exitosamente"}
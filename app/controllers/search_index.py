@@ -0,0 +1,342 @@
+from app.mysql.mysql import pending_on_commit
+from app.mysql.resident import Resident
+from bisect import bisect_left, insort
+import threading
+import time
+import unicodedata
+
+
+def normalize(text) -> str:
+    """
+    Folds case and strips accents, so "José" and "jose" index the same.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text) -> tuple:
+    """
+    Splits a name into normalized words.
+    """
+    return tuple(word for word in normalize(text).replace("-", " ").split() if word)
+
+
+def _max_distance(word: str) -> int:
+    return 1 if len(word) <= 4 else 2
+
+
+def _next_row(word: str, row: list, before, char: str, previous_char) -> list:
+    """
+    Extends the edit-distance table of `word` against a prefix by one character.
+
+    `row` is the last row of the table (the prefix so far) and `before` the one
+    above it, used to count swapping two adjacent letters as a single edit.
+    """
+    current = [row[0] + 1]
+    for j, other in enumerate(word, 1):
+        cost = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + (other != char))
+        if before is not None and j > 1 and other == previous_char and word[j - 2] == char:
+            cost = min(cost, before[j - 2] + 1)
+        current.append(cost)
+    return current
+
+
+class _NameIndex:
+    """
+    Words of the indexed residents, as kept by `ResidentSearchIndex`.
+
+    Attributes:
+        names (dict): Name, surname and normalized words of each resident, by ID.
+        words (list): Every distinct normalized word, sorted.
+        residents (dict): IDs of the residents using each word.
+    """
+
+    def __init__(self, rows=()):
+        self.names = {}
+        self.words = []
+        self.residents = {}
+        for idResident, name, surname in rows:
+            self.index(idResident, name, surname, sort=False)
+        self.words.sort()
+
+    def index(self, idResident, name, surname, sort=True) -> None:
+        self.unindex(idResident)
+        words = tokenize(name) + tokenize(surname)
+        self.names[idResident] = (name, surname, words)
+        for word in set(words):
+            residents = self.residents.get(word)
+            if residents is None:
+                residents = self.residents[word] = set()
+                if sort:
+                    insort(self.words, word)
+                else:
+                    self.words.append(word)
+            residents.add(idResident)
+
+    def unindex(self, idResident) -> None:
+        entry = self.names.pop(idResident, None)
+        if entry is None:
+            return
+        for word in set(entry[2]):
+            residents = self.residents[word]
+            residents.discard(idResident)
+            if residents:
+                continue
+            # Ningún residente usa ya la palabra: sale de la lista ordenada
+            del self.residents[word]
+            del self.words[bisect_left(self.words, word)]
+
+    def apply(self, pending: list) -> bool:
+        """
+        Applies committed changes; returns False when they invalidate the whole index.
+        """
+        for operation, *args in pending:
+            if operation == "invalidate":
+                return False
+            if operation == "add":
+                self.index(*args)
+            elif operation == "remove":
+                self.unindex(*args)
+            elif operation == "rename":
+                idResident, name, surname = args
+                current = self.names.get(idResident)
+                if current is not None:
+                    self.index(idResident, current[0] if name is None else name, current[1] if surname is None else surname)
+        return True
+
+    def prefix_range(self, prefix: str, low: int = 0) -> tuple:
+        # Posiciones [low, high) de las palabras que empiezan por prefix
+        low = bisect_left(self.words, prefix, low)
+        return low, bisect_left(self.words, prefix + "\uffff", low)
+
+    def prefix_words(self, word: str) -> list:
+        low, high = self.prefix_range(word)
+        return self.words[low:high]
+
+    def close_words(self, word: str) -> list:
+        """
+        Words within a few edits of a prefix of `word`, except those starting with `word`.
+
+        The sorted word list is walked as a trie: each position extends the
+        edit-distance table of the previous word only past their common prefix,
+        a prefix within reach takes every word below it with one binary search,
+        and a prefix already out of reach skips them the same way. The first
+        letter has to be right, which keeps the walk to one letter's words.
+        """
+        limit = _max_distance(word)
+        words = self.words
+        exact_low, exact_high = self.prefix_range(word)
+        position, end = self.prefix_range(word[0])
+        # rows[k]: distancias de cada prefijo de word al prefijo de longitud k de la palabra en curso
+        rows = [list(range(len(word) + 1))]
+        path = ""
+        close = []
+        while position < end:
+            other = words[position]
+            common = 0
+            while common < min(len(path), len(other)) and path[common] == other[common]:
+                common += 1
+            del rows[common + 1:]
+            depth = common
+            following = position + 1
+            while depth < len(other):
+                depth += 1
+                before = rows[depth - 2] if depth > 1 else None
+                row = _next_row(word, rows[-1], before, other[depth - 1], other[depth - 2] if depth > 1 else None)
+                rows.append(row)
+                if row[-1] <= limit:
+                    # Todo lo que empieza por este prefijo está a `limit` ediciones o menos
+                    following = self.prefix_range(other[:depth], position)[1]
+                    close += words[position:min(following, exact_low)] + words[max(position, exact_high):following]
+                    break
+                if min(row) > limit:
+                    # Ninguna continuación de este prefijo puede acercarse ya
+                    following = self.prefix_range(other[:depth], position)[1]
+                    break
+            path = other[:depth]
+            position = following
+        return close
+
+
+class ResidentSearchIndex:
+    """
+    In-process index of resident names for prefix and typo-tolerant search.
+
+    Every distinct word of the residents' names and surnames is kept in a
+    sorted list, so the residents whose name starts with a prefix are found
+    with a binary search, and the words close to a misspelt one are found by
+    walking that list as a trie. Lookups never touch the database.
+
+    The index is loaded with one query the first time it is needed (or at
+    startup) and then kept up to date by the controllers that create, rename
+    or delete residents. Like `RoomOccupancy`, changes are recorded against
+    the session that makes them and applied only once it commits. Writes made
+    by other processes are picked up when the index is reloaded, on the first
+    search after `reload_interval` seconds. An interval of 0 disables reloads.
+
+    Reloads query the database and build the new index without holding the
+    lock, so searches keep being served from the current one meanwhile;
+    changes committed during the reload are replayed on the new index before
+    it is swapped in.
+
+    Attributes:
+        reload_interval (float): Seconds between reloads from the database.
+    """
+
+    def __init__(self, reload_interval: float = 0):
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._state = None
+        self._replays = []
+        self._loaded_at = 0.0
+
+    def search(self, session, query: str, limit: int = 10, fuzzy: bool = False) -> list:
+        """
+        Finds the residents whose name and surname match every word of `query`.
+
+        A word matches a resident when it is the prefix of one of their name
+        words. With `fuzzy`, it also matches when it is within one edit (two
+        for words longer than four letters) of such a prefix and starts with
+        the same letter; exact prefix matches are ranked first.
+
+        The lookup is driven by the query word with the fewest matches and
+        stops as soon as `limit` residents are found, so short prefixes shared
+        by thousands of residents cost the same as rare ones.
+
+        Args:
+            session (Session): Session used to load the index if needed.
+            query (str): Words typed by the user, e.g. "jo do".
+            limit (int): Largest number of residents returned.
+            fuzzy (bool): Whether to tolerate typos.
+
+        Returns:
+            list[dict]: Matching residents, with `idResident`, `name` and `surname`,
+                in alphabetical order of the matched word within each rank.
+        """
+        words = tokenize(query)
+        if not words or limit <= 0:
+            return []
+
+        state = self._ensure_loaded(session)
+        with self._lock:
+            results = self._collect(state, words, limit, {word: state.prefix_words(word) for word in words}, set())
+            if fuzzy and len(results) < limit:
+                # Todas las coincidencias exactas ya están en results: solo faltan las aproximadas
+                candidates = {word: state.prefix_words(word) + state.close_words(word) for word in words}
+                results += self._collect(state, words, limit - len(results), candidates, set(results), fuzzy=True)
+            return [
+                {"idResident": idResident, "name": state.names[idResident][0], "surname": state.names[idResident][1]}
+                for idResident in results
+            ]
+
+    def add(self, session, idResident: int, name: str, surname: str) -> None:
+        """
+        Records a new resident (or a new name), applied when `session` commits.
+        """
+        pending_on_commit(session, self._apply, list).append(("add", idResident, name, surname))
+
+    def rename(self, session, idResident: int, name=None, surname=None) -> None:
+        """
+        Records a change of name and/or surname; None keeps the current value.
+        """
+        if name is None and surname is None:
+            return
+        pending_on_commit(session, self._apply, list).append(("rename", idResident, name, surname))
+
+    def remove(self, session, idResident: int) -> None:
+        """
+        Records the deletion of a resident, applied when `session` commits.
+        """
+        pending_on_commit(session, self._apply, list).append(("remove", idResident))
+
+    def reload_on_commit(self, session) -> None:
+        """
+        Drops the index when `session` commits, for writes too large to track one by one.
+        """
+        pending_on_commit(session, self._apply, list).append(("invalidate",))
+
+    def reload(self, session) -> int:
+        """
+        Rebuilds the index from the database.
+
+        Args:
+            session (Session): Session used for the query.
+
+        Returns:
+            int: Number of residents indexed.
+        """
+        return len(self._load(session).names)
+
+    def invalidate(self) -> None:
+        """
+        Drops the index so the next search reloads it.
+        """
+        with self._lock:
+            self._state = None
+
+    def _ensure_loaded(self, session) -> _NameIndex:
+        with self._lock:
+            state = self._state
+            if state is not None and self.reload_interval and time.monotonic() - self._loaded_at > self.reload_interval:
+                # Un solo hilo recarga; los demás siguen con el índice actual mientras tanto
+                self._loaded_at = time.monotonic()
+                state = None
+            elif state is not None:
+                return state
+        return self._load(session)
+
+    def _load(self, session) -> _NameIndex:
+        replay = []
+        with self._lock:
+            self._replays.append(replay)
+        try:
+            rows = session.query(Resident.idResident, Resident.name, Resident.surname).all()
+            state = _NameIndex(rows)
+        except Exception:
+            with self._lock:
+                self._replays.remove(replay)
+            raise
+        with self._lock:
+            self._replays.remove(replay)
+            # Los commits posteriores a la consulta pueden no estar en rows: se aplican de nuevo
+            if all(state.apply(pending) for pending in replay):
+                self._state = state
+                self._loaded_at = time.monotonic()
+            # Con una invalidación a medias, el índice sirve para esta búsqueda pero no se instala
+            return state
+
+    def _collect(self, state, words, limit, candidates, seen, fuzzy=False) -> list:
+        # La palabra con menos candidatas guía el recorrido; las demás se comprueban por residente
+        driver = min(words, key=lambda word: len(candidates[word]))
+        others = list(words)
+        others.remove(driver)
+        matches = {word: set() for word in others}
+        results = []
+        for token in candidates[driver]:
+            for idResident in sorted(state.residents[token]):
+                if idResident in seen:
+                    continue
+                seen.add(idResident)
+                resident_words = state.names[idResident][2]
+                if all(self._word_matches(word, resident_words, candidates, matches, fuzzy) for word in others):
+                    results.append(idResident)
+                    if len(results) == limit:
+                        return results
+        return results
+
+    def _word_matches(self, word, resident_words, candidates, matches, fuzzy) -> bool:
+        if any(other.startswith(word) for other in resident_words):
+            return True
+        if not fuzzy:
+            return False
+        close = matches[word]
+        if not close:
+            close.update(candidates[word])
+        return any(other in close for other in resident_words)
+
+    def _apply(self, pending: list) -> None:
+        with self._lock:
+            for replay in self._replays:
+                replay.append(pending)
+            if self._state is not None and not self._state.apply(pending):
+                self._state = None
@@ -1,17 +1,128 @@
-from app.mysql.mysql import DatabaseClient
+from app.mysql.mysql import DatabaseClient, on_commit
 from app.mysql.shelter import Shelter
+from app.mysql.shelter_reading import METRICS, ShelterReading, append_readings, from_millis, prune_readings, read_series, to_millis
+from app.controllers.ingest import LEVEL_COLUMNS, ReadingBuffer, parse_readings
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from datetime import date
+from sqlalchemy.exc import DisconnectionError, IntegrityError, InterfaceError, OperationalError, SQLAlchemyError, TimeoutError
+from datetime import date, datetime, timedelta
 import app.utils.vars as gb
+import logging
 import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# Milisegundos que se adelanta como mucho una lectura para no repetir la clave de otra
+READINGS_NUDGE_MS = 1000
+
+
+def _is_transient(error) -> bool:
+    # Errores de conexión o de bloqueo: el mismo lote puede escribirse más tarde.
+    # Una clave duplicada viene de otro escritor simultáneo: al reintentar, _drop_stored descarta lo ya guardado
+    if isinstance(error, (OperationalError, InterfaceError, DisconnectionError, TimeoutError, IntegrityError)):
+        return True
+    return bool(getattr(error, "connection_invalidated", False))
+
+
+class ShelterLevelCache:
+    """
+    In-process copy of the resource levels of the shelter served by the level endpoints.
+
+    Reads are answered from memory. The update methods of `ShelterController`
+    write the new value through after their transaction commits. With several
+    workers, each one only sees its own writes, so a `ttl` (seconds) can be set
+    to reload the row from the database periodically. A ttl of 0 never expires.
+
+    Attributes:
+        ttl (float): Seconds a loaded snapshot stays valid (0 disables expiry).
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def get(self):
+        """
+        Returns the cached levels, or None if nothing is cached or the entry expired.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if self.ttl and time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return snapshot
+
+    def store(self, shelter: Shelter) -> dict:
+        """
+        Caches the levels of a shelter row loaded from the database.
+        """
+        snapshot = {
+            "idShelter": shelter.idShelter,
+            "energyLevel": shelter.energyLevel,
+            "waterLevel": shelter.waterLevel,
+            "radiationLevel": shelter.radiationLevel,
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def update(self, idShelter: int, **levels) -> None:
+        """
+        Writes committed level changes through to the cached snapshot.
+
+        Changes for a shelter other than the cached one are ignored.
+        """
+        with self._lock:
+            if self._snapshot is not None and self._snapshot["idShelter"] == idShelter:
+                self._snapshot = {**self._snapshot, **levels}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
 
 class ShelterController:
-    def __init__(self, db_url=None):
+    def __init__(self, db_url=None, events=None, rules=None):
         # Usa MYSQL_URL de la variable de entorno si no se pasa db_url
         self.db_url = db_url or os.getenv("MYSQL_URL")
         if not self.db_url:
             raise ValueError("MYSQL_URL environment variable is not set.")
         self.db_client = DatabaseClient(self.db_url)
+        self.cache = ShelterLevelCache(gb.SHELTER_CACHE_TTL)
+        # Publicador de eventos de nivel y motor de reglas de alarma (opcionales)
+        self.events = events
+        self.rules = rules
+        # Lecturas de sensores pendientes de escribir, y la hora del último valor aplicado a Shelter
+        self.readings = ReadingBuffer(gb.INGEST_MAX_BUFFER)
+        self._applied_at = {}
+
+    def _get_levels(self, session=None) -> dict:
+        """
+        Returns the levels of the first shelter, from the cache when possible.
+
+        Raises:
+            ValueError: If no shelter record is found in the database.
+        """
+        levels = self.cache.get()
+        if levels is not None:
+            return levels
+
+        if session is None:
+            session = Session(self.db_client.engine)
+        try:
+            shelter = session.query(Shelter).first()
+            if not shelter:
+                raise ValueError("No shelter found in the database.")
+            return self.cache.store(shelter)
+        finally:
+            session.close()
 
     def get_shelter_energy_level(self, session=None):
 
@@ -40,17 +151,10 @@ class ShelterController:
         Notes:
             - This method assumes there is only one shelter or that the first shelter 
             record is the one of interest.
+            - The value is served from the in-process `ShelterLevelCache` when it is loaded.
         """
 
-        if session is None:
-            session = Session(self.db_client.engine)
-        try:
-            shelter = session.query(Shelter).first()
-            if not shelter:
-                raise ValueError("No shelter found in the database.")
-            return {"energyLevel": shelter.energyLevel}
-        finally:
-            session.close()
+        return {"energyLevel": self._get_levels(session)["energyLevel"]}
 
     def get_shelter_water_level(self, session=None):
 
@@ -79,17 +183,10 @@ class ShelterController:
         Notes:
             - This method assumes there is only one shelter or that the first shelter 
             record is the one of interest.
+            - The value is served from the in-process `ShelterLevelCache` when it is loaded.
         """
 
-        if session is None:
-            session = Session(self.db_client.engine)
-        try:
-            shelter = session.query(Shelter).first()
-            if not shelter:
-                raise ValueError("No shelter found in the database.")
-            return {"waterLevel": shelter.waterLevel}
-        finally:
-            session.close()
+        return {"waterLevel": self._get_levels(session)["waterLevel"]}
 
 
 
@@ -121,19 +218,257 @@ class ShelterController:
         Notes:
             - This method assumes there is only one shelter or that the first shelter 
             record is the one of interest.
+            - The value is served from the in-process `ShelterLevelCache` when it is loaded.
+        """
+
+        return {"radiationLevel": self._get_levels(session)["radiationLevel"]}
+
+
+
+    def _levels_changed(self, session, idShelter: int, **levels) -> None:
+        # Al confirmarse: se actualiza la caché y se avisa a los clientes suscritos
+        on_commit(session, self.cache.update, idShelter, **levels)
+        if self.events is not None:
+            on_commit(session, self.events.publish, "level", {"idShelter": idShelter, **levels})
+
+    def _evaluate_on_commit(self, session, readings) -> None:
+        # Las reglas de alarma solo ven lecturas confirmadas; se evalúan después, fuera de la petición
+        if self.rules is not None and readings:
+            on_commit(session, self.rules.submit, readings)
+
+    def _record_reading(self, session, idShelter: int, metric: str, value: int) -> None:
+        # Cada cambio de nivel queda también en el histórico, en la misma transacción
+        code = METRICS[metric]
+        takenAt = to_millis(datetime.utcnow())
+        # Otra actualización o una lectura ingerida pueden ocupar ya ese milisegundo: se usa el siguiente libre
+        taken = set(session.execute(
+            select(ShelterReading.takenAt).where(
+                ShelterReading.idShelter == idShelter,
+                ShelterReading.metric == code,
+                ShelterReading.takenAt.between(takenAt, takenAt + READINGS_NUDGE_MS),
+            )
+        ).scalars())
+        while takenAt in taken:
+            takenAt += 1
+        readings = [(idShelter, code, takenAt, value)]
+        append_readings(session, readings)
+        self._evaluate_on_commit(session, readings)
+        # Un valor manual también cuenta como aplicado: una lectura ingerida más antigua no lo pisa
+        on_commit(session, self._mark_applied, {(idShelter, code): takenAt})
+
+    def _mark_applied(self, times: dict) -> None:
+        # Solo avanza: dos transacciones pueden confirmarse en otro orden que el de sus lecturas
+        for key, takenAt in times.items():
+            if takenAt > self._applied_at.get(key, -1):
+                self._applied_at[key] = takenAt
+
+    def prune_old_readings(self, session=None) -> dict:
+        """
+        Deletes the readings and rollups older than their retention, in a transaction of its own.
+
+        A background task calls it every READINGS_PRUNE_INTERVAL seconds, so
+        the deletes never run inside a level update or an ingestion flush.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok"}:
+                The old readings were deleted.
+                - {"status": "error", "message": <error_message>}:
+                If the delete failed; the next run tries again.
         """
 
         if session is None:
             session = Session(self.db_client.engine)
+
         try:
-            shelter = session.query(Shelter).first()
-            if not shelter:
-                raise ValueError("No shelter found in the database.")
-            return {"radiationLevel": shelter.radiationLevel}
+            now = datetime.utcnow()
+            prune_readings(
+                session,
+                to_millis(now - timedelta(hours=gb.READINGS_RAW_RETENTION_HOURS)),
+                to_millis(now - timedelta(days=gb.READINGS_ROLLUP_RETENTION_DAYS)),
+            )
+            session.commit()
+            return {"status": "ok"}
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.warning("Could not prune old readings: %s", e)
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
+
+    def ingest_readings(self, items) -> dict:
+        """
+        Validates a batch of sensor readings and buffers it for the next flush.
+
+        No database work is done here: the readings are written by
+        `flush_readings`, which a background task calls every
+        INGEST_FLUSH_INTERVAL seconds.
+
+        Args:
+            items (list): Decoded readings, see `app.controllers.ingest.parse_readings`.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "accepted": <count>, "errors": [{"index": <position>, "message": <error>}]}:
+                The valid readings are buffered; invalid ones are reported.
+                - {"status": "busy", "message": <message>}:
+                If the buffer is full; nothing is buffered and the batch should be retried.
+        """
+        readings, errors = parse_readings(items)
+        if not self.readings.add(readings):
+            return {"status": "busy", "message": "The reading buffer is full, retry later."}
+        return {"status": "ok", "accepted": len(readings), "errors": errors}
+
+    def flush_readings(self, session=None) -> dict:
+        """
+        Writes every buffered reading in one transaction.
+
+        The batch is appended to the history with one multi-row insert, and the
+        newest value of each metric is written to its `Shelter` row with one
+        UPDATE per shelter. Readings already stored (a resent batch) or repeated
+        within the batch are written once, and readings of unknown shelters are
+        dropped. If the database cannot be reached (a lost
+        connection, a lock timeout) or another writer stored the same key
+        first, the batch goes back to the buffer for the next flush; any other
+        failure means the batch itself cannot be written, so it is dropped and
+        logged instead of blocking every later flush.
+
+        Args:
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "written": <count>}:
+                Number of readings written.
+                - {"status": "error", "message": <error_message>}:
+                If the batch could not be written.
+        """
+
+        batch = self.readings.drain()
+        if not batch:
+            return {"status": "ok", "written": 0}
+
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            # Una lectura por serie y milisegundo: la última recibida gana
+            readings = list({reading[:3]: reading for reading in batch}.values())
+            shelters = {idShelter for idShelter, _, _, _ in readings}
+            known = set(session.execute(select(Shelter.idShelter).where(Shelter.idShelter.in_(shelters))).scalars())
+            if known != shelters:
+                logger.warning("Dropping readings of unknown shelters %s", sorted(shelters - known))
+                readings = [reading for reading in readings if reading[0] in known]
+            readings = self._drop_stored(session, readings)
+            append_readings(session, readings)
+            self._evaluate_on_commit(session, readings)
+
+            newest = {}
+            for idShelter, metric, takenAt, value in readings:
+                key = (idShelter, metric)
+                if takenAt >= newest.get(key, (self._applied_at.get(key, -1), None))[0]:
+                    newest[key] = (takenAt, value)
+            levels = {}
+            for (idShelter, metric), (_, value) in newest.items():
+                levels.setdefault(idShelter, {})[LEVEL_COLUMNS[metric]] = value
+            for idShelter, values in levels.items():
+                session.execute(
+                    update(Shelter).where(Shelter.idShelter == idShelter).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                self._levels_changed(session, idShelter, **values)
+            on_commit(session, self._mark_applied, {key: takenAt for key, (takenAt, _) in newest.items()})
+            session.commit()
+            return {"status": "ok", "written": len(readings)}
+        except Exception as e:
+            session.rollback()
+            if _is_transient(e):
+                self.readings.requeue(batch)
+                logger.warning("Could not write %d readings: %s", len(batch), e)
+            else:
+                logger.error("Dropping %d readings that cannot be written: %s", len(batch), e)
+            return {"status": "error", "message": str(e)}
         finally:
             session.close()
 
+    def _drop_stored(self, session, readings) -> list:
+        # Una consulta por serie, acotada al intervalo del lote: lee un tramo contiguo de la clave primaria
+        series = {}
+        for reading in readings:
+            series.setdefault(reading[:2], []).append(reading[2])
+        stored = set()
+        for (idShelter, metric), times in series.items():
+            rows = session.execute(
+                select(ShelterReading.takenAt).where(
+                    ShelterReading.idShelter == idShelter,
+                    ShelterReading.metric == metric,
+                    ShelterReading.takenAt.between(min(times), max(times)),
+                )
+            ).scalars()
+            stored.update((idShelter, metric, takenAt) for takenAt in rows)
+        if not stored:
+            return readings
+        return [reading for reading in readings if reading[:3] not in stored]
+
+    def get_level_history(self, metric: str, start=None, end=None, points=None, idShelter: int = 1, session=None):
+        """
+        Returns the history of a shelter level, downsampled for charting.
+
+        The range is split into at most `points` buckets of equal width, and the
+        average, minimum, maximum and number of readings of each bucket are
+        computed in the database. Ranges with buckets of a minute or more are
+        read from the per-minute rollup, so the last 30 days cost about as much
+        as the last 12 hours.
+
+        Args:
+            metric (str): "energy", "water" or "radiation".
+            start (datetime, optional): Start of the range (UTC). Defaults to 24 hours before `end`.
+            end (datetime, optional): End of the range (UTC). Defaults to now.
+            points (int, optional): Largest number of buckets, capped by HISTORY_MAX_POINTS.
+                Defaults to HISTORY_DEFAULT_POINTS.
+            idShelter (int): The shelter. Defaults to the only shelter, 1.
+            session (Session, optional): SQLAlchemy session object for database interaction.
+                If not provided, a new session will be created.
+
+        Returns:
+            dict: Result of the operation.
+                - {"status": "ok", "metric": <metric>, "bucketSeconds": <width>, "series": {...}}:
+                `series` holds parallel lists `time` (bucket start), `avg`, `min`, `max`
+                and `count`; buckets without readings are omitted.
+                - {"status": "error", "message": <error_message>}:
+                If the metric or range is invalid, or a database error occurs.
+        """
+
+        if metric not in METRICS:
+            return {"status": "error", "message": f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}."}
+        end = end or datetime.utcnow()
+        start = start or end - timedelta(hours=24)
+        if start >= end:
+            return {"status": "error", "message": "The start of the range must be before its end."}
+        points = max(1, min(points or gb.HISTORY_DEFAULT_POINTS, gb.HISTORY_MAX_POINTS))
 
+        if session is None:
+            session = Session(self.db_client.engine)
+
+        try:
+            width, buckets = read_series(session, idShelter, METRICS[metric], to_millis(start), to_millis(end), points)
+            series = {"time": [], "avg": [], "min": [], "max": [], "count": []}
+            for at, average, low, high, count in buckets:
+                series["time"].append(from_millis(at))
+                series["avg"].append(round(average, 3))
+                series["min"].append(low)
+                series["max"].append(high)
+                series["count"].append(count)
+            return {"status": "ok", "metric": metric, "bucketSeconds": width / 1000, "series": series}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            session.close()
 
     def updateShelterEnergyLevel(self, new_energy_level: int, session=None):
         """
@@ -181,7 +516,9 @@ class ShelterController:
             # Actualizamos el nivel de energía
             shelter.energyLevel = new_energy_level
 
-            # Guardamos los cambios
+            # Guardamos los cambios y actualizamos la caché cuando se confirmen
+            self._record_reading(session, shelter.idShelter, "energy", new_energy_level)
+            self._levels_changed(session, shelter.idShelter, energyLevel=new_energy_level)
             session.commit()
 
             return {"status": "ok", "message": "Nivel de energía actualizado exitosamente"}
@@ -247,7 +584,9 @@ class ShelterController:
             # Actualizamos el nivel de energía
             shelter.waterLevel = new_water_level
 
-            # Guardamos los cambios
+            # Guardamos los cambios y actualizamos la caché cuando se confirmen
+            self._record_reading(session, shelter.idShelter, "water", new_water_level)
+            self._levels_changed(session, shelter.idShelter, waterLevel=new_water_level)
             session.commit()
 
             return {"status": "ok", "message": "Nivel de agua actualizado exitosamente"}
@@ -315,7 +654,9 @@ class ShelterController:
             # Actualizamos el nivel de energía
             shelter.radiationLevel = new_radiation_level
 
-            # Guardamos los cambios
+            # Guardamos los cambios y actualizamos la caché cuando se confirmen
+            self._record_reading(session, shelter.idShelter, "radiation", new_radiation_level)
+            self._levels_changed(session, shelter.idShelter, radiationLevel=new_radiation_level)
             session.commit()
 
             return {"status": "ok", "message": "Nivel de radiación actualizado exitosamente"}
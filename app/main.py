@@ -1,32 +1,136 @@
-from fastapi import FastAPI, HTTPException, Body
+import asyncio
+from fastapi import FastAPI, HTTPException, Body, Depends, Request
 from app.controllers.handler import Controllers
-from app.mysql.mysql import DatabaseClient
-from app.mysql.base import Base
+from app.controllers.resident_controller import ResidentController
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.machine_controller import MachineController
+from app.utils.concurrency import run_db, run_periodically, run_unit_of_work
+from app.controllers.ingest import MSGPACK_TYPES, decode_body, msgpack
+from app.utils.pagination import PageParams, page_params
+from app.utils.export import export_response, read_csv
+from app.utils.projection import fields_param
+from app.utils.responses import JSONRoute, get_response_class
+from app.utils.middleware import CompressionMiddleware, ServerTimingMiddleware
+from app.utils.conditional import conditional_get
+from app.utils.events import HEARTBEAT, TOPICS
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.mysql.mysql import DatabaseClient, dispose_engines, get_request_session
+from app.mysql.migrate import check_schema
 from app.mysql.initializeData import initialize_database
 from app.models import resident, room, family, machine, admin, alarm
 from datetime import date
+import csv
 import app.utils.vars as gb
-from app.models.resident import Resident as ResidentModel
+from app.models.resident import Resident as ResidentModel, ResidentPatch, ResidentBatchPatch, ResidentMove
 from app.controllers import resident_controller
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
+from sqlalchemy.orm import Session
 
 # Database initialization
 def initialize() -> None:
     """
-    Initializes the database by creating the schema and populating it with initial data.
+    Verifies the database schema version and populates it with initial data.
+
+    The schema itself is created and upgraded by `python -m app.mysql.migrate upgrade`,
+    which must run before the application starts.
     """
     db_client = DatabaseClient(gb.MYSQL_URL)
-    Base.metadata.create_all(db_client.engine)
-    initialize_database()
-
-# Initialize FastAPI and controllers
-app = FastAPI()
+    check_schema(db_client.engine)
+    if gb.SEED_DATABASE:
+        initialize_database(db_client.engine)
+
+# Initialize FastAPI and controllers (controllers are built lazily on first use)
+app = FastAPI(default_response_class=get_response_class())
+# Las rutas devuelven sus resultados con la clase de respuesta rápida, sin jsonable_encoder
+app.router.route_class = JSONRoute
 controllers = Controllers()
 
-# Execute database initialization
-initialize()
 
+@app.on_event("startup")
+def startup() -> None:
+    """
+    Runs the database initialization once the worker starts, instead of at import time,
+    and loads the resident name search index and the open alarm set.
+    """
+    initialize()
+    controllers.build_search_index()
+    controllers.load_open_alarms()
+
+
+@app.on_event("startup")
+async def start_reading_flusher() -> None:
+    """
+    Starts the background task that writes the buffered sensor readings.
+    """
+    app.state.reading_flusher = asyncio.get_running_loop().create_task(
+        run_periodically(gb.INGEST_FLUSH_INTERVAL, controllers.flush_readings)
+    )
+
+
+@app.on_event("startup")
+async def start_reading_pruner() -> None:
+    """
+    Starts the background task that deletes the readings older than their retention.
+    """
+    app.state.reading_pruner = asyncio.get_running_loop().create_task(
+        run_periodically(gb.READINGS_PRUNE_INTERVAL, controllers.prune_old_readings)
+    )
+
+
+@app.on_event("startup")
+async def start_alarm_rules() -> None:
+    """
+    Starts the background task that evaluates the committed level readings against the alarm rules.
+    """
+    app.state.alarm_rules = asyncio.get_running_loop().create_task(
+        run_periodically(gb.ALARM_RULES_INTERVAL, controllers.evaluate_alarm_rules)
+    )
+
+
+@app.on_event("shutdown")
+async def stop_reading_flusher() -> None:
+    """
+    Stops the background flush and writes the readings still buffered.
+    """
+    flusher = getattr(app.state, "reading_flusher", None)
+    if flusher is not None:
+        flusher.cancel()
+        await run_db(controllers.flush_readings)
+
+
+@app.on_event("shutdown")
+def stop_reading_pruner() -> None:
+    """
+    Stops the background deletion of old readings.
+    """
+    pruner = getattr(app.state, "reading_pruner", None)
+    if pruner is not None:
+        pruner.cancel()
+
+
+@app.on_event("shutdown")
+async def stop_alarm_rules() -> None:
+    """
+    Stops the rule evaluation task after evaluating the readings written by the final flush.
+    """
+    evaluator = getattr(app.state, "alarm_rules", None)
+    if evaluator is not None:
+        evaluator.cancel()
+        await run_db(controllers.evaluate_alarm_rules)
+
+
+@app.on_event("shutdown")
+def close_database_connections() -> None:
+    """
+    Releases the pooled database connections when the worker stops.
+    """
+    dispose_engines()
+
+
+# Starlette ejecuta primero el último middleware añadido: tiempos -> CORS -> compresión -> rutas
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +140,9 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir todos los headers
 )
 
+if gb.SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+
 # API Routes
 @app.get("/healthz")
 async def healthz():
@@ -48,9 +155,54 @@ async def healthz():
     return controllers.healthz()
 
 
+@app.get("/events")
+async def stream_events(request: Request, topics: str = ",".join(TOPICS)):
+    """
+    Pushes shelter level changes and alarm openings and closings as Server-Sent Events.
+
+    Each committed change is sent as a `level` event (`{"idShelter", <level>: <value>}`)
+    or an `alarm` event (`{"action": "created" | "closed" | "reopened" | "extended", "idAlarm", "idRoom", "start", "end"}`).
+    A client that falls too far behind receives a `resync` event instead of the
+    events it missed and should reload the state through the REST endpoints.
+    A comment line is sent every EVENTS_HEARTBEAT_SECONDS to keep the connection open.
+
+    Args:
+        topics (str): Comma-separated events to receive, "level" and/or "alarm".
+
+    Returns:
+        StreamingResponse: The `text/event-stream`, open until the client disconnects.
+    """
+    names = {name.strip() for name in topics.split(",") if name.strip()}
+    unknown = names - set(TOPICS)
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown)) or topics}")
+
+    subscription = controllers.events.subscribe(names)
+
+    async def stream():
+        try:
+            # Pide al navegador reconectar a los 3 s si se corta
+            yield b"retry: 3000\n\n"
+            while True:
+                frame = await subscription.next(gb.EVENTS_HEARTBEAT_SECONDS)
+                if frame is not None:
+                    yield frame
+                elif await request.is_disconnected():
+                    break
+                else:
+                    yield HEARTBEAT
+        finally:
+            controllers.events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Resident
 @app.post("/resident/create")
-async def create_resident(body: resident.Resident):
+async def create_resident(body: resident.Resident, session: Session = Depends(get_request_session)):
     """
     Creates a new resident.
 
@@ -60,11 +212,50 @@ async def create_resident(body: resident.Resident):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_resident(body)
+    return await run_unit_of_work(session, controllers.create_resident, body)
+
+
+def _check_import_size(rows):
+    if len(rows) > gb.IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {gb.IMPORT_MAX_ROWS} rows can be imported at once.")
+
+
+@app.post("/resident/import")
+async def import_residents(rows: List[dict] = Body(...), session: Session = Depends(get_request_session)):
+    """
+    Creates many residents in one transaction.
+
+    Args:
+        rows (list[dict]): JSON array of residents, with the fields of `/resident/create`.
+
+    Returns:
+        dict: Number of residents imported and the errors of the rejected rows.
+    """
+    _check_import_size(rows)
+    return await run_unit_of_work(session, controllers.import_residents, rows)
+
+
+@app.post("/resident/import/csv")
+async def import_residents_csv(request: Request, session: Session = Depends(get_request_session)):
+    """
+    Creates many residents from a CSV document sent as the request body.
+
+    The first line holds the column names (name, surname, birthDate, gender,
+    createdBy, idFamily); dates use the YYYY-MM-DD format.
+
+    Returns:
+        dict: Number of residents imported and the errors of the rejected rows.
+    """
+    try:
+        rows = read_csv(await request.body())
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    _check_import_size(rows)
+    return await run_unit_of_work(session, controllers.import_residents, rows)
 
 
 @app.delete("/resident/delete/{idResident}")
-async def delete_resident(idResident: int):
+async def delete_resident(idResident: int, session: Session = Depends(get_request_session)):
     """
     Deletes a resident by their ID.
 
@@ -74,7 +265,7 @@ async def delete_resident(idResident: int):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.delete_resident(idResident)
+    return await run_unit_of_work(session, controllers.delete_resident, idResident)
 
 
 @app.put("/resident/update/{idResident}")
@@ -86,6 +277,7 @@ async def update_resident(
     gender: str = None,
     idFamily: int = None,
     idRoom: int = None,
+    session: Session = Depends(get_request_session),
 ):
     """
     Updates a resident's information by their ID.
@@ -111,37 +303,90 @@ async def update_resident(
         "idRoom": idRoom,
     }
     updated_fields = {key: value for key, value in updated_fields.items() if value is not None}
-    return controllers.update_resident(idResident, updated_fields)
+    return await run_unit_of_work(session, controllers.update_resident, idResident, updated_fields)
+
 
+@app.patch("/resident/batch")
+async def patch_residents(patches: List[ResidentBatchPatch], session: Session = Depends(get_request_session)):
+    """
+    Applies a batch of partial updates to residents in one transaction.
+
+    Args:
+        patches (list[ResidentBatchPatch]): `idResident` and the fields to change of each resident.
+
+    Returns:
+        dict: The updated residents and the patches whose resident was not found.
+    """
+    return await run_unit_of_work(
+        session, controllers.patch_residents, [patch.dict(exclude_unset=True) for patch in patches]
+    )
+
+
+@app.patch("/resident/{idResident}")
+async def patch_resident(idResident: int, body: ResidentPatch, session: Session = Depends(get_request_session)):
+    """
+    Changes only the fields sent of a resident, with a single UPDATE.
+
+    Args:
+        idResident (int): Resident ID.
+        body (ResidentPatch): Fields to change.
+
+    Returns:
+        dict: Operation status and the updated resident.
+    """
+    result = await run_unit_of_work(session, controllers.patch_resident, idResident, body.dict(exclude_unset=True))
+    if result["status"] == "not found":
+        raise HTTPException(status_code=404, detail="Resident not found.")
+    return result
+
+
+@app.get("/resident/export")
+async def export_residents(format: str = "ndjson"):
+    """
+    Streams every resident as NDJSON or CSV, reading the table in chunks.
+
+    Args:
+        format (str): "ndjson" (default) or "csv".
+
+    Returns:
+        StreamingResponse: The export, written incrementally.
+    """
+    return export_response(controllers.export_residents(), ResidentController.EXPORT_FIELDS, format, "residents")
 
 @app.get("/resident/list")
-async def list_residents():
+async def list_residents(page: PageParams = Depends(page_params), fields: Optional[List[str]] = Depends(fields_param), session: Session = Depends(get_request_session)):
     """
-    Retrieves a list of all residents.
+    Retrieves one page of residents.
+
+    Args:
+        limit (int, optional): Page size (query parameter, capped by PAGE_MAX_LIMIT).
+        cursor (str, optional): `next_cursor` returned by the previous page.
+        fields (str, optional): Comma-separated fields to return, e.g. `name,surname`.
 
     Returns:
-        list[dict]: List of residents.
+        dict: Residents of the page and the `next_cursor` token.
     """
-    return controllers.list_residents()
+    return await run_unit_of_work(session, controllers.list_residents, limit=page.limit, cursor=page.cursor, fields=fields)
 
 
 @app.get("/room/residents")
-async def list_residents_in_room(idRoom: int):
+async def list_residents_in_room(idRoom: int, fields: Optional[List[str]] = Depends(fields_param), session: Session = Depends(get_request_session)):
     """
     Retrieves a list of all residents in a specific room.
 
     Args:
         idRoom (int): Room ID.
+        fields (str, optional): Comma-separated fields to return, e.g. `name,surname`.
 
     Returns:
         list[dict]: List of residents in the specified room.
     """
-    return controllers.list_residents_in_room(idRoom)
+    return await run_unit_of_work(session, controllers.list_residents_in_room, idRoom, fields=fields)
 
 
 # Room
 @app.post("/room/create")
-async def create_room(body: room.Room):
+async def create_room(body: room.Room, session: Session = Depends(get_request_session)):
     """
     Creates a new room.
 
@@ -151,22 +396,22 @@ async def create_room(body: room.Room):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_room(body)
+    return await run_unit_of_work(session, controllers.create_room, body)
 
 
 @app.get("/room/list_with_counts")
-async def list_rooms_with_resident_count():
+async def list_rooms_with_resident_count(session: Session = Depends(get_request_session)):
     """
     Retrieves a list of all rooms with the count of residents in each room.
 
     Returns:
         list[dict]: List of rooms with resident counts.
     """
-    return controllers.list_rooms_with_resident_count()
+    return await run_unit_of_work(session, controllers.list_rooms_with_resident_count)
 
 
 @app.get("/room/access")
-async def access_room(idResident: int, idRoom: int):
+async def access_room(idResident: int, idRoom: int, session: Session = Depends(get_request_session)):
     """
     Verifies whether a resident can access a specified room.
 
@@ -178,7 +423,7 @@ async def access_room(idResident: int, idRoom: int):
         dict: Access result message.
     """
     try:
-        message = controllers.access_room(idResident, idRoom)
+        message = await run_unit_of_work(session, controllers.access_room, idResident, idRoom)
         return {"message": message}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -186,7 +431,7 @@ async def access_room(idResident: int, idRoom: int):
 
 # Shelter
 @app.get("/shelter/energy")
-async def get_shelter_energy_level():
+async def get_shelter_energy_level(session: Session = Depends(get_request_session)):
     """
     Retrieves the energy level of the shelter.
 
@@ -194,13 +439,64 @@ async def get_shelter_energy_level():
         dict: Shelter energy level.
     """
     try:
-        return controllers.get_shelter_energy_level()
+        return await run_unit_of_work(session, controllers.get_shelter_energy_level)
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/shelter/readings", status_code=202)
+async def ingest_readings(request: Request):
+    """
+    Buffers a batch of timestamped sensor readings, written within INGEST_FLUSH_INTERVAL seconds.
+
+    The body is a JSON (or, with `Content-Type: application/msgpack`, msgpack)
+    list of readings, each `{"idShelter", "metric", "takenAt", "value"}` or the
+    compact `[idShelter, metric, takenAt, value]`; `takenAt` is in milliseconds
+    since the epoch. The newest value of each metric is also applied to the shelter.
+
+    Returns:
+        dict: Number of readings accepted and the errors of the rejected ones.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in MSGPACK_TYPES and msgpack is None:
+        raise HTTPException(status_code=415, detail="msgpack is not available on this server.")
+    try:
+        items = decode_body(await request.body(), content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid body: {e}")
+    result = controllers.ingest_readings(items)
+    if result["status"] == "busy":
+        raise HTTPException(status_code=503, detail=result["message"], headers={"Retry-After": "1"})
+    return result
+
+
+@app.get("/shelter/history")
+async def get_level_history(
+    metric: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: Optional[int] = None,
+    session: Session = Depends(get_request_session),
+):
+    """
+    Retrieves the history of a shelter level, downsampled for charting.
+
+    Args:
+        metric (str): "energy", "water" or "radiation".
+        start (datetime, optional): Start of the range (UTC); defaults to 24 hours before `end`.
+        end (datetime, optional): End of the range (UTC); defaults to now.
+        points (int, optional): Largest number of buckets returned.
+
+    Returns:
+        dict: Bucket width and the series of average, minimum and maximum values.
+    """
+    result = await run_unit_of_work(session, controllers.get_level_history, metric, start, end, points)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
 @app.get("/shelter/water")
-async def get_shelter_water_level():
+async def get_shelter_water_level(session: Session = Depends(get_request_session)):
     """
     Retrieves the water level of the shelter.
 
@@ -208,13 +504,13 @@ async def get_shelter_water_level():
         dict: Shelter water level.
     """
     try:
-        return controllers.get_shelter_water_level()
+        return await run_unit_of_work(session, controllers.get_shelter_water_level)
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/shelter/radiation")
-async def get_shelter_radiation_level():
+async def get_shelter_radiation_level(session: Session = Depends(get_request_session)):
     """
     Retrieves the radiation level of the shelter.
 
@@ -222,14 +518,14 @@ async def get_shelter_radiation_level():
         dict: Shelter radiation level.
     """
     try:
-        return controllers.get_shelter_radiation_level()
+        return await run_unit_of_work(session, controllers.get_shelter_radiation_level)
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Family
 @app.post("/family/create")
-async def create_family(body: family.Family):
+async def create_family(body: family.Family, session: Session = Depends(get_request_session)):
     """
     Creates a new family.
 
@@ -239,12 +535,12 @@ async def create_family(body: family.Family):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_family(body)
+    return await run_unit_of_work(session, controllers.create_family, body)
 
 
 # Machine
 @app.post("/machine/create")
-async def create_machine(body: machine.Machine):
+async def create_machine(body: machine.Machine, session: Session = Depends(get_request_session)):
     """
     Creates a new machine.
 
@@ -254,12 +550,12 @@ async def create_machine(body: machine.Machine):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_machine(body)
+    return await run_unit_of_work(session, controllers.create_machine, body)
 
 
 # Alarm
 @app.post("/alarm/create")
-async def create_alarm(body: alarm.Alarm):
+async def create_alarm(body: alarm.Alarm, session: Session = Depends(get_request_session)):
     """
     Creates a new alarm.
 
@@ -269,12 +565,12 @@ async def create_alarm(body: alarm.Alarm):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_alarm(body)
+    return await run_unit_of_work(session, controllers.create_alarm, body)
 
 
 # Admin
 @app.post("/admin/create")
-async def create_admin(body: admin.Admin):
+async def create_admin(body: admin.Admin, session: Session = Depends(get_request_session)):
     """
     Creates a new admin user.
 
@@ -284,10 +580,10 @@ async def create_admin(body: admin.Admin):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_admin(body)
+    return await run_unit_of_work(session, controllers.create_admin, body)
 
 @app.get("/login")
-async def login(name: str, surname: str):
+async def login(name: str, surname: str, session: Session = Depends(get_request_session)):
     """
     Login endpoint to verify resident credentials.
 
@@ -299,7 +595,7 @@ async def login(name: str, surname: str):
         dict: Status of the login attempt and user details if successful.
     """
     # Llamada al controlador para realizar el login, pasando name y surname
-    result = controllers.login(name, surname)
+    result = await run_unit_of_work(session, controllers.login, name, surname)
     
     if result["status"] == "error":
         raise HTTPException(status_code=401, detail=result["message"])
@@ -307,12 +603,12 @@ async def login(name: str, surname: str):
     return result
 
 @app.get("/loginAdmin")
-async def loginAdmin(email: str, password: str):
+async def loginAdmin(email: str, password: str, session: Session = Depends(get_request_session)):
     """
     Endpoint para realizar el login de un administrador y generar un token JWT.
     """
     # Llamada al controlador para realizar el login, pasando email y password
-    result = controllers.loginAdmin(email, password)
+    result = await run_unit_of_work(session, controllers.loginAdmin, email, password)
 
     if result['status'] == 'ok':
         return {
@@ -327,30 +623,37 @@ async def loginAdmin(email: str, password: str):
         }
 
 
-@app.get("/listRooms")
-async def list_rooms():
-    result = controllers.list_rooms()
-    
+def rooms_body(result):
     # Verifica si el resultado es un diccionario y contiene "status"
     if isinstance(result, dict) and result.get("status") == "error":
         raise HTTPException(status_code=401, detail=result["message"])
-    
+
+    # Las páginas ya vienen con "status", "rooms" y "next_cursor"
+    if isinstance(result, dict):
+        return result
+
     # Si no es un diccionario, asumimos que es una lista de habitaciones
     return {"status": "ok", "rooms": result}
 
+@app.get("/listRooms")
+async def list_rooms(request: Request, page: PageParams = Depends(page_params), fields: Optional[List[str]] = Depends(fields_param), session: Session = Depends(get_request_session)):
+    """
+    Lists one page of rooms. Supports If-None-Match / If-Modified-Since (304 when unchanged).
+    """
+    return await conditional_get(
+        request, session, ("room",), controllers.list_rooms,
+        limit=page.limit, cursor=page.cursor, fields=fields, render=rooms_body,
+    )
+
 @app.get("/listRooms/Room")
-async def list_rooms_Room():
-    result = controllers.list_rooms_Room()
-    
-    # Verifica si el resultado es un diccionario y contiene "status"
-    if isinstance(result, dict) and result.get("status") == "error":
-        raise HTTPException(status_code=401, detail=result["message"])
-    
-    # Si no es un diccionario, asumimos que es una lista de habitaciones
-    return {"status": "ok", "rooms": result}
+async def list_rooms_Room(request: Request, session: Session = Depends(get_request_session)):
+    """
+    Lists the rooms named "Room...". Supports If-None-Match / If-Modified-Since (304 when unchanged).
+    """
+    return await conditional_get(request, session, ("room",), controllers.list_rooms_Room, render=rooms_body)
 
 @app.delete("/admin/delete")
-async def delete_admin(admin_id: int):
+async def delete_admin(admin_id: int, session: Session = Depends(get_request_session)):
     """
     Deletes an admin user by ID.
 
@@ -360,20 +663,25 @@ async def delete_admin(admin_id: int):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.deleteAdmin(admin_id)
+    return await run_unit_of_work(session, controllers.deleteAdmin, admin_id)
 
 @app.get("/admin/list")
-async def list_admins():
+async def list_admins(page: PageParams = Depends(page_params), fields: Optional[List[str]] = Depends(fields_param), session: Session = Depends(get_request_session)):
     """
-    Lists all admin users.
+    Lists one page of admin users.
+
+    Args:
+        limit (int, optional): Page size (query parameter, capped by PAGE_MAX_LIMIT).
+        cursor (str, optional): `next_cursor` returned by the previous page.
+        fields (str, optional): Comma-separated fields to return, e.g. `email`.
 
     Returns:
-        dict: List of admins with their information.
+        dict: Admins of the page and the `next_cursor` token.
     """
-    return controllers.listAdmins()
+    return await run_unit_of_work(session, controllers.listAdmins, limit=page.limit, cursor=page.cursor, fields=fields)
 
 @app.get("/admin/get")
-async def get_admin(admin_id: int):
+async def get_admin(admin_id: int, session: Session = Depends(get_request_session)):
     """
     Obtiene los datos de un administrador por su ID.
 
@@ -383,10 +691,10 @@ async def get_admin(admin_id: int):
     Returns:
         dict: Datos del administrador.
     """
-    return controllers.getAdminById(admin_id)
+    return await run_unit_of_work(session, controllers.getAdminById, admin_id)
 
 @app.put("/admin/password")
-async def update_admin_password(idAdmin: int, new_password: str):
+async def update_admin_password(idAdmin: int, new_password: str, session: Session = Depends(get_request_session)):
     """
     Actualiza la contraseña de un administrador por su ID.
 
@@ -397,10 +705,10 @@ async def update_admin_password(idAdmin: int, new_password: str):
     Returns:
         dict: Estado de la operación y un mensaje.
     """
-    return controllers.updateAdminPassword(idAdmin, new_password)
+    return await run_unit_of_work(session, controllers.updateAdminPassword, idAdmin, new_password)
 
 @app.put("/admin/email")
-async def update_admin_email(idAdmin: int, new_email: str):
+async def update_admin_email(idAdmin: int, new_email: str, session: Session = Depends(get_request_session)):
     """
     Actualiza la contraseña de un administrador por su ID.
 
@@ -411,10 +719,10 @@ async def update_admin_email(idAdmin: int, new_email: str):
     Returns:
         dict: Estado de la operación y un mensaje.
     """
-    return controllers.updateAdminEmail(idAdmin, new_email)
+    return await run_unit_of_work(session, controllers.updateAdminEmail, idAdmin, new_email)
 
 @app.put("/admin/name")
-async def update_admin_name(idAdmin: int, new_name: str):
+async def update_admin_name(idAdmin: int, new_name: str, session: Session = Depends(get_request_session)):
     """
     Actualiza la contraseña de un administrador por su ID.
 
@@ -425,38 +733,51 @@ async def update_admin_name(idAdmin: int, new_name: str):
     Returns:
         dict: Estado de la operación y un mensaje.
     """
-    return controllers.updateAdminName(idAdmin, new_name)
+    return await run_unit_of_work(session, controllers.updateAdminName, idAdmin, new_name)
 
 @app.put("/shelter/energyLevel")
-async def update_energy_level(new_energy_level: int):
-    return controllers.updateShelterEnergyLevel(new_energy_level)
+async def update_energy_level(new_energy_level: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateShelterEnergyLevel, new_energy_level)
 
 @app.put("/shelter/waterLevel")
-async def update_water_level(new_water_level: int):
-    return controllers.updateShelterWaterLevel(new_water_level)
+async def update_water_level(new_water_level: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateShelterWaterLevel, new_water_level)
 
 @app.put("/shelter/radiationLevel")
-async def update_radiation_level(new_radiation_level: int):
-    return controllers.updateShelterRadiationLevel(new_radiation_level)
+async def update_radiation_level(new_radiation_level: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateShelterRadiationLevel, new_radiation_level)
 
 @app.put("/machine/off")
-async def off_machine (machine_name: str):
-    return controllers.updateMachineStatus(machine_name)
+async def off_machine (machine_name: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateMachineStatus, machine_name)
 
 @app.put("/machine/on")
-async def on_machine (machine_name: str):
-    return controllers.updateMachineStatusOn(machine_name)
+async def on_machine (machine_name: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateMachineStatusOn, machine_name)
 
 @app.put("/resident/idRoom")
-async def new_idRoom (resident_id: int, new_room_id: int):
-    return controllers.updateResidentRoom(resident_id, new_room_id)
+async def new_idRoom (resident_id: int, new_room_id: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateResidentRoom, resident_id, new_room_id)
+
+@app.post("/resident/move")
+async def move_residents(moves: List[ResidentMove], session: Session = Depends(get_request_session)):
+    """
+    Moves groups of residents and whole families to new rooms in one transaction.
+
+    Args:
+        moves (list[ResidentMove]): Target room and the residents or family to move there.
+
+    Returns:
+        dict: Operation status and the number of residents moved.
+    """
+    return await run_unit_of_work(session, controllers.move_residents, [move.dict() for move in moves])
 
 @app.get("/resident/get")
-async def get_admin(idResident: int):
-    return controllers.getResidentById(idResident)
+async def get_admin(idResident: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.getResidentById, idResident)
 
 @app.post("/alarmLevel/create")
-async def create_alarm_level(body: alarm.Alarm):
+async def create_alarm_level(body: alarm.Alarm, session: Session = Depends(get_request_session)):
     """
     Creates a new alarm.
 
@@ -466,68 +787,233 @@ async def create_alarm_level(body: alarm.Alarm):
     Returns:
         dict: Operation status and a message.
     """
-    return controllers.create_alarmLevel(body)
+    return await run_unit_of_work(session, controllers.create_alarmLevel, body)
 
 @app.put("/alarm/putEnd")
-async def alarm_endDate (idAlarm: int, new_enddate: datetime):
-    return controllers.updateAlarmEndDate(idAlarm, new_enddate)
+async def alarm_endDate (idAlarm: int, new_enddate: datetime, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateAlarmEndDate, idAlarm, new_enddate)
+
+@app.get("/alarm/open")
+async def list_open_alarms(idRoom: Optional[int] = None, session: Session = Depends(get_request_session)):
+    """
+    Lists the alarms that have not ended, from memory, without reading the alarm history.
+
+    Args:
+        idRoom (int, optional): Only the alarms of this room.
+
+    Returns:
+        dict: Open alarms, oldest first, and the number open in each room.
+    """
+    return await run_unit_of_work(session, controllers.list_open_alarms, idRoom)
+
+@app.get("/alarm/export")
+async def export_alarms(format: str = "ndjson"):
+    """
+    Streams every alarm as NDJSON or CSV, reading the table in chunks.
+
+    Args:
+        format (str): "ndjson" (default) or "csv".
+
+    Returns:
+        StreamingResponse: The export, written incrementally.
+    """
+    return export_response(controllers.export_alarms(), AlarmController.EXPORT_FIELDS, format, "alarms")
 
 @app.get("/alarm/list")
-async def list_alarms():
+async def list_alarms(
+    idRoom: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    session: Session = Depends(get_request_session),
+):
     """
-    Retrieves a list of all residents.
+    Retrieves one page of alarms, optionally of one room and started within a time range.
+
+    Args:
+        idRoom (int, optional): Only the alarms of this room.
+        since (datetime, optional): Only the alarms that started at or after this time.
+        until (datetime, optional): Only the alarms that started before this time.
+        limit (int, optional): Page size (query parameter, capped by PAGE_MAX_LIMIT).
+        cursor (str, optional): `next_cursor` returned by the previous page.
 
     Returns:
-        list[dict]: List of residents.
+        dict: Alarms of the page and the `next_cursor` token.
+    """
+    return await run_unit_of_work(
+        session, controllers.list_alarms, limit=page.limit, cursor=page.cursor, idRoom=idRoom, since=since, until=until
+    )
+
+@app.get("/alarm/stats/counts")
+async def count_alarms(
+    bucket: str = "hour",
+    idRoom: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: Session = Depends(get_request_session),
+):
     """
-    return controllers.list_alarms()
+    Counts the alarms started in each room per hour or per day.
+
+    Args:
+        bucket (str): "hour" (default) or "day".
+        idRoom (int, optional): Only the alarms of this room.
+        since (datetime, optional): Only the alarms that started at or after this time.
+        until (datetime, optional): Only the alarms that started before this time.
+
+    Returns:
+        dict: The count of each room and period with alarms.
+    """
+    result = await run_unit_of_work(session, controllers.count_alarms, bucket, idRoom, since, until)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+@app.get("/alarm/stats/durations")
+async def alarm_durations(
+    idRoom: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: Session = Depends(get_request_session),
+):
+    """
+    Mean and 95th percentile duration, in seconds, of the closed alarms of each room.
+
+    Args:
+        idRoom (int, optional): Only the alarms of this room.
+        since (datetime, optional): Only the alarms that started at or after this time.
+        until (datetime, optional): Only the alarms that started before this time.
+
+    Returns:
+        dict: Statistics per room and over every room.
+    """
+    return await run_unit_of_work(session, controllers.alarm_durations, idRoom, since, until)
+
+@app.get("/alarm/stats/open")
+async def count_open_alarms(session: Session = Depends(get_request_session)):
+    """
+    Number of alarms currently open in each room, from the in-memory open alarm set.
+
+    Returns:
+        dict: Open alarms per room and in total.
+    """
+    result = await run_unit_of_work(session, controllers.list_open_alarms)
+    if result["status"] == "error":
+        return result
+    return {"status": "ok", "rooms": result["rooms"], "total": sum(result["rooms"].values())}
+
+@app.get("/machine/export")
+async def export_machines(format: str = "ndjson"):
+    """
+    Streams every machine as NDJSON or CSV, reading the table in chunks.
+
+    Args:
+        format (str): "ndjson" (default) or "csv".
+
+    Returns:
+        StreamingResponse: The export, written incrementally.
+    """
+    return export_response(controllers.export_machines(), MachineController.EXPORT_FIELDS, format, "machines")
 
 @app.get("/machine/list")
-async def list_machines():
+async def list_machines(request: Request, page: PageParams = Depends(page_params), fields: Optional[List[str]] = Depends(fields_param), session: Session = Depends(get_request_session)):
     """
-    Retrieves a list of all machines.
+    Retrieves one page of machines, with the `next_cursor` token of the next one.
+    `?fields=` restricts the keys returned for each machine. Supports
+    If-None-Match / If-Modified-Since (304 when unchanged).
     """
-    return controllers.list_machines()
+    return await conditional_get(
+        request, session, ("machine",), controllers.list_machines,
+        limit=page.limit, cursor=page.cursor, fields=fields,
+    )
 
 @app.delete("/machine/delete")
-async def delete_machine(machine_id: int):
-    return controllers.deleteMachine(machine_id)
+async def delete_machine(machine_id: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.deleteMachine, machine_id)
 
 @app.put("/machine/update")
-async def update_machine (machine_name: str):
-    return controllers.updateMachineDate(machine_name)
+async def update_machine (machine_name: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateMachineDate, machine_name)
 
 @app.put("/room/name")
-async def update_Room_Name(idRoom: int, new_name: str):
-    return controllers.updateRoomName(idRoom, new_name)
+async def update_Room_Name(idRoom: int, new_name: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateRoomName, idRoom, new_name)
+
+@app.put("/family/move")
+async def move_family(idFamily: int, idRoom: int, session: Session = Depends(get_request_session)):
+    """
+    Moves a family and all its members to another room.
+
+    Args:
+        idFamily (int): Family ID.
+        idRoom (int): Target room ID.
+
+    Returns:
+        dict: Operation status and the number of residents moved.
+    """
+    return await run_unit_of_work(session, controllers.move_family, idFamily, idRoom)
 
 @app.delete("/family/delete")
-async def delete_family(family_id: int):
-    return controllers.deleteFamily(family_id)
+async def delete_family(family_id: int, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.deleteFamily, family_id)
 
 @app.get("/family/list")
-async def list_family():
-    return controllers.listFamilies()
+async def list_family(request: Request, page: PageParams = Depends(page_params), session: Session = Depends(get_request_session)):
+    return await conditional_get(
+        request, session, ("family",), controllers.listFamilies, limit=page.limit, cursor=page.cursor,
+    )
 
 @app.put("/name/resident")
-async def update_resident_name(idResident: int, new_name: str):
-    return controllers.updateResidentName(idResident, new_name)
+async def update_resident_name(idResident: int, new_name: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateResidentName, idResident, new_name)
 
 @app.put("/surname/resident")
-async def update_resident_surname(idResident: int, new_surname: str):
-    return controllers.updateResidentSurname(idResident, new_surname)
+async def update_resident_surname(idResident: int, new_surname: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateResidentSurname, idResident, new_surname)
 
 @app.put("/birthDate/resident")
-async def update_resident_birthDate(idResident: int, new_birthDate: str):
-    return controllers.updateResidentBirthDate(idResident, new_birthDate)
+async def update_resident_birthDate(idResident: int, new_birthDate: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateResidentBirthDate, idResident, new_birthDate)
 
 @app.put("/gender/resident")
-async def update_resident_gender(idResident: int, new_gender: str):
-    return controllers.updateResidentGender(idResident, new_gender)
+async def update_resident_gender(idResident: int, new_gender: str, session: Session = Depends(get_request_session)):
+    return await run_unit_of_work(session, controllers.updateResidentGender, idResident, new_gender)
 
 @app.get("/resident/search")
-async def search_residents(name: str, surname: str):
-    return controllers.getResidentRoomByNameAndSurname(name, surname)
+async def search_residents(
+    name: Optional[str] = None,
+    surname: Optional[str] = None,
+    q: Optional[str] = None,
+    mode: str = "exact",
+    limit: int = 10,
+    session: Session = Depends(get_request_session),
+):
+    """
+    Finds residents by name and surname.
+
+    Args:
+        name (str, optional): Exact name, with mode "exact".
+        surname (str, optional): Exact surname, with mode "exact".
+        q (str, optional): Words typed so far, e.g. "jo do", with the autocomplete modes.
+        mode (str): "exact" (the room of the resident called `name` `surname`), or the
+            autocomplete modes served from the in-memory index: "prefix" (every word of `q`
+            starts a name word) or "fuzzy" (also tolerates typos).
+        limit (int): Largest number of residents returned by autocomplete (capped by PAGE_MAX_LIMIT).
+
+    Returns:
+        dict: The resident's room with mode "exact"; the matching residents with their ID,
+            name and surname otherwise.
+    """
+    if mode == "exact":
+        if name is None or surname is None:
+            raise HTTPException(status_code=422, detail="name and surname are required.")
+        return await run_unit_of_work(session, controllers.getResidentRoomByNameAndSurname, name, surname)
+    if mode not in ("prefix", "fuzzy"):
+        raise HTTPException(status_code=400, detail=f"Unsupported search mode '{mode}'.")
+    if q is None:
+        raise HTTPException(status_code=422, detail="q is required.")
+    limit = max(1, min(limit, gb.PAGE_MAX_LIMIT))
+    return await run_unit_of_work(session, controllers.search_residents, q, limit, mode == "fuzzy")
 
 @app.post("/refreshToken")
 async def refresh_token_endpoint(refresh_token: str = Body(...)):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 class Resident(BaseModel):
@@ -30,4 +30,53 @@ class Resident(BaseModel):
     createDate: date
     update: Optional[date]
     idFamily: Optional[int]
-    idRoom: Optional[int]
\ No newline at end of file
+    idRoom: Optional[int]
+
+class ResidentPatch(BaseModel):
+
+    """
+    Partial update of a resident: only the fields sent are changed.
+
+    Attributes:
+        name (Optional[str]): New first name.
+        surname (Optional[str]): New surname.
+        birthDate (Optional[date]): New date of birth.
+        gender (Optional[str]): New gender.
+        idFamily (Optional[int]): New family.
+        idRoom (Optional[int]): New room.
+    """
+
+    name: Optional[str]
+    surname: Optional[str]
+    birthDate: Optional[date]
+    gender: Optional[str]
+    idFamily: Optional[int]
+    idRoom: Optional[int]
+
+
+class ResidentBatchPatch(ResidentPatch):
+
+    """
+    Partial update of one resident within a batch.
+
+    Attributes:
+        idResident (int): The resident to update.
+    """
+
+    idResident: int
+
+
+class ResidentMove(BaseModel):
+
+    """
+    Move of a group of residents, or of a whole family, to a room.
+
+    Attributes:
+        idRoom (int): Target room.
+        idResidents (Optional[List[int]]): Residents to move.
+        idFamily (Optional[int]): Family to move; its room and every member change.
+    """
+
+    idRoom: int
+    idResidents: Optional[List[int]]
+    idFamily: Optional[int]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.mysql.base import Base  
 
@@ -19,12 +19,25 @@ class Alarm(Base):
         idResident (int): Foreign key linking the alarm to a specific resident.
         idAdmin (int): Foreign key linking the alarm to the admin responsible.
         createDate (datetime): Timestamp indicating when the alarm was created.
+        metric (int): Code of the shelter level whose rule opened the alarm
+            (see `app.controllers.alarm_rules`), or None for alarms created through the API.
+
+    Indexes:
+        ix_alarm_idRoom_start: Alarms of a room ordered or filtered by start time.
+        ix_alarm_start: Time-window queries across all rooms.
+        ix_alarm_end_idRoom_start: Open alarms (`end IS NULL`) by room, read from the
+            index alone when the open alarm set is loaded.
     """
     
     __tablename__ = "alarm"
+    __table_args__ = (
+        Index("ix_alarm_idRoom_start", "idRoom", "start"),
+        Index("ix_alarm_end_idRoom_start", "end", "idRoom", "start"),
+    )
     idAlarm = Column(Integer, primary_key=True)
-    start = Column(DateTime)
+    start = Column(DateTime, index=True)
     end = Column(DateTime)
     idRoom = Column(Integer, ForeignKey("room.idRoom"))
     createDate = Column(DateTime)
+    metric = Column(SmallInteger, nullable=True)
 
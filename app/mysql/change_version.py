@@ -0,0 +1,66 @@
+from sqlalchemy import Column, Integer, String, DateTime, update, select
+from app.mysql.base import Base
+from datetime import datetime
+
+
+class ChangeVersion(Base):
+
+    """
+    Per-table change counter used to validate cached list responses.
+
+    Every write path that modifies a tracked table calls `bump_version` inside
+    its own transaction, so the version changes exactly when the committed data
+    does and is shared by every worker process.
+
+    Attributes:
+        tableName (str): Name of the tracked table (primary key).
+        version (int): Incremented on every committed change to the table.
+        changedAt (datetime): UTC time of the last change.
+    """
+
+    __tablename__ = "change_version"
+    tableName = Column(String (40), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changedAt = Column(DateTime, nullable=False)
+
+
+# Tablas cuyos listados admiten peticiones condicionales
+TRACKED_TABLES = ("room", "family", "machine")
+
+
+def bump_version(session, *tables) -> None:
+    """
+    Increments the change version of `tables` in the session's transaction.
+
+    Call it before committing a write to any of those tables.
+
+    Args:
+        session (Session): Session holding the write.
+        *tables (str): Names of the modified tables.
+    """
+    now = datetime.utcnow()
+    for table in tables:
+        result = session.execute(
+            update(ChangeVersion)
+            .where(ChangeVersion.tableName == table)
+            .values(version=ChangeVersion.version + 1, changedAt=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            session.add(ChangeVersion(tableName=table, version=1, changedAt=now))
+
+
+def read_versions(session, tables) -> list:
+    """
+    Returns the (version, changedAt) of each table, in the order given.
+
+    Tables that were never modified report version 0 and no change time.
+    """
+    rows = {
+        name: (version, changedAt)
+        for name, version, changedAt in session.execute(
+            select(ChangeVersion.tableName, ChangeVersion.version, ChangeVersion.changedAt)
+            .where(ChangeVersion.tableName.in_(tables))
+        )
+    }
+    return [rows.get(table, (0, None)) for table in tables]
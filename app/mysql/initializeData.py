@@ -1,7 +1,8 @@
 import os
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.mysql.mysql import DatabaseClient
-from app.mysql.base import Base
+from app.mysql.change_version import bump_version
 from app.mysql.admin import Admin
 from app.mysql.family import Family
 from app.mysql.machine import Machine
@@ -10,10 +11,11 @@ from app.mysql.room import Room
 from app.mysql.shelter import Shelter
 from datetime import date
 
-def initialize_database():
+def initialize_database(engine=None):
     
     """
     Seeds the database with initial data for all entities if the database is empty.
+    The schema must already exist (see `app.mysql.migrate`).
     This function ensures that the database is initialized with a default set of data
     for all core entities. It checks whether each entity's table is empty before 
     populating it with predefined data. This is useful for setting up the application
@@ -37,30 +39,51 @@ def initialize_database():
         - Machines: A machine (e.g., a heater) associated with a room.
 
     Process:
-        1. Checks if each entity's table is empty.
-        2. If empty, inserts predefined data for that entity.
-        3. Commits the session to persist the data.
-        4. Handles errors by rolling back the session and printing the error message.
+        1. Checks in a single query which entity tables are empty.
+        2. If none is empty, returns without further work.
+        3. Inserts predefined data for each empty entity.
+        4. Commits the session to persist the data.
+        5. Handles errors by rolling back the session and printing the error message.
 
+    Args:
+        engine (Engine, optional): Engine to seed. Defaults to the shared engine for MYSQL_URL.
+
+    Returns:
+        bool: True if any data was inserted, False if the database was already seeded.
     """
 
-    db_url = os.getenv("MYSQL_URL")
-    if not db_url:
-        raise ValueError("MYSQL_URL environment variable is not set.")
+    if engine is None:
+        db_url = os.getenv("MYSQL_URL")
+        if not db_url:
+            raise ValueError("MYSQL_URL environment variable is not set.")
+        engine = DatabaseClient(db_url).engine
 
-    db = DatabaseClient(db_url)
-    Base.metadata.create_all(db.engine)
-    session = Session(db.engine)
+    session = Session(engine)
 
     try:
-        if not session.query(Admin).first():
+        # Una sola consulta para saber qué tablas tienen datos
+        has_admin, has_shelter, has_room, has_family, has_resident, has_machine = session.execute(
+            select(
+                select(Admin.idAdmin).exists(),
+                select(Shelter.idShelter).exists(),
+                select(Room.idRoom).exists(),
+                select(Family.idFamily).exists(),
+                select(Resident.idResident).exists(),
+                select(Machine.idMachine).exists(),
+            )
+        ).one()
+
+        if all((has_admin, has_shelter, has_room, has_family, has_resident, has_machine)):
+            return False
+
+        if not has_admin:
             admin_data = [
                 {"idAdmin": 1, "email": "maria@gmail.com", "name": "Maria", "password": "Maria1"},
                 {"idAdmin": 2, "email": "ana@gmail.com", "name": "Ana", "password": "Ana2"},
             ]
             session.bulk_insert_mappings(Admin, admin_data)
 
-        if not session.query(Shelter).first():
+        if not has_shelter:
             shelter_data = [
                 {
                     "idShelter": 1,
@@ -76,7 +99,7 @@ def initialize_database():
             ]
             session.bulk_insert_mappings(Shelter, shelter_data)
 
-        if not session.query(Room).first():
+        if not has_room:
             room_data = [
                 {"idRoom": 1, "roomName": "Room 1", "maxPeople": 4, "createdBy": 1, "createDate": date.today(), "idShelter": 1},
                 {"idRoom": 2, "roomName": "Room 2", "maxPeople": 3, "createdBy": 1, "createDate": date.today(), "idShelter": 1},
@@ -86,21 +109,21 @@ def initialize_database():
             ]
             session.bulk_insert_mappings(Room, room_data)
 
-        if not session.query(Family).first():
+        if not has_family:
             family_data = [
                 {"idFamily": 1, "familyName": "Doe Family", "idRoom": 1, "idShelter": 1, "createdBy": 1, "createDate": date.today()},
                 {"idFamily": 2, "familyName": "Smith Family", "idRoom": 2, "idShelter": 1, "createdBy": 2, "createDate": date.today()},
             ]
             session.bulk_insert_mappings(Family, family_data)
 
-        if not session.query(Resident).first():
+        if not has_resident:
             resident_data = [
                 {"idResident": 1, "name": "John", "surname": "Doe", "birthDate": date(1990, 1, 1), "gender": "M", "createdBy": 1, "createDate": date.today(), "idRoom": 1, "idFamily": 1},
                 {"idResident": 2, "name": "Jane", "surname": "Smith", "birthDate": date(1985, 6, 15), "gender": "F", "createdBy": 1, "createDate": date.today(), "idRoom": 2, "idFamily": 2},
             ]
             session.bulk_insert_mappings(Resident, resident_data)
 
-        if not session.query(Machine).first():
+        if not has_machine:
             machine_data = [
                 {"idMachine": 1, "machineName": "Heater", "on": True, "idRoom": 2, "createdBy": 1, "createDate": date.today(), "update": None},
                 {"idMachine": 2, "machineName": "energy", "on": True, "idRoom": 4, "createdBy": 1, "createDate": date.today(), "update": None},
@@ -109,10 +132,16 @@ def initialize_database():
             ]
             session.bulk_insert_mappings(Machine, machine_data)
 
+        # Invalida los ETag de los listados que acaban de recibir datos
+        seeded = [table for table, present in (("room", has_room), ("family", has_family), ("machine", has_machine)) if not present]
+        bump_version(session, *seeded)
+
         session.commit()
         print("Database successfully seeded.")
+        return True
     except Exception as e:
         session.rollback()
         print(f"Error seeding database: {e}")
+        return False
     finally:
         session.close()
@@ -0,0 +1,160 @@
+import argparse
+import importlib
+import pkgutil
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, func
+
+import app.mysql.migrations as migrations_package
+from app.mysql.mysql import get_engine
+import app.utils.vars as gb
+
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("appliedAt", DateTime),
+)
+
+
+def load_migrations():
+    """
+    Loads the migration modules of `app.mysql.migrations` ordered by version.
+
+    Returns:
+        list[module]: Migration modules, each exposing VERSION, DESCRIPTION and upgrade().
+
+    Raises:
+        RuntimeError: If two migrations declare the same version.
+    """
+    modules = []
+    for info in pkgutil.iter_modules(migrations_package.__path__):
+        if info.name.startswith("v"):
+            modules.append(importlib.import_module(f"{migrations_package.__name__}.{info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+
+    versions = [module.VERSION for module in modules]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicated migration versions: {versions}")
+    return modules
+
+
+def latest_version() -> int:
+    """
+    Returns the schema version required by this code base.
+    """
+    migrations = load_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+
+def current_version(engine) -> int:
+    """
+    Returns the schema version recorded in the database, or 0 if none is recorded.
+    """
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_version.name):
+            return 0
+        return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine, target=None) -> list:
+    """
+    Applies every pending migration up to `target` (the latest by default).
+
+    Each migration runs in its own transaction together with the row that
+    records it, so an interrupted upgrade resumes from the last applied version.
+
+    Args:
+        engine (Engine): Engine of the database to upgrade.
+        target (int, optional): Version to stop at.
+
+    Returns:
+        list[int]: Versions applied by this call.
+    """
+    metadata.create_all(engine, checkfirst=True)
+    version = current_version(engine)
+    applied = []
+    for migration in load_migrations():
+        if migration.VERSION <= version or (target is not None and migration.VERSION > target):
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(
+                schema_version.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    appliedAt=datetime.utcnow(),
+                )
+            )
+        applied.append(migration.VERSION)
+    return applied
+
+
+def check_schema(engine) -> int:
+    """
+    Verifies that the database schema is at the version this code expects.
+
+    This is the only schema work done at application startup; upgrades are a
+    separate deployment step.
+
+    Returns:
+        int: The current schema version.
+
+    Raises:
+        RuntimeError: If the database is behind or ahead of the code.
+    """
+    current = current_version(engine)
+    latest = latest_version()
+    if current < latest:
+        raise RuntimeError(
+            f"Database schema is at version {current} but version {latest} is required. "
+            "Run `python -m app.mysql.migrate upgrade` first."
+        )
+    if current > latest:
+        raise RuntimeError(
+            f"Database schema is at version {current}, newer than this application ({latest})."
+        )
+    return current
+
+
+def main(argv=None) -> int:
+    """
+    Command line entry point: ``python -m app.mysql.migrate [upgrade|current|check]``.
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.mysql.migrate", description="Database schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "current", "check"])
+    parser.add_argument("--to", type=int, default=None, help="Version to upgrade to (default: latest)")
+    parser.add_argument("--url", default=gb.MYSQL_URL, help="Database URL (default: MYSQL_URL)")
+    args = parser.parse_args(argv)
+
+    engine = get_engine(args.url)
+
+    if args.command == "current":
+        print(f"Current schema version: {current_version(engine)} (latest: {latest_version()})")
+        return 0
+
+    if args.command == "check":
+        try:
+            check_schema(engine)
+        except RuntimeError as e:
+            print(e)
+            return 1
+        print("Database schema is up to date.")
+        return 0
+
+    applied = upgrade(engine, args.to)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        print("Database schema is already up to date.")
+    print(f"Current schema version: {current_version(engine)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
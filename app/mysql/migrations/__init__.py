@@ -0,0 +1,10 @@
+"""
+Versioned schema migrations.
+
+Each module in this package named ``v<NNNN>_<description>.py`` defines:
+    VERSION (int): Schema version the module upgrades to.
+    DESCRIPTION (str): Short human readable summary.
+    upgrade(connection): Applies the change on an open connection.
+
+Migrations are applied in VERSION order by `app.mysql.migrate`.
+"""
@@ -0,0 +1,60 @@
+"""
+Schema operations used by the migrations.
+
+Migrations describe the schema as it was at their version, with literal
+table and column definitions, and never read the models: a later change to
+a model must come with a new migration instead of changing what an old one
+does.
+"""
+
+from sqlalchemy import MetaData, Table, inspect, text
+
+
+def create_table(connection, name: str, *columns, metadata=None) -> Table:
+    """
+    Creates a table from literal column definitions, unless it already exists.
+
+    Args:
+        connection (Connection): Connection the table is created on.
+        name (str): Table name.
+        *columns: `Column` and constraint definitions of the table.
+        metadata (MetaData, optional): Metadata shared by the tables of one
+            migration, needed when their foreign keys refer to each other.
+
+    Returns:
+        Table: The table.
+    """
+    table = Table(name, metadata if metadata is not None else MetaData(), *columns)
+    table.create(connection, checkfirst=True)
+    return table
+
+
+def create_index(connection, name: str, table: str, *columns: str) -> bool:
+    """
+    Creates an index, unless the table already has one with that name.
+
+    Returns:
+        bool: Whether the index was created.
+    """
+    if name in {index["name"] for index in inspect(connection).get_indexes(table)}:
+        return False
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(text(f"CREATE INDEX {quote(name)} ON {quote(table)} ({', '.join(quote(column) for column in columns)})"))
+    return True
+
+
+def add_column(connection, table: str, name: str, definition: str) -> bool:
+    """
+    Adds a column, unless the table already has it.
+
+    Args:
+        definition (str): SQL type and options of the column, e.g. "SMALLINT NULL".
+
+    Returns:
+        bool: Whether the column was added.
+    """
+    if name in {column["name"] for column in inspect(connection).get_columns(table)}:
+        return False
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(name)} {definition}"))
+    return True
@@ -0,0 +1,91 @@
+from app.mysql.migrations import op
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Integer, MetaData, String
+
+VERSION = 1
+DESCRIPTION = "Initial schema: shelter, room, family, resident, machine, alarm and admin tables"
+
+
+def upgrade(connection):
+    """
+    Creates the base tables.
+
+    Tables that already exist are left untouched, so databases created before
+    migrations were introduced are adopted as version 1.
+    """
+    # Las claves foráneas apuntan a tablas creadas antes en esta misma migración
+    metadata = MetaData()
+    op.create_table(
+        connection, "shelter",
+        Column("idShelter", Integer, primary_key=True),
+        Column("shelterName", String(40), nullable=False),
+        Column("address", String(255)),
+        Column("phone", String(20)),
+        Column("email", String(40)),
+        Column("maxPeople", Integer),
+        Column("energyLevel", Integer),
+        Column("waterLevel", Integer),
+        Column("radiationLevel", Integer),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "room",
+        Column("idRoom", Integer, primary_key=True),
+        Column("roomName", String(40), nullable=False),
+        Column("createdBy", Integer),
+        Column("createDate", Date),
+        Column("idShelter", Integer, ForeignKey("shelter.idShelter")),
+        Column("maxPeople", Integer),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "family",
+        Column("idFamily", Integer, primary_key=True),
+        Column("familyName", String(40), nullable=False),
+        Column("idRoom", Integer, ForeignKey("room.idRoom")),
+        Column("idShelter", Integer, ForeignKey("shelter.idShelter")),
+        Column("createdBy", Integer),
+        Column("createDate", Date),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "resident",
+        Column("idResident", Integer, primary_key=True),
+        Column("name", String(40), nullable=False),
+        Column("surname", String(100), nullable=False),
+        Column("birthDate", Date),
+        Column("gender", String(1)),
+        Column("createdBy", Integer),
+        Column("createDate", Date),
+        Column("update", Date),
+        Column("idFamily", Integer, ForeignKey("family.idFamily")),
+        Column("idRoom", Integer, ForeignKey("room.idRoom")),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "machine",
+        Column("idMachine", Integer, primary_key=True),
+        Column("machineName", String(30), nullable=False),
+        Column("on", Boolean),
+        Column("idRoom", Integer, ForeignKey("room.idRoom")),
+        Column("createdBy", Integer),
+        Column("createDate", Date),
+        Column("update", Date),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "alarm",
+        Column("idAlarm", Integer, primary_key=True),
+        Column("start", DateTime),
+        Column("end", DateTime),
+        Column("idRoom", Integer, ForeignKey("room.idRoom")),
+        Column("createDate", DateTime),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "admin",
+        Column("idAdmin", Integer, primary_key=True),
+        Column("email", String(50), nullable=False),
+        Column("name", String(50), nullable=False),
+        Column("password", String(20), nullable=False),
+        metadata=metadata,
+    )
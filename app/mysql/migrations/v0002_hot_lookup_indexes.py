@@ -0,0 +1,18 @@
+from app.mysql.migrations import op
+
+VERSION = 2
+DESCRIPTION = "Secondary indexes for resident, machine, admin and alarm lookups"
+
+
+def upgrade(connection):
+    """
+    Adds the lookup indexes.
+
+    Foreign key columns get no single-column index: InnoDB already creates one
+    for every foreign key.
+    """
+    op.create_index(connection, "ix_resident_name_surname", "resident", "name", "surname")
+    op.create_index(connection, "ix_machine_machineName", "machine", "machineName")
+    op.create_index(connection, "ix_admin_email", "admin", "email")
+    op.create_index(connection, "ix_alarm_idRoom_start", "alarm", "idRoom", "start")
+    op.create_index(connection, "ix_alarm_start", "alarm", "start")
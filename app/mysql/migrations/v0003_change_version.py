@@ -0,0 +1,26 @@
+from app.mysql.migrations import op
+from sqlalchemy import Column, DateTime, Integer, String, select
+from datetime import datetime
+
+VERSION = 3
+DESCRIPTION = "change_version table used for ETag/Last-Modified on list endpoints"
+
+# Tablas con versión al introducir la tabla; las que se añadan después llegan con su propia migración
+TRACKED_TABLES = ("room", "family", "machine")
+
+
+def upgrade(connection):
+    """
+    Creates the change_version table with a row for every tracked table.
+    """
+    table = op.create_table(
+        connection, "change_version",
+        Column("tableName", String(40), primary_key=True),
+        Column("version", Integer, nullable=False),
+        Column("changedAt", DateTime, nullable=False),
+    )
+    existing = set(connection.execute(select(table.c.tableName)).scalars())
+    now = datetime.utcnow()
+    missing = [{"tableName": name, "version": 1, "changedAt": now} for name in TRACKED_TABLES if name not in existing]
+    if missing:
+        connection.execute(table.insert(), missing)
@@ -0,0 +1,34 @@
+from app.mysql.migrations import op
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, MetaData, SmallInteger, Table
+
+VERSION = 4
+DESCRIPTION = "shelter_reading time series and its per-minute rollup"
+
+
+def upgrade(connection):
+    """
+    Creates the shelter_reading and shelter_reading_minute tables.
+    """
+    # Solo para resolver las claves foráneas; la tabla ya existe
+    metadata = MetaData()
+    Table("shelter", metadata, Column("idShelter", Integer, primary_key=True))
+
+    op.create_table(
+        connection, "shelter_reading",
+        Column("idShelter", Integer, ForeignKey("shelter.idShelter"), primary_key=True, autoincrement=False),
+        Column("metric", SmallInteger, primary_key=True, autoincrement=False),
+        Column("takenAt", BigInteger, primary_key=True, autoincrement=False),
+        Column("value", Integer, nullable=False),
+        metadata=metadata,
+    )
+    op.create_table(
+        connection, "shelter_reading_minute",
+        Column("idShelter", Integer, ForeignKey("shelter.idShelter"), primary_key=True, autoincrement=False),
+        Column("metric", SmallInteger, primary_key=True, autoincrement=False),
+        Column("minute", BigInteger, primary_key=True, autoincrement=False),
+        Column("samples", Integer, nullable=False),
+        Column("total", BigInteger, nullable=False),
+        Column("low", Integer, nullable=False),
+        Column("high", Integer, nullable=False),
+        metadata=metadata,
+    )
@@ -0,0 +1,11 @@
+from app.mysql.migrations import op
+
+VERSION = 5
+DESCRIPTION = "alarm.metric: level whose threshold rule opened the alarm"
+
+
+def upgrade(connection):
+    """
+    Adds the nullable metric column to the alarm table.
+    """
+    op.add_column(connection, "alarm", "metric", "SMALLINT NULL")
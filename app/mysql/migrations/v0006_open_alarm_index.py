@@ -0,0 +1,11 @@
+from app.mysql.migrations import op
+
+VERSION = 6
+DESCRIPTION = "Covering index on alarm (end, idRoom, start) for loading the open alarms"
+
+
+def upgrade(connection):
+    """
+    Adds the open alarm index.
+    """
+    op.create_index(connection, "ix_alarm_end_idRoom_start", "alarm", "end", "idRoom", "start")
@@ -1,14 +1,72 @@
+import functools
+import logging
+import threading
+
 import sqlalchemy as db
+from sqlalchemy import event
 from app.mysql.base import Base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+import app.utils.vars as gb
+
+
+logger = logging.getLogger(__name__)
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(url: str):
+  """
+  Returns the process-wide engine for `url`, creating it on first use.
+
+  Every DatabaseClient built for the same URL shares this engine and therefore
+  its connection pool, so requests reuse pooled connections instead of opening
+  a new TCP connection and authenticating against MySQL on every call.
+
+  Pool sizing is read from `app.utils.vars` (MYSQL_POOL_SIZE, MYSQL_MAX_OVERFLOW,
+  MYSQL_POOL_RECYCLE, MYSQL_POOL_PRE_PING). SQLite URLs, used by the tests, keep
+  SQLAlchemy's default pool because they do not accept those options.
+
+  Args:
+      url (str): Database URL.
+
+  Returns:
+      Engine: The shared SQLAlchemy engine for the URL.
+  """
+  engine = _engines.get(url)
+  if engine is not None:
+    return engine
+
+  with _engines_lock:
+    engine = _engines.get(url)
+    if engine is None:
+      options = {}
+      if not url.startswith("sqlite"):
+        options = {
+          "pool_size": gb.MYSQL_POOL_SIZE,
+          "max_overflow": gb.MYSQL_MAX_OVERFLOW,
+          "pool_recycle": gb.MYSQL_POOL_RECYCLE,
+          "pool_pre_ping": gb.MYSQL_POOL_PRE_PING,
+        }
+      engine = db.create_engine(url, **options)
+      _engines[url] = engine
+  return engine
+
+
+def dispose_engines() -> None:
+  """
+  Closes the pooled connections of every registered engine and empties the registry.
+  """
+  with _engines_lock:
+    for engine in _engines.values():
+      engine.dispose()
+    _engines.clear()
 
 
 class DatabaseClient():
-  
+
   def __init__(self, url: str) -> None:
-    engine = db.create_engine(url)
-    self.engine = engine
-    pass
+    self.engine = get_engine(url)
 
   def init_database(self):
     """
@@ -16,4 +74,152 @@ class DatabaseClient():
     """
     Base.metadata.create_all(self.engine)
     return
-    
+
+  def create_indexes(self):
+    """
+    Creates the indexes declared on the models that are missing in the database.
+
+    Returns:
+        list[str]: Names of the indexes that were created.
+    """
+    with self.engine.begin() as connection:
+      return create_missing_indexes(connection)
+
+
+def create_missing_indexes(connection, tables=None):
+  """
+  Creates the model indexes that are missing from tables that already exist.
+
+  `create_all` only creates indexes together with new tables, so deployments
+  whose tables already exist need this to receive indexes added later.
+
+  Args:
+      connection (Connection): Connection the indexes are created on.
+      tables (list[str], optional): Restrict the check to these table names.
+
+  Returns:
+      list[str]: Names of the indexes that were created.
+  """
+  inspector = db.inspect(connection)
+  existing_tables = set(inspector.get_table_names())
+  created = []
+  for table in Base.metadata.sorted_tables:
+    if table.name not in existing_tables or (tables is not None and table.name not in tables):
+      continue
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    for index in table.indexes:
+      if index.name not in existing:
+        index.create(connection)
+        created.append(index.name)
+  return created
+
+
+class RequestSession(Session):
+  """
+  Session shared by every controller call made while serving one request.
+
+  Controllers commit and close the session they receive. Inside a request those
+  calls must not end the transaction, so `commit` only flushes (generated keys
+  are still assigned) and `close` is ignored. The request owner ends the unit of
+  work once with `complete`, and `release` returns the connection to the pool.
+  A `rollback` issued by a controller still discards the whole request.
+  """
+
+  def commit(self):
+    self.flush()
+
+  def close(self):
+    pass
+
+  def complete(self):
+    """
+    Commits everything the request wrote in a single transaction.
+    """
+    Session.commit(self)
+
+  def release(self):
+    """
+    Closes the session, rolling back anything that was not completed.
+    """
+    Session.close(self)
+
+
+def get_request_session():
+  """
+  FastAPI dependency that provides one RequestSession per request.
+
+  Yields:
+      RequestSession: Session bound to the shared engine for `MYSQL_URL`.
+  """
+  session = RequestSession(get_engine(gb.MYSQL_URL))
+  try:
+    yield session
+  finally:
+    session.release()
+
+
+def on_commit(session, callback, *args, **kwargs):
+  """
+  Runs `callback(*args, **kwargs)` once the session's transaction is committed.
+
+  In-process state derived from the database (caches, counters, indexes) must
+  only change when the write is durable. With a RequestSession that happens
+  when the request completes, not when the controller calls `commit`. The
+  callback is dropped if the transaction is rolled back or closed instead.
+  Register it before calling `commit`.
+
+  Args:
+      session (Session): Session holding the pending write.
+      callback (callable): Function to call after the commit.
+  """
+  callbacks = session.info.get("on_commit")
+  if callbacks is None:
+    callbacks = session.info["on_commit"] = []
+    event.listen(session, "after_commit", _run_commit_callbacks)
+    event.listen(session, "after_transaction_end", _discard_commit_callbacks)
+  callbacks.append(functools.partial(callback, *args, **kwargs))
+
+
+def pending_on_commit(session, apply, factory=None):
+  """
+  Returns the changes `session` has queued for `apply`, registering `apply` on first use.
+
+  In-memory structures record their changes in a container handed to
+  `apply` by `on_commit`, so the changes are applied after the commit and
+  vanish with the callback on rollback. Every write of the same transaction
+  goes to the same container.
+
+  Args:
+      session (Session): Session holding the pending write.
+      apply (callable): Callback that applies the container after the commit.
+      factory (callable, optional): Builds the container (e.g. `list`) the first
+          time. None only looks it up.
+
+  Returns:
+      The queued container, or None when there is none and no factory is given.
+  """
+  for callback in session.info.get("on_commit", ()):
+    if callback.func == apply:
+      return callback.args[0]
+  if factory is None:
+    return None
+  pending = factory()
+  on_commit(session, apply, pending)
+  return pending
+
+
+def _run_commit_callbacks(session):
+  callbacks = session.info.get("on_commit", [])
+  pending = list(callbacks)
+  callbacks.clear()
+  for callback in pending:
+    try:
+      callback()
+    except Exception:
+      logger.exception("Post-commit callback failed")
+
+
+def _discard_commit_callbacks(session, transaction):
+  if transaction.parent is None:
+    session.info.get("on_commit", []).clear()
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.mysql.base import Base  
 
@@ -21,9 +21,16 @@ class Resident(Base):
         update (date): The date when the resident entry was last updated.
         idFamily (int): Foreign key linking the resident to a specific family.
         idRoom (int): Foreign key linking the resident to a specific room.
+
+    Indexes:
+        ix_resident_name_surname: Login and room lookup by name and surname.
+        Family and room membership lookups use the index InnoDB creates for each foreign key.
     """
 
     __tablename__ = "resident"
+    __table_args__ = (
+        Index("ix_resident_name_surname", "name", "surname"),
+    )
     idResident = Column(Integer, primary_key=True)
     name = Column(String (40), nullable=False)
     surname = Column(String (100), nullable=False)
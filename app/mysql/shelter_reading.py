@@ -0,0 +1,193 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, ForeignKey, case, delete, func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.mysql.base import Base
+from datetime import datetime, timezone
+
+
+# Métricas registradas y su código en la columna `metric`
+METRICS = {"energy": 1, "water": 2, "radiation": 3}
+
+MINUTE_MS = 60_000
+
+
+class ShelterReading(Base):
+
+    """
+    One reading of a shelter level, stored in a narrow append-only table.
+
+    The primary key (idShelter, metric, takenAt) is also the clustering order in
+    InnoDB, so the readings of one series over a time range are read as a
+    single contiguous range.
+
+    Attributes:
+        idShelter (int): Shelter the reading belongs to.
+        metric (int): Code of the level, see `METRICS`.
+        takenAt (int): Time of the reading, in milliseconds since the epoch (UTC).
+        value (int): The level.
+    """
+
+    __tablename__ = "shelter_reading"
+    idShelter = Column(Integer, ForeignKey("shelter.idShelter"), primary_key=True, autoincrement=False)
+    metric = Column(SmallInteger, primary_key=True, autoincrement=False)
+    takenAt = Column(BigInteger, primary_key=True, autoincrement=False)
+    value = Column(Integer, nullable=False)
+
+
+class ShelterReadingMinute(Base):
+
+    """
+    Per-minute rollup of `ShelterReading`, maintained as readings are appended.
+
+    Long ranges are charted from this table, which holds 1/60 of the rows of the
+    raw readings at one reading per second.
+
+    Attributes:
+        idShelter (int): Shelter the readings belong to.
+        metric (int): Code of the level, see `METRICS`.
+        minute (int): Start of the minute, in milliseconds since the epoch (UTC).
+        samples (int): Number of readings in the minute.
+        total (int): Sum of their values.
+        low (int): Smallest value.
+        high (int): Largest value.
+    """
+
+    __tablename__ = "shelter_reading_minute"
+    idShelter = Column(Integer, ForeignKey("shelter.idShelter"), primary_key=True, autoincrement=False)
+    metric = Column(SmallInteger, primary_key=True, autoincrement=False)
+    minute = Column(BigInteger, primary_key=True, autoincrement=False)
+    samples = Column(Integer, nullable=False)
+    total = Column(BigInteger, nullable=False)
+    low = Column(Integer, nullable=False)
+    high = Column(Integer, nullable=False)
+
+
+def to_millis(moment: datetime) -> int:
+    """
+    Converts a datetime into milliseconds since the epoch; naive datetimes are taken as UTC.
+    """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((moment - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def from_millis(millis: int) -> datetime:
+    """
+    Converts milliseconds since the epoch into a naive UTC datetime.
+    """
+    return datetime.utcfromtimestamp(millis / 1000)
+
+
+def append_readings(session, readings) -> None:
+    """
+    Appends readings and folds them into the per-minute rollup, in the session's transaction.
+
+    Args:
+        session (Session): Session holding the write.
+        readings (list[tuple]): (idShelter, metric code, takenAt in ms, value) tuples.
+    """
+    if not readings:
+        return
+    session.execute(
+        ShelterReading.__table__.insert(),
+        [{"idShelter": idShelter, "metric": metric, "takenAt": takenAt, "value": value}
+         for idShelter, metric, takenAt, value in readings],
+    )
+
+    # Agrega en memoria por minuto antes de tocar la tabla resumen
+    minutes = {}
+    for idShelter, metric, takenAt, value in readings:
+        key = (idShelter, metric, takenAt - takenAt % MINUTE_MS)
+        samples, total, low, high = minutes.get(key, (0, 0, value, value))
+        minutes[key] = (samples + 1, total + value, min(low, value), max(high, value))
+
+    # Un único INSERT ... ON DUPLICATE KEY UPDATE: dos escritores a la vez no chocan en la clave del minuto
+    rows = [
+        {"idShelter": key[0], "metric": key[1], "minute": key[2], "samples": samples, "total": total, "low": low, "high": high}
+        for key, (samples, total, low, high) in minutes.items()
+    ]
+    session.execute(minute_upsert(session.get_bind().dialect.name), rows)
+
+
+def minute_upsert(dialect: str):
+    """
+    Returns the statement that adds readings to the per-minute rollup, creating the minutes that are missing.
+
+    Args:
+        dialect (str): Name of the database dialect ("mysql", "mariadb", "sqlite" or "postgresql").
+    """
+    table = ShelterReadingMinute.__table__
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(
+            samples=table.c.samples + stmt.inserted.samples,
+            total=table.c.total + stmt.inserted.total,
+            low=func.least(table.c.low, stmt.inserted.low),
+            high=func.greatest(table.c.high, stmt.inserted.high),
+        )
+    stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.idShelter, table.c.metric, table.c.minute],
+        set_={
+            "samples": table.c.samples + stmt.excluded.samples,
+            "total": table.c.total + stmt.excluded.total,
+            "low": case((stmt.excluded.low < table.c.low, stmt.excluded.low), else_=table.c.low),
+            "high": case((stmt.excluded.high > table.c.high, stmt.excluded.high), else_=table.c.high),
+        },
+    )
+
+
+def read_series(session, idShelter: int, metric: int, start: int, end: int, points: int) -> tuple:
+    """
+    Returns a series downsampled to at most `points` buckets, aggregated in the database.
+
+    Buckets of a minute or longer are read from the per-minute rollup, so a
+    30-day chart reads about 43,000 rollup rows instead of 2.6 million
+    readings. Shorter buckets are read from the raw readings.
+
+    Args:
+        session (Session): Session the query runs on.
+        idShelter (int): Shelter of the series.
+        metric (int): Code of the level, see `METRICS`.
+        start (int): Start of the range, in ms since the epoch (inclusive).
+        end (int): End of the range, in ms since the epoch (exclusive).
+        points (int): Largest number of buckets returned.
+
+    Returns:
+        tuple: (bucket width in ms, list of (bucket start in ms, avg, min, max, count)),
+            with empty buckets omitted.
+    """
+    width = max(1000, -(-(end - start) // max(points, 1)))
+    if width >= MINUTE_MS:
+        # Los cubos se alinean a minutos completos para poder usar la tabla resumen
+        width = -(-width // MINUTE_MS) * MINUTE_MS
+        start -= start % MINUTE_MS
+        table = ShelterReadingMinute
+        time_column = ShelterReadingMinute.minute
+        aggregates = (
+            func.sum(ShelterReadingMinute.total), func.min(ShelterReadingMinute.low),
+            func.max(ShelterReadingMinute.high), func.sum(ShelterReadingMinute.samples),
+        )
+    else:
+        table = ShelterReading
+        time_column = ShelterReading.takenAt
+        aggregates = (
+            func.sum(ShelterReading.value), func.min(ShelterReading.value),
+            func.max(ShelterReading.value), func.count(),
+        )
+
+    bucket = (time_column - (time_column - start) % width).label("bucket")
+    rows = session.execute(
+        select(bucket, *aggregates)
+        .where(table.idShelter == idShelter, table.metric == metric, time_column >= start, time_column < end)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    return width, [(int(at), float(total) / count, low, high, int(count)) for at, total, low, high, count in rows]
+
+
+def prune_readings(session, raw_before: int, rollup_before: int) -> None:
+    """
+    Deletes the raw readings taken before `raw_before` and the rollups before `rollup_before` (ms).
+    """
+    session.execute(delete(ShelterReading).where(ShelterReading.takenAt < raw_before))
+    session.execute(delete(ShelterReadingMinute).where(ShelterReadingMinute.minute < rollup_before))
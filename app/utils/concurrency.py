@@ -0,0 +1,97 @@
+import functools
+import logging
+
+import anyio
+import anyio.to_thread
+
+import app.utils.vars as gb
+
+
+logger = logging.getLogger(__name__)
+
+_limiter = None
+
+
+def get_db_limiter() -> anyio.CapacityLimiter:
+    """
+    Returns the capacity limiter that bounds how many controller calls run at once.
+
+    The limiter is created on first use because anyio needs a running event loop
+    to build it. Its size defaults to the size of the connection pool, so the
+    threads never outnumber the connections they can check out.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(gb.DB_THREADPOOL_SIZE)
+    return _limiter
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Runs a blocking controller call in the bounded database thread pool.
+
+    The routes in `app.main` are `async def`, so calling the synchronous
+    SQLAlchemy controllers directly would block the event loop. Awaiting this
+    helper keeps the loop free to serve other requests while the query runs.
+
+    Args:
+        func (callable): Controller method to execute.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        Any: Whatever `func` returns.
+    """
+    return await anyio.to_thread.run_sync(
+        functools.partial(func, *args, **kwargs), limiter=get_db_limiter()
+    )
+
+
+async def run_unit_of_work(session, func, *args, **kwargs):
+    """
+    Runs a controller call with the request session and commits it once.
+
+    The call and the final commit happen in the same worker thread, before the
+    response is sent, so a failed commit is reported to the client. Any error
+    rolls back everything the request wrote.
+
+    Args:
+        session (RequestSession): Session provided by `get_request_session`.
+        func (callable): Controller method accepting a `session` keyword.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        Any: Whatever `func` returns.
+    """
+    def call():
+        try:
+            result = func(*args, session=session, **kwargs)
+            session.complete()
+            return result
+        except Exception:
+            session.rollback()
+            raise
+
+    return await anyio.to_thread.run_sync(call, limiter=get_db_limiter())
+
+
+async def run_periodically(interval: float, func, *args, **kwargs):
+    """
+    Calls a blocking function in the database thread pool every `interval` seconds.
+
+    Runs until the task that awaits it is cancelled. Errors are logged and do
+    not stop the loop.
+
+    Args:
+        interval (float): Seconds between the end of one call and the start of the next.
+        func (callable): Function to call, such as a controller flush.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+    """
+    while True:
+        await anyio.sleep(interval)
+        try:
+            await run_db(func, *args, **kwargs)
+        except Exception:
+            logger.exception("Periodic call to %s failed", getattr(func, "__name__", func))
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.responses import Response
+
+from app.mysql.change_version import read_versions
+from app.utils.concurrency import run_unit_of_work
+from app.utils.responses import get_response_class
+
+
+def make_etag(tables, versions, variant: str) -> str:
+    """
+    Builds a weak ETag from the change versions of `tables` and the request variant.
+
+    Args:
+        tables (tuple[str]): Tables the response is built from.
+        versions (list[tuple]): (version, changedAt) of each table.
+        variant (str): Path and query string, so each page and fieldset has its own tag.
+
+    Returns:
+        str: The ETag header value.
+    """
+    key = f"{variant}|" + ",".join(f"{table}:{version}" for table, (version, _) in zip(tables, versions))
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def is_not_modified(headers, etag: str, last_modified) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when the former is absent.
+
+    Args:
+        headers (Headers): Request headers.
+        etag (str): Current ETag of the resource.
+        last_modified (datetime, optional): Current modification time (UTC).
+
+    Returns:
+        bool: True if the client copy is still valid.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _load(headers, variant, tables, func, args, kwargs, session=None):
+    # Se ejecuta en el hilo de la base de datos: primero la versión, y la consulta solo si hace falta
+    versions = read_versions(session, tables)
+    etag = make_etag(tables, versions, variant)
+    changes = [changedAt for _, changedAt in versions if changedAt is not None]
+    last_modified = max(changes).replace(tzinfo=timezone.utc) if changes else None
+
+    validators = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if is_not_modified(headers, etag, last_modified):
+        return validators, None, True
+    return validators, func(*args, session=session, **kwargs), False
+
+
+async def conditional_get(request, session, tables, func, *args, render=None, **kwargs):
+    """
+    Serves a list endpoint with ETag/Last-Modified validation.
+
+    The change versions of `tables` are read first (one primary key lookup).
+    If the client copy is still current, a 304 is returned and the controller
+    is not called, so the list query and its serialization are skipped.
+    Otherwise the controller runs in the same transaction and its result is
+    returned with the validators.
+
+    Args:
+        request (Request): Incoming request, for its conditional headers.
+        session (RequestSession): Session provided by `get_request_session`.
+        tables (tuple[str]): Tables the response is built from (see `TRACKED_TABLES`).
+        func (callable): Controller method accepting a `session` keyword.
+        *args: Positional arguments for `func`.
+        render (callable, optional): Maps the controller result to the response body;
+            may raise HTTPException.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        Response: 304 without a body, or the rendered result with its validators.
+    """
+    variant = request.url.path + "?" + request.url.query
+    validators, result, not_modified = await run_unit_of_work(
+        session, _load, request.headers, variant, tables, func, args, kwargs
+    )
+    if not_modified:
+        return Response(status_code=304, headers=validators)
+
+    body = render(result) if render is not None else result
+    if isinstance(body, dict) and body.get("status") == "error":
+        return get_response_class()(body)
+    return get_response_class()(body, headers=validators)
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+from app.utils.responses import json_bytes
+
+
+# Eventos publicados por los controladores
+TOPICS = ("level", "alarm")
+
+# Comentario SSE que mantiene viva la conexión a través de proxies
+HEARTBEAT = b": ping\n\n"
+
+
+def format_event(event: str, data) -> bytes:
+    """
+    Encodes one Server-Sent Event frame.
+
+    Args:
+        event (str): Event name, e.g. "level".
+        data: JSON-serializable payload.
+
+    Returns:
+        bytes: The frame, ending with the blank line that delimits it.
+    """
+    return b"event: " + event.encode() + b"\ndata: " + json_bytes(data) + b"\n\n"
+
+
+# Se envía a un suscriptor que se ha quedado atrás: debe volver a leer el estado por REST
+RESYNC = format_event("resync", {"reason": "The client fell behind and missed events."})
+
+
+class Subscription:
+    """
+    Queue of encoded events for one connected client.
+
+    The queue is bounded. When a slow client lets it fill up, the pending
+    events are discarded and replaced by a single `resync` event, so the
+    publisher never blocks and memory per client stays bounded; the client
+    then reloads the current state through the REST endpoints.
+
+    Attributes:
+        topics (frozenset[str]): Event names the client receives.
+        dropped (int): Events discarded because the client was too slow.
+    """
+
+    def __init__(self, topics, max_queue: int, loop) -> None:
+        self.topics = frozenset(topics)
+        self.dropped = 0
+        self._loop = loop
+        self._queue = asyncio.Queue(max_queue)
+
+    def push(self, frame: bytes) -> None:
+        """
+        Queues a frame from the event loop thread, without blocking.
+        """
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+
+    async def next(self, timeout: float):
+        """
+        Waits for the next frame; returns None if none arrives within `timeout` seconds.
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroadcaster:
+    """
+    In-process publisher that fans events out to every subscribed client.
+
+    Controllers publish from the database worker threads, usually through
+    `on_commit` so only committed changes are announced. Each event is encoded
+    once and handed to the event loop of every subscriber, which queues it
+    without waiting for the client (see `Subscription`).
+
+    Only the clients connected to this worker receive its events; with several
+    workers, each one pushes the changes written through it.
+
+    Attributes:
+        max_queue (int): Frames buffered per client before it is asked to resync.
+    """
+
+    def __init__(self, max_queue: int = 100) -> None:
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, topics) -> Subscription:
+        """
+        Registers a client; must be called from the event loop that serves it.
+
+        Args:
+            topics (Iterable[str]): Event names the client wants.
+
+        Returns:
+            Subscription: The client's queue. Pass it to `unsubscribe` when it disconnects.
+        """
+        subscription = Subscription(topics, self.max_queue, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: str, data) -> None:
+        """
+        Sends an event to every client subscribed to it. Safe to call from any thread.
+
+        Args:
+            event (str): Event name, e.g. "level" or "alarm".
+            data: JSON-serializable payload.
+        """
+        with self._lock:
+            targets = [subscription for subscription in self._subscriptions if event in subscription.topics]
+        if not targets:
+            return
+        frame = format_event(event, data)
+        for subscription in targets:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription.push, frame)
+            except RuntimeError:
+                # El bucle del cliente ya se cerró
+                self.unsubscribe(subscription)
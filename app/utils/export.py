@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+import app.utils.vars as gb
+from app.utils.concurrency import run_db
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+_DONE = object()
+
+
+def stream_chunks(session, statement):
+    """
+    Executes `statement` with a server-side cursor and yields its rows in chunks.
+
+    Only one chunk of EXPORT_CHUNK_SIZE rows is held in memory at a time, no
+    matter how large the table is.
+
+    Args:
+        session (Session): Session the statement runs on.
+        statement (Select): Column select to stream.
+
+    Yields:
+        list[dict]: The next chunk of rows, keyed by column name.
+    """
+    result = session.execute(statement.execution_options(stream_results=True))
+    for rows in result.mappings().partitions(gb.EXPORT_CHUNK_SIZE):
+        yield [dict(row) for row in rows]
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(chunks):
+    """
+    Encodes chunks of rows as newline-delimited JSON, one string per chunk.
+    """
+    for rows in chunks:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+def csv_lines(fields, chunks):
+    """
+    Encodes chunks of rows as CSV with a header line, one string per chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def read_csv(data: bytes) -> list:
+    """
+    Parses an uploaded CSV document with a header line into dicts.
+
+    Empty cells are read as None, so optional columns can be left blank.
+
+    Args:
+        data (bytes): The document, UTF-8 encoded (a BOM is accepted).
+
+    Returns:
+        list[dict]: One dict per data line, keyed by the header names.
+    """
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    return [{key: value if value != "" else None for key, value in row.items()} for row in reader]
+
+
+async def _iterate_in_db_threads(iterator):
+    # Cada bloque se lee en el pool de hilos de la base de datos para no bloquear el bucle
+    try:
+        while True:
+            chunk = await run_db(next, iterator, _DONE)
+            if chunk is _DONE:
+                break
+            yield chunk
+    finally:
+        iterator.close()
+
+
+def export_response(chunks, fields, format: str, name: str) -> StreamingResponse:
+    """
+    Streams an export to the client as NDJSON or CSV.
+
+    Args:
+        chunks (iterator): Generator of row chunks, such as a controller `export_*` method.
+        fields (tuple[str]): Column names, used for the CSV header.
+        format (str): "ndjson" or "csv".
+        name (str): Base name of the downloaded file.
+
+    Returns:
+        StreamingResponse: Response that writes each chunk as soon as it is read.
+
+    Raises:
+        HTTPException: 400 if the format is not supported.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        chunks.close()
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'.")
+
+    lines = ndjson_lines(chunks) if format == "ndjson" else csv_lines(fields, chunks)
+    return StreamingResponse(
+        _iterate_in_db_threads(lines),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
@@ -0,0 +1,220 @@
+import logging
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+import app.utils.vars as gb
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# Tipos de contenido que merece la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Flujos de eventos: cada evento es pequeño y debe llegar en cuanto se publica
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def record_timing(scope, name: str, milliseconds: float) -> None:
+    """
+    Adds `milliseconds` to the `name` entry reported by `ServerTimingMiddleware`.
+
+    Args:
+        scope (dict): ASGI scope of the request.
+        name (str): Metric name, e.g. "compress".
+        milliseconds (float): Time spent.
+    """
+    timings = scope.setdefault("state", {}).setdefault("server_timing", {})
+    timings[name] = timings.get(name, 0.0) + milliseconds
+
+
+class ServerTimingMiddleware:
+    """
+    Times each request and reports it in a `Server-Timing` header.
+
+    The header holds the total time until the response headers are sent
+    (`app`) and every metric recorded with `record_timing`, such as the
+    compression time. The full request time, body included, is logged at
+    debug level.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = scope.setdefault("state", {}).setdefault("server_timing", {})
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = [f"app;dur={(time.perf_counter() - start) * 1000:.1f}"]
+                entries += [f"{name};dur={value:.1f}" for name, value in timings.items()]
+                MutableHeaders(raw=message["headers"]).append("Server-Timing", ", ".join(entries))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            logger.debug(
+                "%s %s took %.1f ms %s", scope.get("method"), scope.get("path"),
+                (time.perf_counter() - start) * 1000, timings,
+            )
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, as accepted by the client.
+
+    Responses smaller than `minimum_size` bytes, already encoded responses and
+    non-text content types (and event streams) are sent unchanged. Streaming responses (the exports)
+    are compressed chunk by chunk and flushed after each one, so the client
+    still receives data as it is produced. The time spent compressing is
+    recorded as the `compress` Server-Timing metric.
+
+    brotli is used only when the `brotli` package is installed.
+
+    Args:
+        app: The ASGI application to wrap.
+        minimum_size (int, optional): Smallest body that is compressed, in bytes.
+        gzip_level (int, optional): zlib compression level, 1 (fastest) to 9.
+        brotli_quality (int, optional): brotli quality, 0 (fastest) to 11.
+    """
+
+    def __init__(self, app, minimum_size=None, gzip_level=None, brotli_quality=None) -> None:
+        self.app = app
+        self.minimum_size = gb.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = gb.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = gb.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, scope, send)
+        await self.app(scope, receive, responder.send)
+
+    def choose_encoding(self, accept_encoding: str):
+        """
+        Returns "br", "gzip" or None for an Accept-Encoding header.
+
+        Encodings with a quality of 0 (`gzip;q=0`, `gzip; q=0.000`) or a
+        malformed quality are refused.
+        """
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, *params = part.split(";")
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        quality = float(value.strip())
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, scope, send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.scope = scope
+        self.downstream = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Las cabeceras se envían junto al primer bloque, cuando ya sabemos si se comprime
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self.should_compress(headers, body, more_body):
+                self.passthrough = True
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+            self.compressor = self.middleware.compressor(self.encoding)
+            body = self.compress(body, final=not more_body)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self.downstream(self.start_message)
+        else:
+            body = self.compress(body, final=not more_body)
+
+        await self.downstream({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    def should_compress(self, headers, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return False
+        # Los streams se comprimen siempre: no se conoce su tamaño total
+        return more_body or len(body) >= self.middleware.minimum_size
+
+    def compress(self, body: bytes, final: bool) -> bytes:
+        start = time.perf_counter()
+        compressed = self.compressor.compress(body, final)
+        record_timing(self.scope, "compress", (time.perf_counter() - start) * 1000)
+        return compressed
@@ -0,0 +1,108 @@
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+import app.utils.vars as gb
+
+
+def encode_cursor(key) -> str:
+    """
+    Builds the opaque token that points just after the row with primary key `key`.
+    """
+    raw = json.dumps([key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns the primary key stored in a token built by `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(key, int) or isinstance(key, bool):
+        raise ValueError("Invalid cursor.")
+    return key
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """
+    Returns `limit` bounded to 1..PAGE_MAX_LIMIT, or PAGE_DEFAULT_LIMIT when it is None.
+    """
+    if limit is None:
+        limit = gb.PAGE_DEFAULT_LIMIT
+    return max(1, min(limit, gb.PAGE_MAX_LIMIT))
+
+
+def paginate(query, key_column, limit=None, cursor=None):
+    """
+    Returns one page of `query` using keyset pagination on `key_column`.
+
+    Rows are ordered by the key and only those after the cursor are read, so
+    every page costs an index range scan of `limit + 1` rows no matter how deep
+    the client has paged. The extra row tells whether another page exists.
+
+    When `limit` and `cursor` are both None the whole query is returned, which
+    keeps direct controller calls working as they did before pagination.
+
+    Args:
+        query (Query): Query over the model to list.
+        key_column (Column): Unique, indexed column used as the key (the primary key).
+        limit (int, optional): Page size, capped by `clamp_limit`.
+        cursor (str, optional): Token returned as `next_cursor` by the previous page.
+
+    Returns:
+        tuple: (rows, next_cursor). `next_cursor` is None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if limit is None and cursor is None:
+        return query.all(), None
+
+    limit = clamp_limit(limit)
+    if cursor is not None:
+        query = query.filter(key_column > decode_cursor(cursor))
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key_column.key))
+    return rows, next_cursor
+
+
+class PageParams:
+    """
+    Pagination parameters of a list request.
+
+    Attributes:
+        limit (int): Page size, already bounded by `clamp_limit`.
+        cursor (str, optional): Token of the page to return, None for the first one.
+    """
+
+    def __init__(self, limit: int, cursor: Optional[str] = None):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def page_params(limit: Optional[int] = None, cursor: Optional[str] = None) -> PageParams:
+    """
+    FastAPI dependency reading the `limit` and `cursor` query parameters.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed.
+    """
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return PageParams(clamp_limit(limit), cursor)
@@ -0,0 +1,93 @@
+from typing import Optional
+
+from sqlalchemy import Date, DateTime
+
+
+def resolve_fields(fields, allowed) -> tuple:
+    """
+    Returns the fields a list call must return.
+
+    Args:
+        fields (list[str], optional): Sparse fieldset requested by the client.
+            None returns every allowed field.
+        allowed (tuple[str]): Fields the endpoint exposes, in their default order.
+
+    Returns:
+        tuple[str]: Requested fields, in request order and without duplicates.
+
+    Raises:
+        ValueError: If a requested field is not exposed by the endpoint.
+    """
+    if fields is None:
+        return tuple(allowed)
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}.")
+    return tuple(dict.fromkeys(fields))
+
+
+def project(session, model, fields, key_column=None):
+    """
+    Builds a query that selects only `fields` of `model`, as plain rows.
+
+    Selecting columns instead of the entity skips ORM hydration: no instances
+    are built, nothing is added to the identity map and no attribute
+    instrumentation runs, which is where most of the CPU time of the list
+    endpoints went.
+
+    Args:
+        session (Session): Session the query runs on.
+        model (Base): Mapped class to read.
+        fields (tuple[str]): Attribute names to select.
+        key_column (Column, optional): Column that must also be selected, such as
+            the pagination key, even when the client did not ask for it.
+
+    Returns:
+        Query: Query returning rows whose first values follow `fields`.
+    """
+    columns = [getattr(model, field) for field in fields]
+    if key_column is not None and key_column.key not in fields:
+        columns.append(key_column)
+    return session.query(*columns)
+
+
+def serialize_rows(model, fields, rows) -> list:
+    """
+    Converts projected rows into dicts, formatting dates in ISO 8601.
+
+    Args:
+        model (Base): Mapped class the rows were read from.
+        fields (tuple[str]): Selected fields, in the order of the row values.
+        rows (list[Row]): Rows returned by a `project` query.
+
+    Returns:
+        list[dict]: One dict per row with exactly `fields` as keys.
+    """
+    date_positions = [
+        position for position, field in enumerate(fields)
+        if isinstance(getattr(model, field).type, (Date, DateTime))
+    ]
+    size = len(fields)
+    if not date_positions:
+        return [dict(zip(fields, row[:size])) for row in rows]
+
+    serialized = []
+    for row in rows:
+        values = list(row[:size])
+        for position in date_positions:
+            if values[position] is not None:
+                values[position] = values[position].isoformat()
+        serialized.append(dict(zip(fields, values)))
+    return serialized
+
+
+def fields_param(fields: Optional[str] = None) -> Optional[list]:
+    """
+    FastAPI dependency reading a sparse fieldset such as `?fields=name,surname`.
+
+    Returns:
+        list[str]: The requested fields, or None when the parameter is absent.
+    """
+    if fields is None:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
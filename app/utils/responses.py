@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+import app.utils.vars as gb
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _default(value):
+    # Tipos que ni orjson ni json saben serializar por sí solos
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    orjson serializes dates and datetimes natively (ISO 8601), so controllers
+    can return them as they come from the database.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class StdJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the standard library, formatting dates in ISO 8601.
+
+    Used when orjson is not installed or JSON_RESPONSE=std.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_bytes(content: Any) -> bytes:
+    """
+    Serializes a value to compact JSON, with orjson when available.
+
+    Used for payloads written outside a JSONResponse, such as event streams.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def get_response_class():
+    """
+    Returns the response class selected by JSON_RESPONSE ("orjson" or "std").
+
+    "orjson" falls back to the standard library when orjson is not installed.
+    """
+    if gb.JSON_RESPONSE == "orjson" and orjson is not None:
+        return FastJSONResponse
+    return StdJSONResponse
+
+
+class JSONRoute(APIRoute):
+    """
+    Route that renders plain return values with the fast response class directly.
+
+    FastAPI runs every value returned by an endpoint through `jsonable_encoder`
+    before rendering it, which walks the whole structure in Python and costs
+    more than the rendering itself. Endpoints without a `response_model` are
+    wrapped so dicts and lists are handed to the response class as they are.
+    Responses returned by the endpoint (streams, redirects) are left untouched.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        response_class = kwargs.get("response_class")
+        # FastAPI pasa un DefaultPlaceholder cuando la ruta no fija response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if response_class is None:
+            response_class = get_response_class()
+        if kwargs.get("response_model") is None and issubclass(response_class, JSONResponse):
+            endpoint = _render_with(endpoint, response_class, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _render_with(endpoint, response_class, status_code=None):
+    def to_response(result):
+        if isinstance(result, Response):
+            return result
+        return response_class(result, status_code=status_code or 200)
+
+    # functools.wraps conserva la firma, así FastAPI sigue viendo los parámetros
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            return to_response(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            return to_response(endpoint(*args, **kwargs))
+    return wrapper
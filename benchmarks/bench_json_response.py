@@ -0,0 +1,75 @@
+"""
+JSON response encoding benchmark.
+
+Measures, for payloads shaped like the list endpoints, the cost of turning a
+controller result into a response body: FastAPI's default path
+(`jsonable_encoder` followed by the stdlib `JSONResponse`) against the
+response classes in `app.utils.responses`.
+
+Usage:
+    python -m benchmarks.bench_json_response [--rows N] [--runs N]
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.responses import FastJSONResponse, StdJSONResponse
+
+
+def payloads(rows):
+    day = date(2024, 1, 1)
+    moment = datetime(2024, 1, 1, 8, 0, 0)
+    return {
+        "/resident/list": {"status": "ok", "residents": [
+            {"idResident": i, "name": f"Name{i}", "surname": f"Surname{i}", "birthDate": day,
+             "gender": "F", "idFamily": i % 100, "idRoom": i % 50}
+            for i in range(rows)
+        ]},
+        "/alarm/list": {"status": "ok", "alarms": [
+            {"idAlarm": i, "start": moment + timedelta(minutes=i), "end": None, "idRoom": i % 50, "createDate": moment}
+            for i in range(rows)
+        ]},
+        "/family/list": {"status": "ok", "families": [
+            {"idFamily": i, "familyName": f"Family{i}", "idRoom": i % 50, "idShelter": 1, "createdBy": 1, "createDate": day}
+            for i in range(rows)
+        ]},
+    }
+
+
+def default_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def timed(function, content, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(content)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    encoders = {
+        "jsonable_encoder+json": default_path,
+        "StdJSONResponse": lambda content: StdJSONResponse(content).body,
+        "FastJSONResponse": lambda content: FastJSONResponse(content).body,
+    }
+    print(f"{args.rows} rows per payload, median of {args.runs} runs (ms)")
+    print(f"{'endpoint':>16} " + " ".join(f"{name:>22}" for name in encoders))
+    for endpoint, content in payloads(args.rows).items():
+        results = [timed(function, content, args.runs) for function in encoders.values()]
+        print(f"{endpoint:>16} " + " ".join(f"{value:22.2f}" for value in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+List serialization benchmark.
+
+Compares, on a SQLite database filled with N residents, the previous read
+path of `list_residents` (load ORM entities, then copy their attributes into
+dicts) with the column-projection path it uses now, with every field and with
+a sparse fieldset.
+
+Usage:
+    python -m benchmarks.bench_list_projection [--rows N] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+
+def orm_hydration(engine, Resident):
+    from sqlalchemy.orm import Session
+
+    with Session(engine) as session:
+        residents = session.query(Resident).all()
+        return [
+            {
+                "idResident": r.idResident,
+                "name": r.name,
+                "surname": r.surname,
+                "birthDate": r.birthDate.isoformat() if r.birthDate else None,
+                "gender": r.gender,
+                "idFamily": r.idFamily,
+                "idRoom": r.idRoom
+            }
+            for r in residents
+        ]
+
+
+def timed(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["MYSQL_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        from sqlalchemy.orm import Session
+        from app.controllers.resident_controller import ResidentController
+        from app.mysql.base import Base
+        from app.mysql.resident import Resident
+
+        controller = ResidentController()
+        engine = controller.db_client.engine
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.bulk_insert_mappings(Resident, [
+                {"name": f"Name{i}", "surname": f"Surname{i}", "birthDate": date(1990, 1, 1),
+                 "gender": "F", "idFamily": 1, "idRoom": i % 50 + 1}
+                for i in range(args.rows)
+            ])
+            session.commit()
+
+        cases = {
+            "orm hydration": lambda: orm_hydration(engine, Resident),
+            "projection": lambda: controller.list_residents(),
+            "projection (name,surname)": lambda: controller.list_residents(fields=["name", "surname"]),
+        }
+        print(f"{args.rows} residents, {args.runs} runs")
+        for name, function in cases.items():
+            values = timed(function, args.runs)
+            print(f"{name:>26}: median {statistics.median(values):8.2f} ms   min {min(values):8.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
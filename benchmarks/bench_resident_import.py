@@ -0,0 +1,82 @@
+"""
+Resident import benchmark.
+
+Creates N residents on a SQLite database, spread over F families, first one
+by one with `create_resident` (as the clients did before the bulk endpoint)
+and then with a single `import_residents` call, and reports the throughput of
+each path.
+
+Usage:
+    python -m benchmarks.bench_resident_import [--rows N] [--families N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--families", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["MYSQL_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        from sqlalchemy.orm import Session
+        from app.controllers.resident_controller import ResidentController
+        from app.models.resident import Resident as ResidentModel
+        from app.mysql.base import Base
+        from app.mysql.family import Family
+        from app.mysql.resident import Resident
+        from app.mysql.room import Room
+        from app.mysql.shelter import Shelter
+
+        controller = ResidentController()
+        engine = controller.db_client.engine
+        Base.metadata.create_all(engine)
+
+        def reset():
+            with Session(engine) as session:
+                session.query(Resident).delete()
+                session.query(Family).delete()
+                session.query(Room).delete()
+                session.query(Shelter).delete()
+                session.add(Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=args.rows * 2))
+                session.add_all(
+                    Room(idRoom=i, roomName=f"Room{i}", maxPeople=4, idShelter=1) for i in range(1, args.families + 1)
+                )
+                session.add_all(
+                    Family(idFamily=i, familyName=f"Family{i}", idRoom=i, idShelter=1) for i in range(1, args.families + 1)
+                )
+                session.commit()
+            controller.occupancy.invalidate()
+
+        rows = [
+            {"name": f"Name{i}", "surname": f"Surname{i}", "birthDate": date(1990, 1, 1), "gender": "F",
+             "createdBy": 1, "createDate": date.today(), "idFamily": i % args.families + 1}
+            for i in range(args.rows)
+        ]
+
+        reset()
+        start = time.perf_counter()
+        for row in rows:
+            controller.create_resident(ResidentModel(**row))
+        one_by_one = time.perf_counter() - start
+
+        reset()
+        start = time.perf_counter()
+        result = controller.import_residents(rows)
+        bulk = time.perf_counter() - start
+        assert result["imported"] == args.rows, result
+
+        print(f"{args.rows} residents, {args.families} families")
+        print(f"{'create_resident':>17}: {one_by_one * 1000:9.1f} ms   {args.rows / one_by_one:9.0f} rows/s")
+        print(f"{'import_residents':>17}: {bulk * 1000:9.1f} ms   {args.rows / bulk:9.0f} rows/s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Resident search benchmark.
+
+Builds the in-memory name index over N generated residents on a SQLite
+database and reports the build time and the latency of prefix and fuzzy
+searches, the way the check-in desk autocomplete (`/resident/search?mode=prefix|fuzzy`) uses them.
+
+Usage:
+    python -m benchmarks.bench_resident_search [--rows N] [--runs N]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+NAMES = ["John", "Jane", "José", "María", "Ahmed", "Olga", "Wei", "Lucía", "Peter", "Amara", "Iker", "Nora"]
+SURNAMES = ["Doe", "García", "Smith", "Ivanova", "Chen", "Okafor", "Pérez", "Müller", "Khan", "Silva", "Etxeberria"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["MYSQL_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        from sqlalchemy.orm import Session
+        from app.controllers.resident_controller import ResidentController
+        from app.controllers.search_index import ResidentSearchIndex
+        from app.mysql.base import Base
+        from app.mysql.resident import Resident
+
+        engine = ResidentController().db_client.engine
+        Base.metadata.create_all(engine)
+        generator = random.Random(7)
+        with Session(engine) as session:
+            session.bulk_insert_mappings(Resident, [
+                {"name": f"{generator.choice(NAMES)}{i % 997}", "surname": f"{generator.choice(SURNAMES)}{i % 991}"}
+                for i in range(args.rows)
+            ])
+            session.commit()
+
+        index = ResidentSearchIndex()
+        with Session(engine) as session:
+            start = time.perf_counter()
+            index.reload(session)
+            print(f"{args.rows} residents, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+            queries = {
+                "prefix 'jo'": ("jo", False),
+                "prefix 'mar gar'": ("mar gar", False),
+                "prefix 'peter12 kh'": ("peter12 kh", False),
+                "fuzzy 'lucai'": ("lucai", True),
+                "fuzzy 'amra oka'": ("amra oka", True),
+            }
+            for name, (query, fuzzy) in queries.items():
+                samples = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    index.search(session, query, 10, fuzzy)
+                    samples.append((time.perf_counter() - start) * 1000)
+                print(f"{name:>20}: median {statistics.median(samples):7.3f} ms   p95 {sorted(samples)[int(len(samples) * 0.95)]:7.3f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Startup time benchmark.
+
+Measures, in fresh interpreter processes, how long it takes to import
+`app.main` and to run its startup hook against a migrated and seeded
+SQLite database, which is what delays a new uvicorn worker from accepting
+requests.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main as main
+t1 = time.perf_counter()
+main.startup()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "startup": t2 - t1}))
+"""
+
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MYSQL_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        subprocess.run([sys.executable, "-m", "app.mysql.migrate", "upgrade"], env=env, check=True, capture_output=True)
+        # First run seeds the database; the measured runs start from a seeded one
+        run_once(env)
+        samples = [run_once(env) for _ in range(args.runs)]
+
+    for phase in ("import", "startup"):
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f"{phase:>8}: median {statistics.median(values):8.2f} ms   min {min(values):8.2f} ms   max {max(values):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
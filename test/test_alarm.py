@@ -5,7 +5,7 @@ from app.mysql.alarm import Alarm
 from app.mysql.room import Room
 from app.mysql.resident import Resident
 from app.mysql.admin import Admin
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
 
 def test_create_alarm(mocker, setup_database):
@@ -358,6 +358,7 @@ def test_update_alarm_end_date_success(setup_database):
     # Verify the alarm in the database
     updated_alarm = session.query(Alarm).filter(Alarm.idAlarm == 1).first()
     assert updated_alarm is not None
+    assert updated_alarm.end == end_date
 
 
 def test_update_alarm_end_date_not_found(setup_database):
@@ -431,3 +432,106 @@ def test_update_alarm_end_date_database_error(setup_database, mocker):
     assert unchanged_alarm.end is None
 
 
+
+
+def _add_history(session):
+    session.add_all([
+        Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1),
+        Room(idRoom=2, roomName="Room B", maxPeople=5, idShelter=1),
+        Alarm(idAlarm=1, start=datetime(2024, 1, 1, 8, 10), end=datetime(2024, 1, 1, 8, 11), idRoom=1),
+        Alarm(idAlarm=2, start=datetime(2024, 1, 1, 8, 50), end=datetime(2024, 1, 1, 8, 53), idRoom=1),
+        Alarm(idAlarm=3, start=datetime(2024, 1, 1, 9, 5), end=None, idRoom=1),
+        Alarm(idAlarm=4, start=datetime(2024, 1, 2, 8, 0), end=datetime(2024, 1, 2, 8, 10), idRoom=2),
+    ])
+    session.commit()
+
+
+def test_list_alarms_filters(setup_database):
+    """
+    Test: Alarms can be filtered by room and by a start time range.
+
+    Expected Outcome:
+        - `since` is inclusive, `until` exclusive, and the filters combine with pagination.
+    """
+
+    session = setup_database
+    _add_history(session)
+    controller = AlarmController()
+
+    def ids(**filters):
+        return [alarm["idAlarm"] for alarm in controller.list_alarms(session=session, **filters)["alarms"]]
+
+    assert ids(idRoom=1) == [1, 2, 3]
+    assert ids(since=datetime(2024, 1, 1, 8, 50), until=datetime(2024, 1, 2, 8, 0)) == [2, 3]
+    assert ids(idRoom=2, since=datetime(2024, 1, 3)) == []
+    assert ids(idRoom=1, limit=2) == [1, 2]
+
+
+def test_count_alarms_per_hour_and_day(setup_database):
+    """
+    Test: Alarms are counted per room and per hour or day.
+
+    Expected Outcome:
+        - One entry per room and period with alarms, ordered by room and time.
+        - An unknown bucket is reported as an error.
+    """
+
+    session = setup_database
+    _add_history(session)
+    controller = AlarmController()
+
+    hourly = controller.count_alarms("hour", session=session)["counts"]
+    assert hourly == [
+        {"idRoom": 1, "time": datetime(2024, 1, 1, 8), "count": 2},
+        {"idRoom": 1, "time": datetime(2024, 1, 1, 9), "count": 1},
+        {"idRoom": 2, "time": datetime(2024, 1, 2, 8), "count": 1},
+    ]
+    daily = controller.count_alarms("day", idRoom=1, session=session)["counts"]
+    assert daily == [{"idRoom": 1, "time": datetime(2024, 1, 1), "count": 3}]
+    assert controller.count_alarms("week", session=session)["status"] == "error"
+
+
+def test_alarm_durations(setup_database):
+    """
+    Test: Mean and p95 durations are computed over the closed alarms of each room.
+    """
+
+    session = setup_database
+    _add_history(session)
+    controller = AlarmController()
+
+    result = controller.alarm_durations(session=session)
+
+    assert result["rooms"] == [
+        {"idRoom": 1, "count": 2, "meanSeconds": 120.0, "p95Seconds": 180.0},
+        {"idRoom": 2, "count": 1, "meanSeconds": 600.0, "p95Seconds": 600.0},
+    ]
+    assert result["overall"] == {"count": 3, "meanSeconds": 280.0, "p95Seconds": 600.0}
+    assert controller.alarm_durations(since=datetime(2024, 2, 1), session=session)["overall"] is None
+
+
+def test_alarm_durations_p95_nearest_rank(setup_database):
+    """
+    Test: The 95th percentile is the nearest-rank value computed by the database, per room and overall.
+
+    Steps:
+        1. Close 20 alarms in room 1 lasting 1 to 20 minutes, and 2 in room 2 lasting 1 and 2 hours.
+
+    Expected Outcome:
+        - Room 1: rank ceil(0.95 * 20) = 19, i.e. 19 minutes.
+        - Room 2: rank 2 of 2, i.e. 2 hours; overall: rank 21 of 22, i.e. 1 hour.
+    """
+
+    session = setup_database
+    session.add_all([Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1), Room(idRoom=2, roomName="Room B", maxPeople=5, idShelter=1)])
+    start = datetime(2024, 1, 1)
+    session.add_all([Alarm(start=start, end=start + timedelta(minutes=minutes), idRoom=1) for minutes in range(20, 0, -1)])
+    session.add_all([Alarm(start=start, end=start + timedelta(hours=hours), idRoom=2) for hours in (2, 1)])
+    session.commit()
+
+    result = AlarmController().alarm_durations(session=session)
+
+    assert [(room["idRoom"], room["count"], room["p95Seconds"]) for room in result["rooms"]] == [(1, 20, 1140.0), (2, 2, 7200.0)]
+    assert result["rooms"][0]["meanSeconds"] == 630.0
+    assert result["overall"]["count"] == 22
+    assert result["overall"]["p95Seconds"] == 3600.0
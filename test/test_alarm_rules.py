@@ -0,0 +1,166 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.alarm_rules import AlarmRuleEngine, parse_rules
+from app.controllers.shelter_controller import ShelterController
+from app.mysql.alarm import Alarm
+from app.mysql.room import Room
+from app.mysql.shelter import Shelter
+from app.mysql.shelter_reading import METRICS
+
+
+RADIATION = METRICS["radiation"]
+ENERGY = METRICS["energy"]
+
+
+def _engine(spec="radiation>50:40,energy<20:25"):
+    engine = AlarmRuleEngine(parse_rules(spec, 3), 1000)
+    engine._open = {}
+    return engine
+
+
+def _add_shelter(session):
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=50, energyLevel=100, waterLevel=100, radiationLevel=10))
+    session.add(Room(idRoom=3, roomName="Room C", maxPeople=5, idShelter=1))
+    session.commit()
+
+
+def test_parse_rules():
+    """
+    Test: Rules are parsed with their direction, clear value and room, and invalid ones are rejected.
+    """
+
+    radiation, energy = parse_rules("radiation>50:40, energy<20:25@7", 3)
+
+    assert (radiation.metric, radiation.above, radiation.threshold, radiation.clear, radiation.idRoom) == (RADIATION, True, 50, 40, 3)
+    assert (energy.above, energy.idRoom) == (False, 7)
+    assert parse_rules("", 3) == []
+    for spec in ("oxygen>1:0", "radiation>50", "radiation>50:60", "energy<20:10", "radiation>50:40,radiation>60:50"):
+        with pytest.raises(ValueError):
+            parse_rules(spec, 3)
+
+
+def test_evaluate_with_hysteresis():
+    """
+    Test: A level hovering around the threshold opens one alarm, closed only past the clear value.
+
+    Steps:
+        1. Evaluate radiation readings that cross 50 several times without dropping to 40, then drop to 35.
+        2. Evaluate energy readings that stay in the safe band.
+
+    Expected Outcome:
+        - One opening at the first reading of 50 or more and one closing at 35, in time order.
+        - No transition for the energy series.
+    """
+
+    engine = _engine()
+    readings = [(1, RADIATION, at, value) for at, value in [(5, 44), (1, 30), (2, 55), (3, 49), (4, 51), (6, 35)]]
+    readings += [(1, ENERGY, at, value) for at, value in [(1, 80), (2, 21)]]
+
+    transitions, seen = engine.evaluate(readings)
+
+    assert transitions == [("open", (1, RADIATION), 2, 55), ("close", (1, RADIATION), 6, 35)]
+    assert seen == {(1, RADIATION): 6, (1, ENERGY): 2}
+
+
+def test_evaluate_skips_late_readings_and_uses_open_state():
+    """
+    Test: Readings older than the ones already evaluated are ignored, and open series only close.
+    """
+
+    engine = _engine()
+    engine.commit({(1, RADIATION): 9}, {(1, RADIATION): 10})
+
+    transitions, _ = engine.evaluate([(1, RADIATION, 8, 10), (1, RADIATION, 11, 60), (1, RADIATION, 12, 39)])
+
+    assert transitions == [("close", (1, RADIATION), 12, 39)]
+    assert engine.open_alarms() == {(1, RADIATION): 9}
+
+
+def test_level_updates_open_and_close_alarms(setup_database):
+    """
+    Test: Level updates are evaluated after commit and open and close rule alarms.
+
+    Steps:
+        1. Raise the radiation level to 60 and evaluate the rules.
+        2. Lower it to 45 (above the clear value), then to 35, evaluating after each.
+
+    Expected Outcome:
+        - One alarm is opened in the rule's room, tagged with the radiation metric.
+        - It stays open at 45 and gets an end time at 35.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    rules = AlarmRuleEngine(parse_rules("radiation>50:40", 3), 1000)
+    shelter = ShelterController(rules=rules)
+    alarms = AlarmController(rules=rules)
+
+    shelter.updateShelterRadiationLevel(60, session=session)
+    assert len(rules.pending) == 1
+    assert alarms.evaluate_alarm_rules(session=session) == {"status": "ok", "opened": 1, "closed": 0}
+
+    alarm = session.query(Alarm).one()
+    assert (alarm.idRoom, alarm.metric, alarm.end) == (3, RADIATION, None)
+    assert rules.open_alarms() == {(1, RADIATION): alarm.idAlarm}
+
+    shelter.updateShelterRadiationLevel(45, session=session)
+    assert alarms.evaluate_alarm_rules(session=session) == {"status": "ok", "opened": 0, "closed": 0}
+    shelter.updateShelterRadiationLevel(35, session=session)
+    assert alarms.evaluate_alarm_rules(session=session) == {"status": "ok", "opened": 0, "closed": 1}
+
+    assert session.query(Alarm).one().end is not None
+    assert rules.open_alarms() == {}
+
+
+def test_open_rule_alarms_are_reloaded(setup_database):
+    """
+    Test: After a restart, an open rule alarm is closed instead of a new one being opened.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    session.add(Alarm(idAlarm=4, start=datetime(2024, 1, 1), idRoom=3, metric=RADIATION))
+    session.add(Alarm(idAlarm=5, start=datetime(2024, 1, 1), idRoom=3))
+    session.commit()
+    rules = AlarmRuleEngine(parse_rules("radiation>50:40", 3), 1000)
+    rules.submit([(1, RADIATION, 1000, 70), (1, RADIATION, 2000, 20)])
+
+    assert AlarmController(rules=rules).evaluate_alarm_rules(session=session) == {"status": "ok", "opened": 0, "closed": 1}
+    assert session.query(Alarm).get(4).end == datetime(1970, 1, 1, 0, 0, 2)
+    assert session.query(Alarm).get(5).end is None
+
+
+def test_rules_of_missing_rooms_are_disabled(setup_database):
+    """
+    Test: A rule whose room does not exist opens no alarm.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    rules = AlarmRuleEngine(parse_rules("radiation>50:40@99", 3), 1000)
+    rules.submit([(1, RADIATION, 1000, 70)])
+
+    assert AlarmController(rules=rules).evaluate_alarm_rules(session=session) == {"status": "ok", "opened": 0, "closed": 0}
+    assert rules.rules == {}
+    assert session.query(Alarm).count() == 0
+
+
+def test_failed_evaluation_requeues_readings(setup_database):
+    """
+    Test: If the alarms cannot be written, the readings are evaluated again on the next call.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    rules = AlarmRuleEngine(parse_rules("radiation>50:40", 3), 1000)
+    rules.submit([(1, RADIATION, 1000, 70)])
+    controller = AlarmController(rules=rules)
+
+    with patch.object(session, "commit", side_effect=RuntimeError("down")):
+        assert controller.evaluate_alarm_rules(session=session)["status"] == "error"
+
+    assert len(rules.pending) == 1
+    assert rules.open_alarms() == {}
+    assert controller.evaluate_alarm_rules(session=session)["opened"] == 1
@@ -0,0 +1,123 @@
+from datetime import datetime
+from unittest.mock import patch
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.coalescing import AlarmCoalescer
+from app.models.alarm import Alarm as AlarmModel
+from app.mysql.alarm import Alarm
+from app.mysql.room import Room
+
+
+def _controller(session, window=60):
+    session.add(Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1))
+    session.commit()
+    return AlarmController(coalescer=AlarmCoalescer(window))
+
+
+def _body(minute, second=0, end=None):
+    return AlarmModel(start=datetime(2024, 1, 1, 8, minute, second), end=end, idRoom=1, createDate=datetime(2024, 1, 1))
+
+
+def test_repeated_open_alarms_are_merged_without_writes(setup_database):
+    """
+    Test: Repetitions of an open alarm within the window are absorbed by it.
+
+    Steps:
+        1. Create an open alarm, then repeat it every 30 seconds for two minutes.
+        2. Create another one five minutes after the last repetition.
+
+    Expected Outcome:
+        - The repetitions return the first alarm's id and neither insert nor commit anything.
+        - The window counts from the latest repetition, not from the first alarm.
+        - The late alarm is inserted as a new row.
+    """
+
+    session = setup_database
+    controller = _controller(session)
+
+    assert controller.create_alarm(_body(0), session=session) == {"status": "ok"}
+    first = session.query(Alarm).one().idAlarm
+    with patch.object(session, "commit", wraps=session.commit) as commit:
+        for second in (30, 60, 90, 120):
+            result = controller.create_alarm(_body(second // 60, second % 60), session=session)
+            assert result == {"status": "ok", "idAlarm": first, "coalesced": True}
+    assert commit.call_count == 0
+    assert session.query(Alarm).count() == 1
+
+    assert controller.create_alarm(_body(7), session=session) == {"status": "ok"}
+    assert session.query(Alarm).count() == 2
+
+
+def test_closed_alarm_is_extended(setup_database):
+    """
+    Test: An alarm that repeats shortly after the latest one ended moves its end instead of adding a row.
+
+    Expected Outcome:
+        - A closed repetition moves the end to the later one.
+        - An open repetition reopens the alarm, which then shows as open.
+    """
+
+    session = setup_database
+    controller = _controller(session)
+
+    controller.create_alarm(_body(0, end=datetime(2024, 1, 1, 8, 1)), session=session)
+    idAlarm = session.query(Alarm).one().idAlarm
+
+    controller.create_alarm(_body(1, 30, end=datetime(2024, 1, 1, 8, 2)), session=session)
+    assert session.query(Alarm).one().end == datetime(2024, 1, 1, 8, 2)
+
+    assert controller.create_alarm(_body(2, 40), session=session)["idAlarm"] == idAlarm
+    assert session.query(Alarm).one().end is None
+    assert [alarm["idAlarm"] for alarm in controller.list_open_alarms(session=session)["alarms"]] == [idAlarm]
+
+
+def test_coalescing_after_restart_and_when_disabled(setup_database):
+    """
+    Test: The latest alarm of a room is read from the database the first time, and a window of 0 never merges.
+    """
+
+    session = setup_database
+    controller = _controller(session)
+    session.add(Alarm(idAlarm=7, start=datetime(2024, 1, 1, 8, 0), end=None, idRoom=1))
+    session.add(Alarm(idAlarm=8, start=datetime(2024, 1, 1, 8, 0, 30), end=None, idRoom=1, metric=3))
+    session.commit()
+
+    # La alarma 8 la abrió una regla de umbral: no se fusiona con las de la API
+    assert controller.create_alarm(_body(0, 40), session=session)["idAlarm"] == 7
+
+    disabled = AlarmController(coalescer=AlarmCoalescer(0))
+    assert disabled.create_alarm(_body(0, 50), session=session) == {"status": "ok"}
+    assert session.query(Alarm).count() == 3
+
+
+def test_updated_end_is_tracked(setup_database):
+    """
+    Test: Closing the latest alarm with `updateAlarmEndDate` is taken into account by later merges.
+    """
+
+    session = setup_database
+    controller = _controller(session)
+    controller.create_alarm(_body(0), session=session)
+    idAlarm = session.query(Alarm).one().idAlarm
+
+    controller.updateAlarmEndDate(idAlarm, datetime(2024, 1, 1, 8, 10), session=session)
+
+    assert controller.create_alarm(_body(10, 30, end=datetime(2024, 1, 1, 8, 11)), session=session)["idAlarm"] == idAlarm
+    assert session.query(Alarm).one().end == datetime(2024, 1, 1, 8, 11)
+
+
+def test_coalescing_is_off_by_default(setup_database):
+    """
+    Test: Without ALARM_COALESCE_SECONDS, repeated alarms keep their own rows and ids.
+    """
+
+    session = setup_database
+    session.add(Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1))
+    session.commit()
+    controller = AlarmController()
+
+    first = AlarmModel(idAlarm=1, start=datetime(2024, 1, 1, 8), end=None, idRoom=1, createDate=datetime(2024, 1, 1))
+    second = AlarmModel(idAlarm=2, start=datetime(2024, 1, 1, 8, 0, 10), end=None, idRoom=1, createDate=datetime(2024, 1, 1))
+
+    assert controller.create_alarm(first, session=session) == {"status": "ok"}
+    assert controller.create_alarm(second, session=session) == {"status": "ok"}
+    assert sorted(alarm.idAlarm for alarm in session.query(Alarm)) == [1, 2]
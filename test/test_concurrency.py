@@ -0,0 +1,149 @@
+import time
+import threading
+
+import anyio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.mysql.base import Base
+from app.mysql.mysql import RequestSession
+from app.mysql.shelter import Shelter
+from app.controllers.shelter_controller import ShelterController
+from app.utils.concurrency import run_db, run_unit_of_work, get_db_limiter
+
+
+def test_run_db_runs_blocking_calls_concurrently():
+    """
+    Test: Blocking controller calls do not serialize on the event loop.
+
+    Steps:
+        1. Start several calls that block for a fixed time through `run_db`.
+        2. Measure the total elapsed time.
+
+    Expected Outcome:
+        - The calls overlap, so the total time is far below the sum of the delays.
+    """
+
+    def blocking_call(delay):
+        time.sleep(delay)
+        return threading.get_ident()
+
+    async def main():
+        results = []
+
+        async def worker():
+            results.append(await run_db(blocking_call, 0.2))
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(4):
+                tg.start_soon(worker)
+        return results
+
+    start = time.perf_counter()
+    results = anyio.run(main)
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 4
+    assert elapsed < 0.6
+
+
+def test_run_db_passes_arguments_and_keywords():
+    """
+    Test: Arguments are forwarded to the controller call.
+
+    Steps:
+        1. Run a function through `run_db` with positional and keyword arguments.
+
+    Expected Outcome:
+        - The function receives both and its return value is propagated.
+    """
+
+    def add(a, b, session=None):
+        return (a + b, session)
+
+    result = anyio.run(lambda: run_db(add, 1, 2, session="s"))
+
+    assert result == (3, "s")
+
+
+def test_db_limiter_is_bounded():
+    """
+    Test: The thread pool limiter is sized from configuration.
+
+    Steps:
+        1. Get the limiter inside an event loop.
+
+    Expected Outcome:
+        - It has a finite number of tokens.
+    """
+
+    async def main():
+        return get_db_limiter().total_tokens
+
+    assert anyio.run(main) > 0
+
+
+@pytest.fixture
+def threaded_engine():
+    """
+    In-memory SQLite engine whose single connection can be used from worker threads.
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_run_unit_of_work_commits_request(threaded_engine):
+    """
+    Test: The request session is committed after the controller call.
+
+    Steps:
+        1. Update the energy level through `run_unit_of_work`.
+        2. Read the shelter with a separate session.
+
+    Expected Outcome:
+        - The new energy level is persisted.
+    """
+
+    with RequestSession(threaded_engine) as setup:
+        setup.add(Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=100))
+        setup.complete()
+
+    request_session = RequestSession(threaded_engine)
+    response = anyio.run(
+        lambda: run_unit_of_work(request_session, ShelterController().updateShelterEnergyLevel, 70)
+    )
+    request_session.release()
+
+    assert response["status"] == "ok"
+    with RequestSession(threaded_engine) as check:
+        assert check.query(Shelter).first().energyLevel == 70
+
+
+def test_run_unit_of_work_rolls_back_on_error(threaded_engine):
+    """
+    Test: An exception raised by the controller discards the request.
+
+    Steps:
+        1. Run a call that writes a row and then raises.
+
+    Expected Outcome:
+        - The exception propagates and nothing is persisted.
+    """
+
+    def failing_call(session=None):
+        session.add(Shelter(idShelter=2, shelterName="Backup"))
+        session.commit()
+        raise ValueError("boom")
+
+    request_session = RequestSession(threaded_engine)
+    with pytest.raises(ValueError):
+        anyio.run(lambda: run_unit_of_work(request_session, failing_call))
+    request_session.release()
+
+    with RequestSession(threaded_engine) as check:
+        assert check.query(Shelter).count() == 0
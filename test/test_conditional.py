@@ -0,0 +1,163 @@
+import anyio
+import pytest
+from datetime import date, datetime
+from email.utils import format_datetime
+from starlette.datastructures import Headers
+from app.controllers.family_controller import FamilyController
+from app.mysql.admin import Admin
+from app.mysql.change_version import bump_version, read_versions
+from app.mysql.room import Room
+from app.mysql.shelter import Shelter
+from app.models.family import Family as FamilyModel
+import app.utils.conditional as conditional
+
+
+class _Url:
+    def __init__(self, path, query=""):
+        self.path = path
+        self.query = query
+
+
+class _Request:
+    def __init__(self, headers=None, path="/family/list"):
+        self.headers = Headers(headers or {})
+        self.url = _Url(path)
+
+
+@pytest.fixture
+def inline_unit_of_work(monkeypatch):
+    # Ejecuta la unidad de trabajo en el hilo del test: la base en memoria es por conexión
+    async def run(session, func, *args, **kwargs):
+        return func(*args, session=session, **kwargs)
+    monkeypatch.setattr(conditional, "run_unit_of_work", run)
+
+
+def test_bump_version_creates_and_increments(setup_database):
+    """
+    Test: `bump_version` creates the row on first use and increments it afterwards.
+
+    Steps:
+        1. Read the version of a table that was never modified.
+        2. Bump it twice, committing each time.
+
+    Expected Outcome:
+        - The version starts at 0 and ends at 2, with a change time.
+    """
+
+    session = setup_database
+
+    assert read_versions(session, ("family",)) == [(0, None)]
+
+    bump_version(session, "family")
+    session.commit()
+    bump_version(session, "family")
+    session.commit()
+
+    version, changedAt = read_versions(session, ("family",))[0]
+    assert version == 2
+    assert changedAt is not None
+
+
+def test_make_etag_depends_on_version_and_variant():
+    """
+    Test: The ETag changes with the table version and with the request variant.
+    """
+
+    etag = conditional.make_etag(("room",), [(1, None)], "/listRooms?")
+
+    assert etag.startswith('W/"')
+    assert etag == conditional.make_etag(("room",), [(1, None)], "/listRooms?")
+    assert etag != conditional.make_etag(("room",), [(2, None)], "/listRooms?")
+    assert etag != conditional.make_etag(("room",), [(1, None)], "/listRooms?limit=5")
+
+
+def test_is_not_modified():
+    """
+    Test: If-None-Match is checked first, If-Modified-Since only without it.
+
+    Expected Outcome:
+        - Matching and "*" tags are not modified; other tags are.
+        - If-Modified-Since at or after the last change is not modified.
+    """
+
+    etag = 'W/"abc"'
+    changed = datetime(2024, 1, 2, 3, 4, 5).astimezone()
+    since = format_datetime(changed, usegmt=False)
+
+    assert conditional.is_not_modified(Headers({"if-none-match": 'W/"abc"'}), etag, changed)
+    assert conditional.is_not_modified(Headers({"if-none-match": '"x", "abc"'}), etag, changed)
+    assert conditional.is_not_modified(Headers({"if-none-match": "*"}), etag, changed)
+    assert not conditional.is_not_modified(Headers({"if-none-match": '"x"', "if-modified-since": since}), etag, changed)
+    assert conditional.is_not_modified(Headers({"if-modified-since": since}), etag, changed)
+    assert not conditional.is_not_modified(Headers({"if-modified-since": "Mon, 01 Jan 2024 00:00:00 GMT"}), etag, changed)
+    assert not conditional.is_not_modified(Headers({"if-modified-since": "garbage"}), etag, changed)
+    assert not conditional.is_not_modified(Headers({}), etag, changed)
+
+
+def test_conditional_get_returns_304_until_a_write(setup_database, inline_unit_of_work):
+    """
+    Test: A revalidation is answered with 304 without running the controller,
+    until a write bumps the table version.
+
+    Steps:
+        1. Request the family list and keep its ETag.
+        2. Repeat the request with If-None-Match.
+        3. Create a family and repeat the request again.
+
+    Expected Outcome:
+        - The second response is a 304 and the controller is not called.
+        - After the write the list is served again with a new ETag.
+    """
+
+    session = setup_database
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=100),
+        Room(idRoom=1, roomName="Room 1", maxPeople=5, idShelter=1),
+        Admin(idAdmin=1, email="admin@example.com", name="Admin", password="password123"),
+    ])
+    session.commit()
+    controller = FamilyController()
+    calls = []
+
+    def listFamilies(session=None):
+        calls.append(1)
+        return controller.listFamilies(session=session)
+
+    async def get(headers=None):
+        return await conditional.conditional_get(_Request(headers), session, ("family",), listFamilies)
+
+    first = anyio.run(get)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert len(calls) == 1
+
+    second = anyio.run(get, {"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.body == b""
+    assert second.headers["etag"] == etag
+    assert len(calls) == 1
+
+    controller.create_family(FamilyModel(familyName="Doe", idRoom=1, idShelter=1, createdBy=1, createDate=date(2024, 1, 1)), session=session)
+
+    third = anyio.run(get, {"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+    assert b"Doe" in third.body
+    assert len(calls) == 2
+
+
+def test_conditional_get_error_has_no_validators(setup_database, inline_unit_of_work):
+    """
+    Test: Error results are returned without ETag, so they are never revalidated.
+    """
+
+    def failing(session=None):
+        return {"status": "error", "message": "boom"}
+
+    async def get():
+        return await conditional.conditional_get(_Request(), setup_database, ("room",), failing)
+
+    response = anyio.run(get)
+
+    assert "etag" not in response.headers
+    assert b"boom" in response.body
@@ -0,0 +1,184 @@
+import json
+import threading
+import anyio
+import pytest
+from datetime import datetime
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.shelter_controller import ShelterController
+from app.models.alarm import Alarm as AlarmModel
+from app.mysql.room import Room
+from app.mysql.shelter import Shelter
+from app.utils.events import RESYNC, EventBroadcaster, format_event
+
+
+def _parse(frame):
+    event, data = frame.decode().strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+async def _collect(events, topics, publish, count=1):
+    # Suscribe, publica y lee los `count` primeros eventos recibidos
+    subscription = events.subscribe(topics)
+    try:
+        publish()
+        frames = []
+        for _ in range(count):
+            frame = await subscription.next(1)
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+    finally:
+        events.unsubscribe(subscription)
+
+
+def test_format_event():
+    """
+    Test: Events are encoded as one SSE frame with a JSON data line.
+    """
+
+    frame = format_event("level", {"idShelter": 1, "energyLevel": 80})
+
+    assert frame.endswith(b"\n\n")
+    assert _parse(frame) == ("level", {"idShelter": 1, "energyLevel": 80})
+
+
+def test_publish_filters_topics_and_threads():
+    """
+    Test: Subscribers only receive their topics, including events published from another thread.
+    """
+
+    events = EventBroadcaster()
+
+    def publish():
+        worker = threading.Thread(target=lambda: (events.publish("alarm", {"idAlarm": 1}), events.publish("level", {"idShelter": 1})))
+        worker.start()
+        worker.join()
+
+    frames = anyio.run(_collect, events, {"level"}, publish, 2)
+
+    assert [_parse(frame) for frame in frames] == [("level", {"idShelter": 1})]
+    assert len(events) == 0
+
+
+def test_slow_subscriber_gets_resync():
+    """
+    Test: A client whose queue fills up loses its backlog and receives a single resync event.
+
+    Steps:
+        1. Subscribe with a queue of 3 frames.
+        2. Publish 5 events without reading.
+
+    Expected Outcome:
+        - The client reads the resync event, then only the events published after it.
+        - The dropped events are counted.
+    """
+
+    events = EventBroadcaster(max_queue=3)
+
+    async def run():
+        subscription = events.subscribe({"level"})
+        for value in range(5):
+            events.publish("level", {"energyLevel": value})
+        await anyio.sleep(0)
+        frames = [await subscription.next(1) for _ in range(2)]
+        return subscription, frames
+
+    subscription, frames = anyio.run(run)
+
+    assert frames[0] == RESYNC
+    assert _parse(frames[1]) == ("level", {"energyLevel": 4})
+    assert subscription.dropped == 3
+
+
+def test_level_update_publishes_after_commit(setup_database):
+    """
+    Test: Updating a shelter level publishes a level event once the change commits.
+    """
+
+    session = setup_database
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=50, energyLevel=100, waterLevel=100, radiationLevel=10))
+    session.commit()
+    events = EventBroadcaster()
+    controller = ShelterController(events=events)
+
+    frames = anyio.run(_collect, events, {"level"}, lambda: controller.updateShelterWaterLevel(40, session=session))
+
+    assert [_parse(frame) for frame in frames] == [("level", {"idShelter": 1, "waterLevel": 40})]
+
+
+def test_failed_level_update_publishes_nothing(setup_database):
+    """
+    Test: No event is published when the update does not commit.
+    """
+
+    events = EventBroadcaster()
+    controller = ShelterController(events=events)
+
+    frames = anyio.run(_collect, events, {"level"}, lambda: controller.updateShelterEnergyLevel(40, session=setup_database))
+
+    assert frames == []
+
+
+def test_alarm_events(setup_database):
+    """
+    Test: Creating and closing alarms publishes alarm events with the generated id.
+
+    Steps:
+        1. Create an alarm with `create_alarmLevel`, which lets the database pick its id.
+        2. Close it with `updateAlarmEndDate`.
+
+    Expected Outcome:
+        - A "created" event carrying the generated idAlarm and room 3.
+        - A "closed" event carrying the new end date.
+    """
+
+    session = setup_database
+    session.add(Room(idRoom=3, roomName="Room C", maxPeople=5, idShelter=1))
+    session.commit()
+    events = EventBroadcaster()
+    controller = AlarmController(events=events)
+    body = AlarmModel(start=datetime(2024, 1, 1, 8), end=None, idRoom=3, createDate=datetime(2024, 1, 1))
+    created = {}
+
+    def publish():
+        created.update(controller.create_alarmLevel(body, session=session))
+        controller.updateAlarmEndDate(created["idAlarm"], datetime(2024, 1, 1, 9), session=session)
+
+    frames = anyio.run(_collect, events, {"alarm"}, publish, 2)
+
+    (_, opened), (_, closed) = [_parse(frame) for frame in frames]
+    assert opened == {"action": "created", "idAlarm": created["idAlarm"], "idRoom": 3, "start": "2024-01-01T08:00:00", "end": None}
+    assert closed["action"] == "closed"
+    assert closed["end"] == "2024-01-01T09:00:00"
+
+
+def test_events_endpoint():
+    """
+    Test: The endpoint streams the subscribed events and rejects unknown topics.
+    """
+
+    from fastapi import HTTPException
+    from app.main import controllers, stream_events
+
+    class FakeRequest:
+        async def is_disconnected(self):
+            return True
+
+    async def run():
+        response = await stream_events(FakeRequest(), topics="level")
+        assert response.media_type == "text/event-stream"
+        body = response.body_iterator
+        assert await body.__anext__() == b"retry: 3000\n\n"
+        controllers.events.publish("alarm", {"idAlarm": 1})
+        controllers.events.publish("level", {"idShelter": 1, "energyLevel": 5})
+        frame = await body.__anext__()
+        await body.aclose()
+        return frame
+
+    assert _parse(anyio.run(run)) == ("level", {"idShelter": 1, "energyLevel": 5})
+    assert len(controllers.events) == 0
+
+    with pytest.raises(HTTPException) as error:
+        anyio.run(stream_events, None, "level,weather")
+    assert error.value.status_code == 400
@@ -0,0 +1,108 @@
+import json
+import anyio
+import pytest
+from fastapi import HTTPException
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.resident_controller import ResidentController
+from app.mysql.resident import Resident
+from app.utils.export import csv_lines, export_response, ndjson_lines, read_csv
+import app.utils.vars as gb
+from datetime import date, datetime
+
+
+def test_export_residents_in_chunks(setup_database, monkeypatch):
+    """
+    Test: The export reads the table in chunks of EXPORT_CHUNK_SIZE rows.
+
+    Steps:
+        1. Add five residents and set the chunk size to 2.
+        2. Consume `export_residents`.
+
+    Expected Outcome:
+        - Three chunks of sizes 2, 2 and 1, in key order, with the export columns only.
+    """
+
+    monkeypatch.setattr(gb, "EXPORT_CHUNK_SIZE", 2)
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([Resident(idResident=i, name=f"N{i}", surname="Doe", idRoom=1) for i in range(1, 6)])
+    session.commit()
+
+    chunks = list(controller.export_residents(session=session))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [row["idResident"] for chunk in chunks for row in chunk] == [1, 2, 3, 4, 5]
+    assert tuple(chunks[0][0]) == ResidentController.EXPORT_FIELDS
+
+
+def test_export_formats():
+    """
+    Test: Chunks are encoded as NDJSON lines and as CSV with a header.
+    """
+
+    chunks = [[{"idAlarm": 1, "start": datetime(2023, 1, 1, 8, 0), "idRoom": 2}]]
+
+    ndjson = "".join(ndjson_lines(iter(chunks)))
+    assert json.loads(ndjson.splitlines()[0]) == {"idAlarm": 1, "start": "2023-01-01T08:00:00", "idRoom": 2}
+
+    csv_text = "".join(csv_lines(("idAlarm", "start", "idRoom"), iter(chunks)))
+    assert csv_text.splitlines() == ["idAlarm,start,idRoom", "1,2023-01-01 08:00:00,2"]
+
+
+def test_export_response_streams_chunks():
+    """
+    Test: The streaming response yields one encoded block per chunk and closes the source.
+
+    Steps:
+        1. Build the CSV response over a generator of two chunks.
+        2. Read its body.
+
+    Expected Outcome:
+        - The body holds the header and both rows.
+        - The media type is text/csv and the source generator was closed.
+    """
+
+    closed = []
+
+    def chunks():
+        try:
+            yield [{"idAlarm": 1, "start": None, "end": None, "idRoom": 1, "createDate": None}]
+            yield [{"idAlarm": 2, "start": None, "end": None, "idRoom": 1, "createDate": None}]
+        finally:
+            closed.append(True)
+
+    response = export_response(chunks(), AlarmController.EXPORT_FIELDS, "csv", "alarms")
+
+    async def read_body():
+        return [chunk async for chunk in response.body_iterator]
+
+    body = anyio.run(read_body)
+
+    assert response.media_type == "text/csv"
+    assert len(body) == 3
+    assert "".join(body).splitlines() == ["idAlarm,start,end,idRoom,createDate", "1,,,1,", "2,,,1,"]
+    assert closed == [True]
+
+
+def test_export_response_rejects_unknown_format():
+    """
+    Test: Unsupported formats are answered with a 400.
+    """
+
+    with pytest.raises(HTTPException) as error:
+        export_response((chunk for chunk in []), ("id",), "xml", "alarms")
+
+    assert error.value.status_code == 400
+
+
+def test_read_csv():
+    """
+    Test: Uploaded CSV documents are read into dicts, with blank cells as None.
+    """
+
+    data = "﻿name,surname,idFamily\nJohn,Doe,1\nJane,,2\n".encode("utf-8")
+
+    assert read_csv(data) == [
+        {"name": "John", "surname": "Doe", "idFamily": "1"},
+        {"name": "Jane", "surname": None, "idFamily": "2"},
+    ]
@@ -0,0 +1,38 @@
+from app.controllers.handler import Controllers
+from app.controllers.resident_controller import ResidentController
+
+
+def test_controllers_are_created_lazily():
+    """
+    Test: Building the facade does not build the specialized controllers.
+
+    Steps:
+        1. Create a `Controllers` instance.
+        2. Access the resident controller twice.
+
+    Expected Outcome:
+        - No controller exists before first use.
+        - The same instance is returned afterwards.
+    """
+
+    controllers = Controllers()
+
+    assert "resident_controller" not in vars(controllers)
+
+    first = controllers.resident_controller
+    assert isinstance(first, ResidentController)
+    assert controllers.resident_controller is first
+
+
+def test_controllers_share_room_occupancy():
+    """
+    Test: The resident and room controllers update the same occupancy counter.
+
+    Expected Outcome:
+        - Both controllers hold the facade's `RoomOccupancy` instance.
+    """
+
+    controllers = Controllers()
+
+    assert controllers.resident_controller.occupancy is controllers.room_occupancy
+    assert controllers.room_controller.occupancy is controllers.room_occupancy
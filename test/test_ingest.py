@@ -0,0 +1,235 @@
+import anyio
+import httpx
+import pytest
+import time
+from sqlalchemy.exc import IntegrityError, OperationalError
+from unittest.mock import patch
+from app.controllers.ingest import ReadingBuffer, decode_body, parse_readings
+from app.controllers.shelter_controller import ShelterController
+from app.mysql.shelter import Shelter
+from app.mysql.shelter_reading import METRICS, ShelterReading
+
+
+ENERGY = METRICS["energy"]
+WATER = METRICS["water"]
+
+# Minuto en curso, en milisegundos: las lecturas de los tests caen dentro de la retención
+T = int(time.time()) // 60 * 60000
+
+
+def _add_shelter(session):
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=50, energyLevel=100, waterLevel=100, radiationLevel=10))
+    session.commit()
+
+
+def test_parse_readings():
+    """
+    Test: Readings are accepted as objects or compact arrays, and invalid ones are reported.
+    """
+
+    readings, errors = parse_readings([
+        {"idShelter": 1, "metric": "energy", "takenAt": T + 1000, "value": 80},
+        [1, "water", T + 2000, 70],
+        [1, "radiation", 5],
+        {"idShelter": 1, "metric": "oxygen", "value": 1},
+        [1, "energy", "soon", 3],
+        "junk",
+        [1, "energy", T, 2 ** 63],
+        [2 ** 31, "energy", T, 1],
+        [1, "energy", 1000, 1],
+        [1, "energy", T + 2 * 86400000, 1],
+    ], now_ms=T + 9000)
+
+    assert readings == [(1, ENERGY, T + 1000, 80), (1, WATER, T + 2000, 70), (1, METRICS["radiation"], T + 9000, 5)]
+    assert [error["index"] for error in errors] == [3, 4, 5, 6, 7, 8, 9]
+    assert parse_readings({"value": 1})[1][0]["index"] is None
+
+
+def test_decode_body():
+    """
+    Test: JSON bodies are decoded and malformed ones raise ValueError.
+    """
+
+    assert decode_body(b'[[1, "energy", 1000, 80]]', "application/json") == [[1, "energy", 1000, 80]]
+    with pytest.raises(ValueError):
+        decode_body(b"[1,", "application/json")
+
+
+def test_decode_msgpack_body():
+    """
+    Test: msgpack bodies are decoded when msgpack is installed.
+    """
+
+    msgpack = pytest.importorskip("msgpack")
+
+    assert decode_body(msgpack.packb([[1, "energy", 1000, 80]]), "application/msgpack") == [[1, "energy", 1000, 80]]
+
+
+def test_reading_buffer_is_bounded():
+    """
+    Test: A batch that does not fit is rejected whole, and requeued batches go first.
+    """
+
+    buffer = ReadingBuffer(3)
+
+    assert buffer.add([1, 2])
+    assert not buffer.add([3, 4])
+    assert buffer.add([3])
+    assert buffer.drain() == [1, 2, 3]
+
+    buffer.add([4])
+    buffer.requeue([1, 2, 3])
+    assert buffer.drain() == [2, 3, 4]
+
+
+def test_flush_readings(setup_database):
+    """
+    Test: A flush writes the buffered readings in one transaction and applies the newest values.
+
+    Steps:
+        1. Buffer readings of two metrics, one repeated, one of an unknown shelter.
+        2. Flush, then buffer a resent reading and an older energy value, and flush again.
+
+    Expected Outcome:
+        - Each reading is stored once; the unknown shelter's is dropped.
+        - The shelter row and the level cache hold the newest value of each metric.
+        - An older reading does not overwrite a newer level.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    controller = ShelterController()
+    controller.get_shelter_energy_level(session=session)
+
+    assert controller.ingest_readings([
+        [1, "energy", T + 1000, 80],
+        [1, "energy", T + 3000, 60],
+        [1, "water", T + 2000, 90],
+        [1, "energy", T + 3000, 60],
+        [7, "energy", T + 1000, 5],
+    ])["accepted"] == 5
+
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 3}
+    shelter = session.query(Shelter).get(1)
+    assert (shelter.energyLevel, shelter.waterLevel) == (60, 90)
+    assert controller.get_shelter_energy_level(session=session)["energyLevel"] == 60
+
+    controller.ingest_readings([[1, "energy", T + 3000, 60], [1, "energy", T + 2000, 10]])
+
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 1}
+    assert session.query(ShelterReading).count() == 4
+    assert session.query(Shelter).get(1).energyLevel == 60
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 0}
+
+
+def test_flush_readings_requeues_on_failure(setup_database):
+    """
+    Test: If the database cannot be reached, the batch goes back to the buffer for the next flush.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    controller = ShelterController()
+    controller.ingest_readings([[1, "water", T + 1000, 50]])
+
+    down = OperationalError("INSERT", {}, Exception("down"))
+    with patch("app.controllers.shelter_controller.append_readings", side_effect=down):
+        assert controller.flush_readings(session=session)["status"] == "error"
+
+    assert len(controller.readings) == 1
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 1}
+
+    # Una clave duplicada de otro escritor simultáneo tampoco descarta el lote
+    controller.ingest_readings([[1, "water", T + 2000, 40]])
+    duplicate = IntegrityError("INSERT", {}, Exception("Duplicate entry"))
+    with patch("app.controllers.shelter_controller.append_readings", side_effect=duplicate):
+        assert controller.flush_readings(session=session)["status"] == "error"
+
+    assert len(controller.readings) == 1
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 1}
+
+
+def test_flush_readings_drops_unwritable_batch(setup_database):
+    """
+    Test: A batch the database refuses is dropped instead of being retried forever.
+
+    Steps:
+        1. Buffer a reading and make the write fail with a data error, as an out-of-range value would.
+        2. Buffer another reading and flush again.
+
+    Expected Outcome:
+        - The failed batch is not put back in the buffer.
+        - The next flush writes only the new reading.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    controller = ShelterController()
+    controller.ingest_readings([[1, "energy", T + 1000, 50]])
+
+    with patch("app.controllers.shelter_controller.append_readings", side_effect=OverflowError("int too big")):
+        assert controller.flush_readings(session=session)["status"] == "error"
+
+    assert len(controller.readings) == 0
+    controller.ingest_readings([[1, "energy", T + 2000, 60]])
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 1}
+    assert [reading.takenAt for reading in session.query(ShelterReading)] == [T + 2000]
+
+
+def test_prune_old_readings(setup_database):
+    """
+    Test: Old readings are deleted by their own task, not by the writes.
+
+    Steps:
+        1. Store a reading older than the raw retention, then ingest and flush a new one.
+        2. Prune.
+
+    Expected Outcome:
+        - The flush leaves the old reading in place.
+        - Pruning deletes it and keeps the new one.
+        - A failed prune is rolled back and reported.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    controller = ShelterController()
+    session.add(ShelterReading(idShelter=1, metric=ENERGY, takenAt=T - 72 * 3600 * 1000, value=10))
+    session.commit()
+
+    controller.ingest_readings([[1, "energy", T + 1000, 80]])
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 1}
+    assert session.query(ShelterReading).count() == 2
+
+    assert controller.prune_old_readings(session=session) == {"status": "ok"}
+    assert [reading.takenAt for reading in session.query(ShelterReading)] == [T + 1000]
+
+    down = OperationalError("DELETE", {}, Exception("down"))
+    with patch("app.controllers.shelter_controller.prune_readings", side_effect=down):
+        assert controller.prune_old_readings(session=session)["status"] == "error"
+
+
+def test_ingest_endpoint(monkeypatch):
+    """
+    Test: The endpoint buffers valid batches and rejects malformed bodies and full buffers.
+    """
+
+    from app.main import app, controllers
+
+    async def post(body, content_type="application/json"):
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await client.post("/shelter/readings", content=body, headers={"Content-Type": content_type})
+
+    controllers.shelter_controller.readings.drain()
+
+    response = anyio.run(post, b'[[1, "energy", 1704067200000, 80], [1, "oxygen", 1704067200000, 1]]')
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 1
+    assert len(response.json()["errors"]) == 1
+
+    assert anyio.run(post, b"[1,").status_code == 400
+
+    monkeypatch.setattr(controllers.shelter_controller.readings, "max_size", 1)
+    full = anyio.run(post, b'[[1, "energy", 1704067201000, 80]]')
+    assert full.status_code == 503
+    assert full.headers["retry-after"] == "1"
+    controllers.shelter_controller.readings.drain()
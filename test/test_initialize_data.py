@@ -0,0 +1,60 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.mysql.base import Base
+from app.mysql.initializeData import initialize_database
+from app.mysql.admin import Admin
+from app.mysql.resident import Resident
+from app.mysql.shelter import Shelter
+
+
+def test_initialize_database_seeds_empty_database(tmp_path):
+    """
+    Test: Seeding fills an empty database once.
+
+    Steps:
+        1. Seed an empty database.
+        2. Seed it again.
+
+    Expected Outcome:
+        - The first call inserts the initial data and returns True.
+        - The second call finds the data with its single probe and returns False.
+        - No rows are duplicated.
+    """
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(engine)
+
+    assert initialize_database(engine) is True
+    assert initialize_database(engine) is False
+
+    with Session(engine) as session:
+        assert session.query(Admin).count() == 2
+        assert session.query(Shelter).count() == 1
+        assert session.query(Resident).count() == 2
+
+
+def test_initialize_database_fills_only_empty_tables(tmp_path):
+    """
+    Test: Tables that already have data are not seeded again.
+
+    Steps:
+        1. Insert a custom admin.
+        2. Seed the database.
+
+    Expected Outcome:
+        - The custom admin is the only admin.
+        - The other tables receive the initial data.
+    """
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'partial.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Admin(idAdmin=10, email="root@example.com", name="Root", password="root"))
+        session.commit()
+
+    assert initialize_database(engine) is True
+
+    with Session(engine) as session:
+        assert [admin.idAdmin for admin in session.query(Admin).all()] == [10]
+        assert session.query(Shelter).count() == 1
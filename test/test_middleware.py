@@ -0,0 +1,133 @@
+import gzip
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from app.utils.middleware import CompressionMiddleware, ServerTimingMiddleware
+
+
+BIG = {"items": [{"id": i, "name": f"Resident {i}"} for i in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/big")
+    async def big():
+        return JSONResponse(BIG)
+
+    @app.get("/small")
+    async def small():
+        return JSONResponse({"status": "ok"})
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\x00" * 4096, media_type="application/octet-stream")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                yield f'{{"line": {i}}}\n'
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    async def events():
+        async def frames():
+            yield b"event: level\ndata: {}\n\n"
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    app.add_middleware(ServerTimingMiddleware)
+
+    def get(url, accept_encoding="gzip"):
+        async def send():
+            # httpx descomprime solo; se leen los bytes tal como llegan
+            async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+                request = http.build_request("GET", url, headers={"Accept-Encoding": accept_encoding})
+                response = await http.send(request, stream=True)
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                await response.aclose()
+                return response, raw
+        return anyio.run(send)
+
+    return get
+
+
+def test_large_json_is_gzipped(client):
+    """
+    Test: Bodies above the threshold are gzipped with a matching Content-Length.
+
+    Expected Outcome:
+        - Content-Encoding is gzip and the body decompresses to the original JSON.
+        - The compression time is reported in Server-Timing.
+    """
+
+    response, raw = client("/big")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw) == JSONResponse(BIG).body
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "compress;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.parametrize("url, accept_encoding", [
+    ("/small", "gzip"),
+    ("/binary", "gzip"),
+    ("/big", "identity"),
+    ("/events", "gzip"),
+    ("/big", "gzip;q=0"),
+    ("/big", "gzip; q=0"),
+    ("/big", "identity, gzip;q=0.0"),
+    ("/big", "br;q=0.000, gzip; Q=0.000"),
+    ("/big", "gzip;q=none"),
+])
+def test_not_compressed(client, url, accept_encoding):
+    """
+    Test: Small bodies, non-text content, event streams and clients without gzip get the plain body.
+
+    A gzip with a quality of 0, however it is written, counts as not accepted.
+    """
+
+    response, raw = client(url, accept_encoding)
+
+    assert "content-encoding" not in response.headers
+    assert "app;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip;q=0.5", "identity;q=0, gzip ; q=1.0", "br;q=0, gzip"])
+def test_compressed_with_quality(client, accept_encoding):
+    """
+    Test: A gzip with a quality above 0 is still used, whatever the spacing.
+    """
+
+    response, raw = client("/big", accept_encoding)
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_stream_is_compressed_incrementally(client):
+    """
+    Test: Streaming responses are gzipped chunk by chunk without a Content-Length.
+    """
+
+    response, raw = client("/stream")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == b'{"line": 0}\n{"line": 1}\n{"line": 2}\n'
+
+
+def test_choose_encoding():
+    """
+    Test: gzip is chosen when accepted and refused with q=0.
+    """
+
+    middleware = CompressionMiddleware(app=None)
+
+    assert middleware.choose_encoding("gzip, deflate") == "gzip"
+    assert middleware.choose_encoding("deflate, gzip;q=0") is None
+    assert middleware.choose_encoding("") is None
@@ -0,0 +1,155 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.mysql import admin, alarm, change_version, family, machine, migrate, resident, room, shelter, shelter_reading
+from app.mysql.base import Base
+
+
+@pytest.fixture
+def empty_engine(tmp_path):
+    """
+    Fixture providing an engine for an empty SQLite database file.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_creates_schema_and_records_version(empty_engine):
+    """
+    Test: Upgrading an empty database applies every migration.
+
+    Steps:
+        1. Run `upgrade` on an empty database.
+        2. Inspect the created tables, indexes and recorded version.
+
+    Expected Outcome:
+        - All migrations are applied in order.
+        - The schema version equals the latest migration.
+        - Tables and lookup indexes exist.
+    """
+
+    applied = migrate.upgrade(empty_engine)
+
+    assert applied == [module.VERSION for module in migrate.load_migrations()]
+    assert migrate.current_version(empty_engine) == migrate.latest_version()
+
+    inspector = inspect(empty_engine)
+    assert {"resident", "room", "family", "shelter", "machine", "alarm", "admin"} <= set(inspector.get_table_names())
+    assert "ix_resident_name_surname" in {index["name"] for index in inspector.get_indexes("resident")}
+    assert "ix_alarm_end_idRoom_start" in {index["name"] for index in inspector.get_indexes("alarm")}
+
+
+def test_upgrade_is_idempotent(empty_engine):
+    """
+    Test: Running the upgrade twice does nothing the second time.
+
+    Expected Outcome:
+        - The second call applies no migration.
+    """
+
+    migrate.upgrade(empty_engine)
+
+    assert migrate.upgrade(empty_engine) == []
+
+
+def test_upgrade_adopts_existing_database(empty_engine):
+    """
+    Test: A database created before migrations existed is upgraded in place.
+
+    Steps:
+        1. Create the tables without indexes and keep some data.
+        2. Run `upgrade`.
+
+    Expected Outcome:
+        - Data is preserved and the missing indexes are added.
+    """
+
+    Base.metadata.create_all(empty_engine)
+    with empty_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_admin_email"))
+        connection.execute(text("INSERT INTO admin (idAdmin, email, name, password) VALUES (1, 'a@a.com', 'A', 'p')"))
+
+    migrate.upgrade(empty_engine)
+
+    assert "ix_admin_email" in {index["name"] for index in inspect(empty_engine).get_indexes("admin")}
+    with empty_engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM admin")).scalar() == 1
+
+
+def test_upgrade_adds_alarm_metric_column(empty_engine):
+    """
+    Test: Alarm tables created before the rule engine get its metric column.
+
+    Expected Outcome:
+        - The column is added and the existing alarms keep a null metric.
+    """
+
+    migrate.upgrade(empty_engine, target=4)
+    assert "metric" not in {column["name"] for column in inspect(empty_engine).get_columns("alarm")}
+    with empty_engine.begin() as connection:
+        connection.execute(text("INSERT INTO alarm (idAlarm) VALUES (1)"))
+
+    migrate.upgrade(empty_engine)
+
+    assert "metric" in {column["name"] for column in inspect(empty_engine).get_columns("alarm")}
+    with empty_engine.connect() as connection:
+        assert connection.execute(text("SELECT metric FROM alarm")).scalar() is None
+
+
+def test_migrations_match_models(empty_engine):
+    """
+    Test: The schema built by the migrations is the one the models describe.
+
+    The migrations never read the models, so a model change without its
+    migration shows up here.
+
+    Expected Outcome:
+        - Every model table exists with the same columns and indexes.
+    """
+
+    migrate.upgrade(empty_engine)
+    inspector = inspect(empty_engine)
+
+    for table in Base.metadata.sorted_tables:
+        assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys()), table.name
+        indexes = {index["name"]: index["column_names"] for index in inspector.get_indexes(table.name)}
+        assert indexes == {index.name: [column.name for column in index.columns] for index in table.indexes}, table.name
+
+
+def test_check_schema_requires_upgrade(empty_engine):
+    """
+    Test: Startup check refuses an outdated schema.
+
+    Steps:
+        1. Upgrade only to version 1.
+        2. Call `check_schema`, then upgrade fully and call it again.
+
+    Expected Outcome:
+        - The first check raises a RuntimeError pointing to the CLI.
+        - The second check returns the latest version.
+    """
+
+    migrate.upgrade(empty_engine, target=1)
+
+    with pytest.raises(RuntimeError, match="app.mysql.migrate upgrade"):
+        migrate.check_schema(empty_engine)
+
+    migrate.upgrade(empty_engine)
+    assert migrate.check_schema(empty_engine) == migrate.latest_version()
+
+
+def test_cli_upgrade_and_check(tmp_path, capsys):
+    """
+    Test: The command line runs the upgrade as a separate step.
+
+    Expected Outcome:
+        - `check` fails before `upgrade` and succeeds after it.
+    """
+
+    url = f"sqlite:///{tmp_path / 'cli.db'}"
+
+    assert migrate.main(["check", "--url", url]) == 1
+    assert migrate.main(["upgrade", "--url", url]) == 0
+    assert migrate.main(["check", "--url", url]) == 0
+    assert "up to date" in capsys.readouterr().out
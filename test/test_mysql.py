@@ -0,0 +1,221 @@
+import pytest
+from datetime import date
+from app.mysql.mysql import DatabaseClient, RequestSession, get_engine, dispose_engines
+from app.controllers.resident_controller import ResidentController
+from app.controllers.room_controller import RoomController
+from app.controllers.shelter_controller import ShelterController
+from app.models.resident import Resident as ResidentModel
+from app.mysql.resident import Resident
+from app.mysql.room import Room
+from app.mysql.family import Family
+from app.mysql.shelter import Shelter
+
+
+def test_get_engine_returns_shared_engine():
+    """
+    Test: The engine registry returns one engine per database URL.
+
+    Steps:
+        1. Request an engine twice for the same URL.
+        2. Request an engine for a different URL.
+
+    Expected Outcome:
+        - The same URL yields the same engine instance.
+        - A different URL yields a different engine.
+    """
+
+    first = get_engine("sqlite:///:memory:")
+    second = get_engine("sqlite:///:memory:")
+    other = get_engine("sqlite://")
+
+    assert first is second
+    assert first is not other
+
+
+def test_controllers_share_engine():
+    """
+    Test: Controllers built for the same URL share one connection pool.
+
+    Steps:
+        1. Create two different controllers and a DatabaseClient.
+        2. Compare their engines.
+
+    Expected Outcome:
+        - All of them use the same engine instance.
+    """
+
+    resident_controller = ResidentController()
+    room_controller = RoomController()
+    client = DatabaseClient("sqlite:///:memory:")
+
+    assert resident_controller.db_client.engine is room_controller.db_client.engine
+    assert client.engine is resident_controller.db_client.engine
+
+
+def test_dispose_engines_clears_registry():
+    """
+    Test: Disposing the registry forces new engines to be created.
+
+    Steps:
+        1. Get an engine, dispose the registry and get it again.
+
+    Expected Outcome:
+        - A new engine instance is returned after disposal.
+    """
+
+    before = get_engine("sqlite://")
+    dispose_engines()
+    after = get_engine("sqlite://")
+
+    assert before is not after
+
+
+def test_request_session_defers_commit(setup_database):
+    """
+    Test: A controller commit inside a request does not end the transaction.
+
+    Steps:
+        1. Update the shelter energy level through a RequestSession.
+        2. Roll the request back instead of completing it.
+
+    Expected Outcome:
+        - The controller reports success.
+        - The energy level is unchanged after the rollback.
+    """
+
+    session = setup_database
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=100))
+    session.commit()
+
+    request_session = RequestSession(bind=session.get_bind())
+    response = ShelterController().updateShelterEnergyLevel(80, request_session)
+    request_session.rollback()
+    request_session.release()
+
+    assert response["status"] == "ok"
+    session.expire_all()
+    assert session.query(Shelter).first().energyLevel == 100
+
+
+def test_request_session_complete_commits_all_writes(setup_database):
+    """
+    Test: Multi-entity writes of one request are committed together.
+
+    Steps:
+        1. Fill the family's room so `create_resident` must open a new room.
+        2. Create the resident through a RequestSession and complete it.
+
+    Expected Outcome:
+        - The new room, the family update and the resident are all persisted.
+    """
+
+    session = setup_database
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=10),
+        Room(idRoom=1, roomName="Room 1", maxPeople=1, idShelter=1),
+        Family(idFamily=1, familyName="Doe Family", idRoom=1, idShelter=1),
+        Resident(idResident=1, name="Alice", surname="Doe", idFamily=1, idRoom=1),
+    ])
+    session.commit()
+
+    request_session = RequestSession(bind=session.get_bind())
+    resident_data = ResidentModel(
+        name="John", surname="Doe", birthDate=date(1990, 1, 1), gender="M",
+        createdBy=1, createDate=date.today(), idFamily=1, idRoom=1
+    )
+    response = ResidentController().create_resident(resident_data, session=request_session)
+    request_session.complete()
+    request_session.release()
+
+    assert response == {"status": "ok"}
+    session.expire_all()
+    family = session.query(Family).filter_by(idFamily=1).first()
+    assert family.idRoom != 1
+    assert session.query(Resident).filter_by(idRoom=family.idRoom).count() == 1
+
+
+def test_create_indexes_adds_missing_indexes(tmp_path):
+    """
+    Test: Indexes declared on the models are added to existing tables.
+
+    Steps:
+        1. Create the schema and drop one of the lookup indexes.
+        2. Call `create_indexes`.
+
+    Expected Outcome:
+        - Only the dropped index is created again.
+        - A second call creates nothing.
+    """
+
+    from sqlalchemy import inspect, text
+    from app.mysql.base import Base
+
+    client = DatabaseClient(f"sqlite:///{tmp_path / 'indexes.db'}")
+    Base.metadata.create_all(client.engine)
+    with client.engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_resident_name_surname"))
+
+    assert client.create_indexes() == ["ix_resident_name_surname"]
+    assert client.create_indexes() == []
+
+    resident_indexes = {index["name"] for index in inspect(client.engine).get_indexes("resident")}
+    # Las claves foráneas no llevan índice propio: InnoDB ya crea uno para cada una
+    assert resident_indexes == {"ix_resident_name_surname"}
+
+
+def test_on_commit_runs_after_commit_only(setup_database):
+    """
+    Test: Post-commit callbacks run on commit and are dropped on rollback.
+
+    Steps:
+        1. Register a callback and roll the session back.
+        2. Register another callback and commit.
+
+    Expected Outcome:
+        - Only the callback registered before the commit runs, once.
+    """
+
+    from app.mysql.mysql import on_commit
+
+    session = setup_database
+    calls = []
+
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter"))
+    on_commit(session, calls.append, "rolled back")
+    session.rollback()
+
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter"))
+    on_commit(session, calls.append, "committed")
+    session.commit()
+    session.commit()
+
+    assert calls == ["committed"]
+
+
+def test_pending_on_commit_shares_one_container(setup_database):
+    """
+    Test: Every write of a transaction queues its changes in the same container.
+
+    Steps:
+        1. Look up the container before any write, then queue two changes and commit.
+        2. Look it up again after the commit.
+
+    Expected Outcome:
+        - The lookup without a factory returns None and registers nothing.
+        - Both changes reach the callback together, once.
+        - After the commit a new transaction starts with no container.
+    """
+
+    from app.mysql.mysql import pending_on_commit
+
+    session = setup_database
+    applied = []
+
+    assert pending_on_commit(session, applied.append) is None
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter"))
+    pending_on_commit(session, applied.append, list).append("first")
+    pending_on_commit(session, applied.append, list).append("second")
+    session.commit()
+
+    assert applied == [["first", "second"]]
+    assert pending_on_commit(session, applied.append) is None
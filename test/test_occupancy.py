@@ -0,0 +1,160 @@
+import pytest
+from unittest.mock import patch
+from app.controllers.occupancy import RoomOccupancy
+from app.controllers.resident_controller import ResidentController
+from app.controllers.room_controller import RoomController
+from app.models.resident import Resident as ResidentModel
+from app.mysql.mysql import RequestSession
+from app.mysql.resident import Resident
+from app.mysql.family import Family
+from app.mysql.room import Room
+from app.mysql.shelter import Shelter
+from datetime import date
+
+
+def _populate(session):
+    shelter = Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=100)
+    room1 = Room(idRoom=1, roomName="Room 1", maxPeople=5, idShelter=1)
+    room2 = Room(idRoom=2, roomName="Room 2", maxPeople=5, idShelter=1)
+    family = Family(idFamily=1, familyName="Doe", idRoom=1, idShelter=1)
+    resident = Resident(idResident=1, name="John", surname="Doe", idFamily=1, idRoom=1)
+    session.add_all([shelter, room1, room2, family, resident])
+    session.commit()
+
+
+def test_occupancy_loaded_once(setup_database):
+    """
+    Test: The counts are loaded with one query and then served from memory.
+
+    Steps:
+        1. Read the count of a room.
+        2. Insert a resident directly in the database.
+        3. Read the count again.
+
+    Expected Outcome:
+        - Both reads return the loaded value.
+        - `reconcile` picks up the direct insert.
+    """
+
+    session = setup_database
+    _populate(session)
+    occupancy = RoomOccupancy()
+
+    assert occupancy.count(session, 1) == 1
+
+    session.add(Resident(idResident=2, name="Jane", surname="Doe", idFamily=1, idRoom=1))
+    session.commit()
+
+    assert occupancy.count(session, 1) == 1
+    occupancy.reconcile(session)
+    assert occupancy.count(session, 1) == 2
+
+
+def test_occupancy_follows_resident_changes(setup_database):
+    """
+    Test: Creating, moving and deleting residents keeps the counts in step.
+
+    Steps:
+        1. Create a resident through the controller.
+        2. Move it to another room, then delete it.
+
+    Expected Outcome:
+        - After each step the counts match a fresh count from the database.
+    """
+
+    session = setup_database
+    _populate(session)
+    occupancy = RoomOccupancy()
+    controller = ResidentController(occupancy=occupancy)
+    assert occupancy.counts(session) == {1: 1}
+
+    body = ResidentModel(name="Jane", surname="Doe", birthDate=date(1990, 1, 1), gender="F", createdBy=1, createDate=date.today(), idFamily=1)
+    assert controller.create_resident(body, session) == {"status": "ok"}
+    assert occupancy.counts(session) == {1: 2}
+
+    new_id = session.query(Resident).filter_by(name="Jane").first().idResident
+    controller.updateResidentRoom(new_id, 2, session)
+    assert occupancy.counts(session) == {1: 1, 2: 1}
+
+    controller.update_resident(new_id, {"idRoom": 1}, session)
+    assert occupancy.counts(session) == {1: 2, 2: 0}
+
+    controller.delete_resident(new_id, session)
+    assert occupancy.counts(session) == {1: 1, 2: 0}
+
+
+def test_occupancy_ignores_rolled_back_changes(setup_database):
+    """
+    Test: A change that is rolled back is not applied to the counts.
+
+    Steps:
+        1. Load the counts.
+        2. Move a resident inside a request session and roll it back.
+
+    Expected Outcome:
+        - The counts are unchanged.
+    """
+
+    session = setup_database
+    _populate(session)
+    occupancy = RoomOccupancy()
+    controller = ResidentController(occupancy=occupancy)
+    occupancy.counts(session)
+
+    request_session = RequestSession(bind=session.get_bind())
+    controller.updateResidentRoom(1, 2, request_session)
+    request_session.rollback()
+    request_session.release()
+
+    assert occupancy.counts(session) == {1: 1}
+
+
+def test_occupancy_reconcile_excludes_pending_changes(setup_database):
+    """
+    Test: Reloading inside a session with pending changes does not count them twice.
+
+    Steps:
+        1. Record a move in a request session and flush it.
+        2. Reload the counts through that session, then complete it.
+
+    Expected Outcome:
+        - The counts reflect the move exactly once.
+    """
+
+    session = setup_database
+    _populate(session)
+    occupancy = RoomOccupancy()
+    controller = ResidentController(occupancy=occupancy)
+
+    request_session = RequestSession(bind=session.get_bind())
+    controller.updateResidentRoom(1, 2, request_session)
+    occupancy.reconcile(request_session)
+    request_session.complete()
+    request_session.release()
+
+    assert occupancy.counts(session) == {1: 0, 2: 1}
+
+
+def test_access_room_uses_occupancy(setup_database):
+    """
+    Test: The capacity check does not count the resident table.
+
+    Steps:
+        1. Load the counts and mark room 1 as full in the counter.
+        2. Call `access_room` with `Session.query(...).count` patched to fail.
+
+    Expected Outcome:
+        - Access is denied because the room is full.
+    """
+
+    session = setup_database
+    _populate(session)
+    occupancy = RoomOccupancy()
+    occupancy.counts(session)
+    occupancy._apply({1: 4})
+    controller = RoomController(occupancy=occupancy)
+
+    with patch("sqlalchemy.orm.Query.count", side_effect=AssertionError("count query")):
+        response = controller.access_room(idResident=1, idRoom=1, session=session)
+
+    assert response == "Access denied. La sala está llena."
@@ -0,0 +1,92 @@
+from datetime import datetime
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.open_alarms import OpenAlarmIndex
+from app.models.alarm import Alarm as AlarmModel
+from app.mysql.alarm import Alarm
+from app.mysql.room import Room
+
+
+def _add_rooms(session):
+    session.add_all([Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1), Room(idRoom=2, roomName="Room B", maxPeople=5, idShelter=1)])
+    session.commit()
+
+
+def _body(idAlarm, idRoom, hour, end=None):
+    return AlarmModel(idAlarm=idAlarm, start=datetime(2024, 1, 1, hour), end=end, idRoom=idRoom, createDate=datetime(2024, 1, 1))
+
+
+def test_open_alarms_follow_creates_and_closes(setup_database):
+    """
+    Test: The open alarm set is kept current by the alarm controller.
+
+    Steps:
+        1. Load the set from a database holding one closed and one open alarm.
+        2. Create two open alarms in another room and one already closed.
+        3. Close one of them with `updateAlarmEndDate`.
+
+    Expected Outcome:
+        - Only alarms without an end are listed, oldest first, with the count per room.
+        - The closed alarm leaves the set, and its end is stored in the `end` column.
+    """
+
+    session = setup_database
+    _add_rooms(session)
+    session.add_all([
+        Alarm(idAlarm=1, start=datetime(2024, 1, 1, 1), end=datetime(2024, 1, 1, 2), idRoom=1),
+        Alarm(idAlarm=2, start=datetime(2024, 1, 1, 3), end=None, idRoom=1),
+    ])
+    session.commit()
+    controller = AlarmController(open_alarms=OpenAlarmIndex())
+
+    assert controller.load_open_alarms(session=session) == 1
+
+    controller.create_alarm(_body(3, 2, 5), session=session)
+    controller.create_alarm(_body(4, 2, 4), session=session)
+    controller.create_alarm(_body(5, 2, 6, end=datetime(2024, 1, 1, 7)), session=session)
+
+    result = controller.list_open_alarms(session=session)
+    assert [alarm["idAlarm"] for alarm in result["alarms"]] == [2, 4, 3]
+    assert result["rooms"] == {1: 1, 2: 2}
+
+    assert controller.updateAlarmEndDate(4, datetime(2024, 1, 1, 8), session=session)["status"] == "ok"
+
+    assert session.query(Alarm).get(4).end == datetime(2024, 1, 1, 8)
+    result = controller.list_open_alarms(idRoom=2, session=session)
+    assert result["alarms"] == [{"idAlarm": 3, "idRoom": 2, "start": datetime(2024, 1, 1, 5)}]
+    assert result["rooms"] == {2: 1}
+
+
+def test_open_alarms_ignore_rolled_back_writes(setup_database):
+    """
+    Test: An alarm whose transaction is rolled back never enters the set.
+    """
+
+    session = setup_database
+    _add_rooms(session)
+    index = OpenAlarmIndex()
+    index.reload(session)
+
+    index.opened(session, 9, 1, datetime(2024, 1, 1))
+    session.rollback()
+
+    assert index.list(session) == []
+
+
+def test_open_alarms_load_lazily(setup_database):
+    """
+    Test: The set is loaded from the database on first use and reloaded after invalidate.
+    """
+
+    session = setup_database
+    _add_rooms(session)
+    session.add(Alarm(idAlarm=1, start=datetime(2024, 1, 1), idRoom=1))
+    session.commit()
+    index = OpenAlarmIndex()
+
+    assert [alarm["idAlarm"] for alarm in index.list(session, idRoom=1)] == [1]
+
+    session.add(Alarm(idAlarm=2, start=datetime(2024, 1, 2), idRoom=2))
+    session.commit()
+    assert index.counts(session) == {1: 1}
+    index.invalidate()
+    assert index.counts(session) == {1: 1, 2: 1}
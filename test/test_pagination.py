@@ -0,0 +1,97 @@
+import pytest
+from fastapi import HTTPException
+from app.controllers.alarm_controller import AlarmController
+from app.controllers.room_controller import RoomController
+from app.mysql.alarm import Alarm
+from app.mysql.room import Room
+from app.utils.pagination import clamp_limit, decode_cursor, encode_cursor, page_params
+import app.utils.vars as gb
+from datetime import datetime
+
+
+def test_cursor_round_trip():
+    """
+    Test: A cursor decodes to the key it was built from, and malformed ones are rejected.
+    """
+
+    assert decode_cursor(encode_cursor(42)) == 42
+
+    for bad in ["", "not-a-cursor", encode_cursor("x")]:
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_clamp_limit(monkeypatch):
+    """
+    Test: Page sizes default to PAGE_DEFAULT_LIMIT and are bounded by PAGE_MAX_LIMIT.
+    """
+
+    monkeypatch.setattr(gb, "PAGE_DEFAULT_LIMIT", 50)
+    monkeypatch.setattr(gb, "PAGE_MAX_LIMIT", 200)
+
+    assert clamp_limit(None) == 50
+    assert clamp_limit(10) == 10
+    assert clamp_limit(5000) == 200
+    assert clamp_limit(0) == 1
+
+
+def test_page_params_rejects_bad_cursor():
+    """
+    Test: The route dependency answers 400 to a malformed cursor.
+    """
+
+    with pytest.raises(HTTPException) as error:
+        page_params(limit=10, cursor="???")
+
+    assert error.value.status_code == 400
+
+
+def test_list_alarms_pages(setup_database):
+    """
+    Test: Following `next_cursor` walks every alarm exactly once, in key order.
+
+    Steps:
+        1. Add five alarms.
+        2. List them two at a time, following `next_cursor` until it is None.
+
+    Expected Outcome:
+        - Three pages of sizes 2, 2 and 1 with every alarm once.
+    """
+
+    session = setup_database
+    controller = AlarmController()
+    session.add_all([
+        Alarm(idAlarm=i, start=datetime(2023, 1, i), idRoom=1, createDate=datetime(2023, 1, i))
+        for i in range(1, 6)
+    ])
+    session.commit()
+
+    ids, sizes, cursor = [], [], None
+    while True:
+        response = controller.list_alarms(session=session, limit=2, cursor=cursor)
+        assert response["status"] == "ok"
+        sizes.append(len(response["alarms"]))
+        ids.extend(alarm["idAlarm"] for alarm in response["alarms"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sizes == [2, 2, 1]
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_list_rooms_page(setup_database):
+    """
+    Test: A paginated `list_rooms` call returns a page dict instead of a plain list.
+    """
+
+    session = setup_database
+    controller = RoomController()
+    session.add_all([Room(idRoom=i, roomName=f"Room {i}", maxPeople=4) for i in range(1, 4)])
+    session.commit()
+
+    response = controller.list_rooms(session=session, limit=2)
+
+    assert response["status"] == "ok"
+    assert [room["idRoom"] for room in response["rooms"]] == [1, 2]
+    assert decode_cursor(response["next_cursor"]) == 2
@@ -0,0 +1,107 @@
+import pytest
+from app.controllers.admin_controller import AdminController
+from app.controllers.resident_controller import ResidentController
+from app.controllers.room_controller import RoomController
+from app.mysql.admin import Admin
+from app.mysql.resident import Resident
+from app.mysql.room import Room
+from app.utils.projection import fields_param, resolve_fields
+from datetime import date
+
+
+def test_resolve_fields():
+    """
+    Test: Sparse fieldsets keep request order, drop duplicates and reject unknown fields.
+    """
+
+    allowed = ("idResident", "name", "surname")
+
+    assert resolve_fields(None, allowed) == allowed
+    assert resolve_fields(["surname", "name", "surname"], allowed) == ("surname", "name")
+    with pytest.raises(ValueError):
+        resolve_fields(["password"], allowed)
+
+
+def test_fields_param():
+    """
+    Test: The query parameter is split on commas, ignoring blanks.
+    """
+
+    assert fields_param(None) is None
+    assert fields_param("name, surname,") == ["name", "surname"]
+
+
+def test_list_residents_sparse_fieldset(setup_database):
+    """
+    Test: `list_residents` returns only the requested fields, even when paginating.
+
+    Steps:
+        1. Add two residents.
+        2. List them with `fields=["name"]` and a limit of 1.
+
+    Expected Outcome:
+        - Each resident only has the `name` key and a next cursor is returned.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Resident(idResident=1, name="John", surname="Doe", birthDate=date(1990, 1, 1)),
+        Resident(idResident=2, name="Jane", surname="Doe", birthDate=date(1991, 1, 1)),
+    ])
+    session.commit()
+
+    response = controller.list_residents(session=session, limit=1, fields=["name"])
+
+    assert response["residents"] == [{"name": "John"}]
+    assert response["next_cursor"] is not None
+
+
+def test_list_residents_in_room_formats_dates(setup_database):
+    """
+    Test: Projected rows keep the ISO 8601 date format of the previous read path.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add(Resident(idResident=1, name="John", surname="Doe", birthDate=date(1990, 1, 1), idRoom=3))
+    session.commit()
+
+    response = controller.list_residents_in_room(3, session=session, fields=["idResident", "birthDate"])
+
+    assert response == {"status": "ok", "residents": [{"idResident": 1, "birthDate": "1990-01-01"}]}
+
+
+def test_list_unknown_field_is_an_error(setup_database):
+    """
+    Test: Asking for a field the endpoint does not expose returns an error.
+    """
+
+    session = setup_database
+    session.add(Admin(idAdmin=1, email="admin@example.com", name="Admin", password="secret"))
+    session.commit()
+
+    response = AdminController().listAdmins(session=session, fields=["password"])
+
+    assert response == {"status": "error", "message": "Unknown field(s): password."}
+
+
+def test_list_rooms_does_not_hydrate_entities(setup_database):
+    """
+    Test: The list path reads rows, so no Room instance enters the identity map.
+    """
+
+    session = setup_database
+    session.add(Room(idRoom=1, roomName="Room 1", maxPeople=4))
+    session.commit()
+    session.expunge_all()
+
+    controller = RoomController()
+    original_close = session.close
+    session.close = lambda: None
+    try:
+        rooms = controller.list_rooms(session=session, fields=["roomName"])
+        assert rooms == [{"roomName": "Room 1"}]
+        assert len(session.identity_map) == 0
+    finally:
+        session.close = original_close
@@ -1511,3 +1511,215 @@ def test_delete_resident_empty_database(setup_database):
 
 
 
+
+
+def test_import_residents(setup_database):
+    """
+    Test: A bulk import creates the valid rows in one transaction and reports the rest.
+
+    Steps:
+        1. Create a shelter, a room for 2 people and a family with one member.
+        2. Import four residents of that family, one invalid row, one duplicate
+           and one of a nonexistent family.
+
+    Expected Outcome:
+        - The valid residents are created; the room overflows into one new room
+          that holds the rest of the family.
+        - Each rejected row is reported with its position and reason.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=100),
+        Room(idRoom=1, roomName="Room1", maxPeople=2, idShelter=1),
+        Family(idFamily=1, familyName="Doe", idRoom=1, idShelter=1),
+        Resident(idResident=1, name="John", surname="Doe", idFamily=1, idRoom=1),
+    ])
+    session.commit()
+
+    def row(name, idFamily=1):
+        return {"name": name, "surname": "Doe", "birthDate": "1990-01-01", "gender": "M", "createdBy": 1, "idFamily": idFamily}
+
+    rows = [
+        row("Jane"),
+        row("John"),
+        {"name": "Bad"},
+        row("Jim"),
+        row("Ann", idFamily=9),
+        row("Sue"),
+        row("Tom"),
+    ]
+
+    response = controller.import_residents(rows, session=session)
+
+    assert response["status"] == "ok"
+    assert response["imported"] == 4
+    assert [(error["row"], error["message"]) for error in response["errors"] if error["row"] != 2] == [
+        (1, "Resident already exists in this room."),
+        (4, "The family does not exist."),
+    ]
+    assert response["errors"][1]["row"] == 2
+
+    new_room = session.query(Room).filter(Room.roomName == "Room2").one()
+    assert new_room.maxPeople >= 3
+    assert session.query(Family).get(1).idRoom == new_room.idRoom
+    rooms = dict(session.query(Resident.name, Resident.idRoom))
+    assert rooms == {"John": 1, "Jane": 1, "Jim": new_room.idRoom, "Sue": new_room.idRoom, "Tom": new_room.idRoom}
+    assert controller.occupancy.count(session, new_room.idRoom) == 3
+
+
+def test_import_residents_shelter_full(setup_database):
+    """
+    Test: Rows beyond the shelter capacity are rejected.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=2),
+        Room(idRoom=1, roomName="Room1", maxPeople=10, idShelter=1),
+        Family(idFamily=1, familyName="Doe", idRoom=1, idShelter=1),
+    ])
+    session.commit()
+
+    rows = [
+        {"name": name, "surname": "Doe", "birthDate": "1990-01-01", "gender": "F", "createdBy": 1, "idFamily": 1}
+        for name in ("Ann", "Bea", "Cid")
+    ]
+
+    response = controller.import_residents(rows, session=session)
+
+    assert response["imported"] == 2
+    assert response["errors"] == [{"row": 2, "message": "Shelter is full."}]
+    assert session.query(Resident).count() == 2
+
+
+def test_patch_resident(setup_database):
+    """
+    Test: A partial update changes only the fields sent and returns the new row.
+
+    Steps:
+        1. Create a resident in room 1.
+        2. Patch its name and room.
+        3. Patch a nonexistent resident and send an unknown field.
+
+    Expected Outcome:
+        - The resident keeps its surname and gets the new name, room and update date.
+        - The room occupancy follows the move.
+        - The other calls report "not found" and an error.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=10),
+        Room(idRoom=1, roomName="Room A", maxPeople=4, idShelter=1),
+        Room(idRoom=2, roomName="Room B", maxPeople=4, idShelter=1),
+        Resident(idResident=1, name="John", surname="Doe", idRoom=1),
+    ])
+    session.commit()
+    assert controller.occupancy.count(session, 1) == 1
+
+    response = controller.patch_resident(1, {"name": "Jack", "idRoom": 2}, session=session)
+
+    assert response["status"] == "ok"
+    assert response["resident"]["name"] == "Jack"
+    assert response["resident"]["surname"] == "Doe"
+    assert response["resident"]["idRoom"] == 2
+    assert session.query(Resident).get(1).update == date.today()
+    assert controller.occupancy.count(session, 1) == 0
+    assert controller.occupancy.count(session, 2) == 1
+
+    assert controller.patch_resident(9, {"name": "Nobody"}, session=session) == {"status": "not found"}
+    assert controller.patch_resident(1, {"password": "x"}, session=session)["status"] == "error"
+    assert controller.patch_resident(1, {}, session=session)["status"] == "error"
+
+
+def test_patch_residents_batch(setup_database):
+    """
+    Test: A batch of partial updates is applied in one transaction.
+
+    Expected Outcome:
+        - Every existing resident gets its changes; patches of the same resident are merged.
+        - Patches of nonexistent residents are reported and skipped.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Resident(idResident=1, name="John", surname="Doe", gender="M"),
+        Resident(idResident=2, name="Jane", surname="Doe", gender="F"),
+        Resident(idResident=3, name="Jim", surname="Roe", gender="M"),
+    ])
+    session.commit()
+
+    response = controller.patch_residents([
+        {"idResident": 1, "surname": "Smith"},
+        {"idResident": 2, "surname": "Smith"},
+        {"idResident": 3, "name": "James"},
+        {"idResident": 1, "gender": "X"},
+        {"idResident": 7, "name": "Ghost"},
+    ], session=session)
+
+    assert response["status"] == "ok"
+    assert response["errors"] == [{"idResident": 7, "message": "Resident not found."}]
+    assert [(r["idResident"], r["name"], r["surname"], r["gender"]) for r in response["residents"]] == [
+        (1, "John", "Smith", "X"),
+        (2, "Jane", "Smith", "F"),
+        (3, "James", "Roe", "M"),
+    ]
+
+    invalid = controller.patch_residents([{"idResident": 1, "idShelter": 2}], session=session)
+    assert invalid["status"] == "error"
+
+
+def test_move_residents(setup_database):
+    """
+    Test: Residents and whole families are moved in one transaction.
+
+    Steps:
+        1. Create two families in room 1 and an empty room 2 for 3 people.
+        2. Move family 1 and one member of family 2 to room 2.
+        3. Try to move the last resident to room 2, which is now full.
+
+    Expected Outcome:
+        - Family 1 and its members, and the listed resident, end up in room 2.
+        - The occupancy counters follow the move.
+        - The move into the full room is rejected and nothing changes.
+    """
+
+    session = setup_database
+    controller = ResidentController()
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=10),
+        Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1),
+        Room(idRoom=2, roomName="Room B", maxPeople=3, idShelter=1),
+        Family(idFamily=1, familyName="Doe", idRoom=1, idShelter=1),
+        Family(idFamily=2, familyName="Roe", idRoom=1, idShelter=1),
+        Resident(idResident=1, name="John", surname="Doe", idFamily=1, idRoom=1),
+        Resident(idResident=2, name="Jane", surname="Doe", idFamily=1, idRoom=1),
+        Resident(idResident=3, name="Jim", surname="Roe", idFamily=2, idRoom=1),
+        Resident(idResident=4, name="Ann", surname="Roe", idFamily=2, idRoom=1),
+    ])
+    session.commit()
+    assert controller.occupancy.count(session, 1) == 4
+
+    response = controller.move_residents([
+        {"idRoom": 2, "idFamily": 1},
+        {"idRoom": 2, "idResidents": [3]},
+    ], session=session)
+
+    assert response == {"status": "ok", "moved": 3}
+    assert dict(session.query(Resident.idResident, Resident.idRoom)) == {1: 2, 2: 2, 3: 2, 4: 1}
+    assert session.query(Family).get(1).idRoom == 2
+    assert session.query(Family).get(2).idRoom == 1
+    assert controller.occupancy.count(session, 1) == 1
+    assert controller.occupancy.count(session, 2) == 3
+
+    full = controller.move_residents([{"idRoom": 2, "idResidents": [4]}], session=session)
+
+    assert full["status"] == "error"
+    assert session.query(Resident).get(4).idRoom == 1
+    assert controller.move_residents([{"idRoom": 2, "idResidents": [99]}], session=session)["status"] == "error"
+    assert controller.move_residents([{"idRoom": 9, "idFamily": 2}], session=session)["status"] == "error"
@@ -0,0 +1,87 @@
+import json
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from app.utils.responses import FastJSONResponse, JSONRoute, StdJSONResponse, get_response_class
+import app.utils.vars as gb
+from datetime import date, datetime
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=get_response_class())
+    app.router.route_class = JSONRoute
+
+    @app.get("/items")
+    async def items(limit: int = 1):
+        return {"items": [{"id": i, "day": date(2024, 1, i + 1)} for i in range(limit)]}
+
+    @app.post("/created", status_code=201)
+    def created():
+        return {"status": "ok"}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("plain")
+
+    def request(method, url, **kwargs):
+        async def send():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+                return await http.request(method, url, **kwargs)
+        return anyio.run(send)
+
+    return request
+
+
+@pytest.mark.parametrize("response_class", [FastJSONResponse, StdJSONResponse])
+def test_response_classes_render_dates(response_class):
+    """
+    Test: Both response classes render dates and datetimes in ISO 8601.
+    """
+
+    body = response_class({"day": date(2024, 1, 2), "at": datetime(2024, 1, 2, 3, 4, 5), 1: "x"}).body
+
+    assert json.loads(body) == {"day": "2024-01-02", "at": "2024-01-02T03:04:05", "1": "x"}
+
+
+def test_get_response_class(monkeypatch):
+    """
+    Test: JSON_RESPONSE selects the encoder.
+    """
+
+    monkeypatch.setattr(gb, "JSON_RESPONSE", "std")
+    assert get_response_class() is StdJSONResponse
+
+    monkeypatch.setattr(gb, "JSON_RESPONSE", "orjson")
+    assert get_response_class() is FastJSONResponse
+
+
+def test_json_route_skips_jsonable_encoder(client, mocker):
+    """
+    Test: Routes hand their result to the response class without `jsonable_encoder`.
+
+    Steps:
+        1. Make `jsonable_encoder` fail if FastAPI calls it.
+        2. Request an endpoint with a query parameter.
+
+    Expected Outcome:
+        - The query parameter is still parsed and the dates are rendered.
+    """
+
+    mocker.patch("fastapi.routing.jsonable_encoder", side_effect=AssertionError("jsonable_encoder called"))
+
+    response = client("GET", "/items", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert response.json() == {"items": [{"id": 0, "day": "2024-01-01"}, {"id": 1, "day": "2024-01-02"}]}
+
+
+def test_json_route_keeps_status_code_and_responses(client):
+    """
+    Test: The route status code is kept and returned responses pass through untouched.
+    """
+
+    assert client("POST", "/created").status_code == 201
+    assert client("GET", "/text").text == "plain"
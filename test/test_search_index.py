@@ -0,0 +1,217 @@
+import pytest
+from app.controllers.resident_controller import ResidentController
+from app.controllers.search_index import ResidentSearchIndex, normalize, tokenize
+from app.mysql.mysql import RequestSession
+from app.mysql.resident import Resident
+from app.mysql.family import Family
+from app.mysql.room import Room
+from app.mysql.shelter import Shelter
+from app.models.resident import Resident as ResidentModel
+from datetime import date
+
+
+def _populate(session):
+    session.add_all([
+        Resident(idResident=1, name="John", surname="Doe"),
+        Resident(idResident=2, name="Johanna", surname="Smith"),
+        Resident(idResident=3, name="José Luis", surname="Pérez-Gil"),
+        Resident(idResident=4, name="Jane", surname="Doe"),
+    ])
+    session.commit()
+
+
+def _ids(results):
+    return [result["idResident"] for result in results]
+
+
+def test_normalize_and_tokenize():
+    """
+    Test: Names are folded to lowercase without accents and split into words.
+    """
+
+    assert normalize("José ÁLVAREZ") == "jose alvarez"
+    assert tokenize("José Luis Pérez-Gil") == ("jose", "luis", "perez", "gil")
+
+
+def test_prefix_search(setup_database):
+    """
+    Test: Every query word must start a word of the resident's name or surname.
+
+    Expected Outcome:
+        - Results follow the alphabetical order of the matched word and are limited.
+        - Accents and case are ignored.
+    """
+
+    session = setup_database
+    _populate(session)
+    index = ResidentSearchIndex()
+
+    assert _ids(index.search(session, "jo")) == [2, 1, 3]
+    assert _ids(index.search(session, "jo", limit=2)) == [2, 1]
+    assert _ids(index.search(session, "j doe")) == [1, 4]
+    assert _ids(index.search(session, "PEREZ")) == [3]
+    assert _ids(index.search(session, "gil jos")) == [3]
+    assert index.search(session, "joe") == []
+    assert index.search(session, "   ") == []
+    assert index.search(session, "doe")[0] == {"idResident": 1, "name": "John", "surname": "Doe"}
+
+
+def test_fuzzy_search(setup_database):
+    """
+    Test: Fuzzy mode tolerates typos and ranks exact prefix matches first.
+    """
+
+    session = setup_database
+    _populate(session)
+    index = ResidentSearchIndex()
+
+    assert index.search(session, "jhon") == []
+    assert _ids(index.search(session, "jhon", fuzzy=True)) == [1]
+    assert _ids(index.search(session, "smiht", fuzzy=True)) == [2]
+    assert _ids(index.search(session, "jo", fuzzy=True)) == [2, 1, 3, 4]
+    assert _ids(index.search(session, "jone", fuzzy=True)) == [4, 3]
+    assert index.search(session, "xyz", fuzzy=True) == []
+    # La primera letra no admite errores
+    assert index.search(session, "hjon", fuzzy=True) == []
+
+
+def test_reload_does_not_block_lookups(setup_database, monkeypatch):
+    """
+    Test: A reload queries the database outside the lock and keeps changes committed meanwhile.
+
+    Steps:
+        1. Load the index, then reload it with a query that, while it runs, checks
+           the lock is free and commits the creation of a new resident.
+
+    Expected Outcome:
+        - Another thread can take the lock during the reload query.
+        - The resident created during the reload is found afterwards.
+    """
+
+    import threading
+    import app.controllers.search_index as search_index
+
+    session = setup_database
+    _populate(session)
+    index = ResidentSearchIndex()
+    index.reload(session)
+    build = search_index._NameIndex
+    free = []
+
+    def probe():
+        if index._lock.acquire(timeout=1):
+            index._lock.release()
+            free.append(True)
+
+    def concurrent_build(rows):
+        worker = threading.Thread(target=probe)
+        worker.start()
+        worker.join()
+        # Un commit que llega mientras se construye el índice nuevo
+        index._apply([("add", 5, "Zara", "Roe")])
+        return build(rows)
+
+    monkeypatch.setattr(search_index, "_NameIndex", concurrent_build)
+    assert index.reload(session) == 5
+    assert free == [True]
+    assert _ids(index.search(session, "zara")) == [5]
+
+
+def test_index_follows_committed_changes(setup_database):
+    """
+    Test: Creating, renaming and deleting residents updates the index on commit only.
+
+    Steps:
+        1. Load the index, then create a resident through the controller.
+        2. Rename it, and rename another one in a transaction that is rolled back.
+        3. Delete it.
+
+    Expected Outcome:
+        - Each committed change is visible to the next search without a reload.
+        - The rolled-back rename is not.
+    """
+
+    session = setup_database
+    session.add_all([
+        Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=10),
+        Room(idRoom=1, roomName="Room A", maxPeople=10, idShelter=1),
+        Family(idFamily=1, familyName="Doe", idRoom=1, idShelter=1),
+    ])
+    session.commit()
+    _populate(session)
+    controller = ResidentController()
+    assert controller.build_search_index(session=session) == 4
+
+    controller.create_resident(ResidentModel(
+        name="Zoe", surname="Quinn", birthDate=date(2000, 1, 1), gender="F",
+        createdBy=1, createDate=date.today(), idFamily=1,
+    ), session=session)
+    created = session.query(Resident).filter_by(name="Zoe").one().idResident
+    assert _ids(controller.search_residents("zo")["residents"]) == [created]
+
+    controller.updateResidentName(created, "Zara", session=session)
+    assert controller.search_residents("zo")["residents"] == []
+    assert _ids(controller.search_residents("zara qu")["residents"]) == [created]
+
+    request_session = RequestSession(bind=session.get_bind())
+    controller.patch_resident(1, {"surname": "Roe"}, session=request_session)
+    request_session.release()
+    assert _ids(controller.search_residents("roe")["residents"]) == []
+
+    controller.delete_resident(created, session=session)
+    assert controller.search_residents("zara")["residents"] == []
+
+
+def test_autocomplete_and_exact_lookup_routes(setup_database, monkeypatch):
+    """
+    Test: Autocomplete is a mode of /resident/search and the exact lookup stays the default.
+
+    Steps:
+        1. Call GET /resident/search?q=jo&mode=prefix.
+        2. Call GET /resident/search?name=John&surname=Doe.
+        3. Call GET /resident/search?q=jo (no mode) and GET /resident/search?q=jo&mode=soundex.
+
+    Expected Outcome:
+        - The autocomplete returns the residents whose names start with "jo".
+        - The exact lookup returns John Doe's room.
+        - The exact mode without name and surname answers 422 and an unknown mode answers 400.
+    """
+
+    import anyio
+    import httpx
+    import app.main as main
+    from app.mysql.mysql import get_request_session
+
+    session = setup_database
+    session.add(Room(idRoom=1, roomName="Room A", maxPeople=5, idShelter=1))
+    session.commit()
+    _populate(session)
+    session.query(Resident).filter(Resident.idResident == 1).update({"idRoom": 1})
+    session.commit()
+
+    # Ejecuta la unidad de trabajo en el hilo del test: la base en memoria es por conexión
+    async def inline(session, func, *args, **kwargs):
+        return func(*args, session=session, **kwargs)
+    monkeypatch.setattr(main, "run_unit_of_work", inline)
+    monkeypatch.setitem(main.app.dependency_overrides, get_request_session, lambda: session)
+    main.controllers.resident_controller.search_index.invalidate()
+
+    async def get(url):
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.get(url)
+
+    try:
+        autocomplete = anyio.run(get, "/resident/search?q=jo&mode=prefix")
+        exact = anyio.run(get, "/resident/search?name=John&surname=Doe")
+        missing = anyio.run(get, "/resident/search?q=jo")
+        unknown = anyio.run(get, "/resident/search?q=jo&mode=soundex")
+    finally:
+        main.controllers.resident_controller.search_index.invalidate()
+
+    assert autocomplete.status_code == 200
+    assert sorted(_ids(autocomplete.json()["residents"])) == [1, 2, 3]
+    assert exact.status_code == 200
+    assert exact.json()["status"] == "ok"
+    assert exact.json()["room"]["roomName"] == "Room A"
+    assert missing.status_code == 422
+    assert unknown.status_code == 400
@@ -1,7 +1,11 @@
 import pytest
+from unittest.mock import patch
 from app.controllers.shelter_controller import ShelterController
 from app.mysql.shelter import Shelter
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Session
+from app.mysql.shelter_reading import METRICS, ShelterReading, ShelterReadingMinute, append_readings, minute_upsert, to_millis
+from datetime import datetime, timedelta
 
 
 def test_get_shelter_energy_level_success(setup_database):
@@ -210,4 +214,301 @@ def test_updateShelterRadiationLevel_success(setup_database):
     # Verify the response and databes changes
     assert response == {"status": "ok", "message": "Nivel de radiación actualizado exitosamente"}
     updated_shelter = session.query(Shelter).filter(Shelter.idShelter == 1).first()
-    assert updated_shelter.radiationLevel == 8
\ No newline at end of file
+    assert updated_shelter.radiationLevel == 8
+
+def test_get_shelter_levels_served_from_cache(setup_database):
+    """
+    Test: Level reads after the first one do not query the database.
+
+    Steps:
+        1. Read the energy level once to load the cache.
+        2. Change the row directly in the database.
+        3. Read the energy and water levels again.
+
+    Expected Outcome:
+        - The cached values are returned.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+
+    shelter = Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=80, waterLevel=90, radiationLevel=10)
+    session.add(shelter)
+    session.commit()
+
+    assert controller.get_shelter_energy_level(session=session) == {"energyLevel": 80}
+
+    session.query(Shelter).update({"energyLevel": 5})
+    session.commit()
+
+    assert controller.get_shelter_energy_level(session=session) == {"energyLevel": 80}
+    assert controller.get_shelter_water_level(session=session) == {"waterLevel": 90}
+
+
+def test_update_shelter_levels_write_through_cache(setup_database):
+    """
+    Test: Level updates are written through to the cache.
+
+    Steps:
+        1. Load the cache with a read.
+        2. Update the three levels.
+        3. Read them again.
+
+    Expected Outcome:
+        - The reads return the new values.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+
+    shelter = Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=80, waterLevel=90, radiationLevel=10)
+    session.add(shelter)
+    session.commit()
+    controller.get_shelter_energy_level(session=session)
+
+    controller.updateShelterEnergyLevel(60, session)
+    controller.updateShelterWaterLevel(50, session)
+    controller.updateShelterRadiationLevel(40, session)
+
+    assert controller.get_shelter_energy_level(session=session) == {"energyLevel": 60}
+    assert controller.get_shelter_water_level(session=session) == {"waterLevel": 50}
+    assert controller.get_shelter_radiation_level(session=session) == {"radiationLevel": 40}
+
+
+def test_update_shelter_level_rolled_back_keeps_cache(setup_database):
+    """
+    Test: An update that is never committed does not reach the cache.
+
+    Steps:
+        1. Load the cache with a read.
+        2. Update the energy level inside a request session and roll it back.
+
+    Expected Outcome:
+        - The cache still holds the original value.
+    """
+
+    from app.mysql.mysql import RequestSession
+
+    session = setup_database
+    controller = ShelterController()
+
+    shelter = Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=80, waterLevel=90, radiationLevel=10)
+    session.add(shelter)
+    session.commit()
+    controller.get_shelter_energy_level(session=session)
+
+    request_session = RequestSession(bind=session.get_bind())
+    controller.updateShelterEnergyLevel(10, request_session)
+    request_session.rollback()
+    request_session.release()
+
+    assert controller.get_shelter_energy_level(session=session) == {"energyLevel": 80}
+
+
+def test_shelter_cache_ttl_expires(setup_database):
+    """
+    Test: With a ttl the cached levels are reloaded from the database.
+
+    Steps:
+        1. Load the cache, then change the row directly.
+        2. Force the cached entry to be older than the ttl.
+
+    Expected Outcome:
+        - The next read returns the value stored in the database.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+    controller.cache.ttl = 1
+
+    shelter = Shelter(idShelter=1, shelterName="Main Shelter", energyLevel=80, waterLevel=90, radiationLevel=10)
+    session.add(shelter)
+    session.commit()
+    controller.get_shelter_energy_level(session=session)
+
+    session.query(Shelter).update({"energyLevel": 5})
+    session.commit()
+    controller.cache._loaded_at -= 2
+
+    assert controller.get_shelter_energy_level(session=session) == {"energyLevel": 5}
+
+
+def _add_shelter(session):
+    session.add(Shelter(idShelter=1, shelterName="Main Shelter", maxPeople=50, energyLevel=100, waterLevel=100, radiationLevel=10))
+    session.commit()
+
+
+def test_update_shelter_level_appends_reading(setup_database):
+    """
+    Test: Every level update is also appended to the history and its minute rollup.
+
+    Expected Outcome:
+        - One reading per update, and one rollup row with their count, sum, minimum and maximum.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+    _add_shelter(session)
+
+    controller.updateShelterWaterLevel(80, session)
+    controller.updateShelterWaterLevel(60, session)
+
+    readings = session.query(ShelterReading.metric, ShelterReading.value).order_by(ShelterReading.takenAt).all()
+    assert readings == [(METRICS["water"], 80), (METRICS["water"], 60)]
+    minutes = session.query(ShelterReadingMinute).all()
+    assert sum(minute.samples for minute in minutes) == 2
+    assert sum(minute.total for minute in minutes) == 140
+    assert min(minute.low for minute in minutes) == 60
+    assert max(minute.high for minute in minutes) == 80
+
+
+def test_update_shelter_level_same_millisecond(setup_database):
+    """
+    Test: Updates recorded in the same millisecond never fail the level write.
+
+    Steps:
+        1. Freeze the clock and store an ingested water reading at that millisecond.
+        2. Update the water level twice.
+
+    Expected Outcome:
+        - Both updates succeed and the shelter holds the last value.
+        - Each update is recorded in the next free millisecond.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+    _add_shelter(session)
+    frozen = datetime(2024, 1, 1, 8, 0, 0, 500000)
+    taken_at = to_millis(frozen)
+    append_readings(session, [(1, METRICS["water"], taken_at, 90)])
+    session.commit()
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return frozen
+
+    with patch("app.controllers.shelter_controller.datetime", FrozenDatetime):
+        assert controller.updateShelterWaterLevel(80, session)["status"] == "ok"
+        assert controller.updateShelterWaterLevel(60, session)["status"] == "ok"
+
+    assert session.query(Shelter).get(1).waterLevel == 60
+    readings = session.query(ShelterReading.takenAt, ShelterReading.value).order_by(ShelterReading.takenAt).all()
+    assert readings == [(taken_at, 90), (taken_at + 1, 80), (taken_at + 2, 60)]
+
+
+def test_update_shelter_level_not_overwritten_by_older_ingested_reading(setup_database):
+    """
+    Test: A level set through the API is not overwritten by a later flush of an older reading.
+
+    Steps:
+        1. Set the water level with the clock frozen.
+        2. Ingest and flush a water reading taken one second earlier, and an energy one.
+
+    Expected Outcome:
+        - The older reading is stored in the history but the water level keeps the manual value.
+        - The energy reading still updates its level.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+    _add_shelter(session)
+    frozen = datetime.utcnow().replace(microsecond=0)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return frozen
+
+    with patch("app.controllers.shelter_controller.datetime", FrozenDatetime):
+        assert controller.updateShelterWaterLevel(80, session)["status"] == "ok"
+
+    taken_at = to_millis(frozen)
+    controller.ingest_readings([[1, "water", taken_at - 1000, 10], [1, "energy", taken_at - 1000, 30]])
+    assert controller.flush_readings(session=session) == {"status": "ok", "written": 2}
+
+    shelter = session.query(Shelter).get(1)
+    assert (shelter.waterLevel, shelter.energyLevel) == (80, 30)
+    assert session.query(ShelterReading).count() == 3
+
+
+def test_append_readings_folds_into_existing_minute(setup_database):
+    """
+    Test: Readings of a minute that already has a rollup row are added to it in the same statement.
+
+    Expected Outcome:
+        - The minute holds the count, sum, minimum and maximum of both batches.
+        - On MySQL the statement is an INSERT ... ON DUPLICATE KEY UPDATE.
+    """
+
+    session = setup_database
+    _add_shelter(session)
+    minute = to_millis(datetime(2024, 1, 1, 8))
+    append_readings(session, [(1, METRICS["water"], minute + 1000, 50), (1, METRICS["water"], minute + 2000, 70)])
+    append_readings(session, [(1, METRICS["water"], minute + 3000, 40), (1, METRICS["water"], minute + 61000, 90)])
+    session.commit()
+
+    rows = session.query(ShelterReadingMinute).order_by(ShelterReadingMinute.minute).all()
+    assert [(row.samples, row.total, row.low, row.high) for row in rows] == [(3, 160, 40, 70), (1, 90, 90, 90)]
+
+    sql = str(minute_upsert("mysql").compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    assert "least(" in sql.lower() and "greatest(" in sql.lower()
+
+
+def test_get_level_history_downsamples(setup_database):
+    """
+    Test: The history is aggregated into at most `points` buckets.
+
+    Steps:
+        1. Append one energy reading per second for 10 minutes, and one per minute
+           for 30 days.
+        2. Ask for the 10 minutes in 10 points, and for the 30 days in 30 points.
+
+    Expected Outcome:
+        - The short range is read from the raw readings, in 60-second buckets.
+        - The long range is read from the minute rollup, in one-day buckets.
+    """
+
+    session = setup_database
+    controller = ShelterController()
+    _add_shelter(session)
+    energy = METRICS["energy"]
+    start = datetime(2024, 1, 1)
+    base = to_millis(start)
+
+    append_readings(session, [(1, energy, base + second * 1000, second % 60) for second in range(600)])
+    session.commit()
+
+    response = controller.get_level_history("energy", start, start + timedelta(minutes=10), 10, session=session)
+
+    assert response["status"] == "ok"
+    assert response["bucketSeconds"] == 60
+    assert response["series"]["time"][:2] == [start, start + timedelta(minutes=1)]
+    assert response["series"]["count"] == [60] * 10
+    assert response["series"]["avg"] == [29.5] * 10
+    assert response["series"]["min"] == [0] * 10
+    assert response["series"]["max"] == [59] * 10
+
+    later = base + 3_600_000
+    append_readings(session, [(1, energy, later + minute * 60_000, 100) for minute in range(30 * 24 * 60)])
+    session.commit()
+
+    response = controller.get_level_history("energy", start, start + timedelta(days=30), 30, session=session)
+
+    assert response["bucketSeconds"] == 86400
+    assert len(response["series"]["time"]) == 30
+    assert sum(response["series"]["count"]) == 600 + 30 * 24 * 60 - 60
+    assert response["series"]["max"][0] == 100
+
+
+def test_get_level_history_rejects_invalid_requests(setup_database):
+    """
+    Test: Unknown metrics and empty ranges are reported as errors.
+    """
+
+    controller = ShelterController()
+
+    assert controller.get_level_history("oxygen", session=setup_database)["status"] == "error"
+    now = datetime(2024, 1, 1)
+    assert controller.get_level_history("water", now, now, session=setup_database)["status"] == "error"